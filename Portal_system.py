@@ -1,51 +1,3812 @@
 import os
-import matplotlib.pyplot as plt
+import atexit
+import csv
+import gc
+import hashlib
+import hmac
+import importlib.util
+import json
+import mmap
+import pickle
+import re
+import secrets
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict, deque
+from contextlib import ExitStack, contextmanager
+from functools import wraps
 from datetime import datetime
+from itertools import accumulate, compress, groupby, islice, repeat
+from operator import itemgetter
 
 # Configuration class for constants
 class Config:
     MAX_ENROLLMENT = 4
     CGPA_SCALE = {90: 4.0, 85: 3.7, 80: 3.3, 75: 3.0, 70: 2.7, 65: 2.3, 60: 2.0, 0: 0.0}  # Grade to CGPA mapping
+    DEFAULT_CREDITS = 3
+    LOG_FILE = 'activity_log.txt'
+    LOG_FLUSH_INTERVAL = 1.0         # Seconds between background flushes
+    LOG_FLUSH_SIZE = 256             # Pending entries that trigger an early flush
+    LOG_BUFFER_CAPACITY = 10000      # Pending entries before log_action flushes inline
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file past this size (0 disables)
+    LOG_ROTATE_DAILY = False         # Rotate the log file when the date changes
+    LOG_BACKUPS = 5                  # Size-rotated files to keep
+    LOG_INDEX_BLOCK = 1024 * 1024    # Bytes of log summarized by each audit index entry
+    STORAGE_BACKEND = os.environ.get('PORTAL_STORAGE', 'sqlite')  # 'sqlite', 'memory' or 'journal'
+    DB_PATH = os.environ.get('PORTAL_DB', 'portal.db')
+    JOURNAL_PATH = os.environ.get('PORTAL_JOURNAL', 'portal.journal')  # '.wal' and '.snap' files for the journal backend
+    WAL_FLUSH_INTERVAL = 0.05        # Seconds between group writes + fsyncs of the WAL
+    WAL_GROUP_SIZE = 1024            # Pending WAL frames that trigger an early group write
+    WAL_SYNC_COMMIT = False          # Make each write wait for the fsync covering it (else up to one interval is at risk)
+    SNAPSHOT_EVERY = 100000          # WAL frames between snapshots
+    KDF = 'scrypt'                   # 'scrypt' or 'pbkdf2_sha256'
+    SCRYPT_N = 2 ** 14               # scrypt CPU/memory cost
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+    PBKDF2_ITERATIONS = 600000
+    CREDENTIAL_CACHE_SIZE = 4096     # Recently verified logins that skip the KDF
+    LOGIN_FAILURE_WINDOW = 300       # Seconds that failed attempts count towards throttling
+    LOGIN_MAX_USER_FAILURES = 5      # Failed attempts per user within the window
+    LOGIN_MAX_SOURCE_FAILURES = 50   # Failed attempts per source within the window
+    SERVER_HOST = '127.0.0.1'
+    SERVER_PORT = 8765
+    ENROLLMENT_SHARDS = int(os.environ.get('PORTAL_SHARDS', '0'))  # Worker processes for the catalog (0 or 1: in-process)
+    SHARD_THREADS = 8  # Server threads running enroll/unenroll against catalog shards, each with its own pipes
+    PLOT_MODE = os.environ.get('PORTAL_PLOT', 'auto')  # 'auto', 'window', 'file' or 'ascii'
+    PLOT_DIR = 'plots'
+    PLOT_FORMAT = 'png'              # 'png' or 'svg' for file output
+    PAYROLL_BASE_SALARY = 150000     # Monthly gross before qualification allowances
+    PAYROLL_ALLOWANCES = {'phd': 0.25, 'mphil': 0.15, 'ms': 0.10}  # Allowance rate by qualification
+    PAYROLL_TAX_BRACKETS = ((0, 0.0), (100000, 0.05), (200000, 0.15))  # (monthly gross floor, marginal rate)
+    SALARY_PAGE_SIZE = 12
+    DIRECTORY_PAGE_SIZE = 20
+    SESSION_CACHE_SIZE = 10000       # Users kept hydrated between logins
+    SESSION_TTL = 15 * 60            # Seconds an idle cached user stays valid
+    METRICS_ENABLED = os.environ.get('PORTAL_METRICS', '') not in ('', '0')  # Record call latencies
+    PROFILE_MODE = os.environ.get('PORTAL_PROFILE', '')  # 'cpu' (cProfile) or 'memory' (tracemalloc) per CLI session
+    PROFILE_DIR = 'profiles'
+
+# Instrumentation
+class LatencyHistogram:
+    """Call count and log-spaced latency buckets (four per doubling, 100 ns to ~20 s) for one name."""
+    BOUNDS = [1e-7 * 2 ** (i / 4) for i in range(110)]  # Bucket upper bounds in seconds
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (within 19%), capped at the slowest call."""
+        if not self.count:
+            return 0.0
+        rank, seen = q / 100 * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(self.BOUNDS[i] if i < len(self.BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self):
+        return {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99), 'max': self.max}
+
+class _NullTimer:
+    """Timer handed out while metrics are off."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """Latency histograms and call counts for instrumented functions and blocks.
+
+    Off unless PORTAL_METRICS is set: instrument() then returns functions unwrapped
+    and timer() a shared no-op, so disabled instrumentation costs nothing per call.
+    """
+    NULL_TIMER = _NullTimer()
+
+    def __init__(self, enabled=Config.METRICS_ENABLED):
+        self.enabled = enabled
+        self.started = time.time()
+        self.histograms = {}  # name -> LatencyHistogram
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LatencyHistogram()
+            hist.add(seconds)
+
+    def timer(self, name):
+        """Context manager timing a block under name."""
+        return _Timer(self, name) if self.enabled else self.NULL_TIMER
+
+    def instrument(self, fn):
+        """Decorator recording the latency of every call to fn under its qualified name."""
+        if not self.enabled:
+            return fn
+        name = fn.__qualname__
+        record = self.record
+        perf_counter = time.perf_counter
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Return {name: summary} for every name recorded, slowest p99 first."""
+        with self._lock:
+            summaries = {name: hist.summary() for name, hist in self.histograms.items()}
+        return dict(sorted(summaries.items(), key=lambda item: -item[1]['p99']))
+
+    def to_json(self):
+        return json.dumps({'enabled': self.enabled, 'since': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                           'metrics': self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format, as summaries."""
+        lines = ["# HELP portal_call_seconds Latency of instrumented portal calls.",
+                 "# TYPE portal_call_seconds summary"]
+        for name, stats in self.snapshot().items():
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                lines.append(f'portal_call_seconds{{name="{label}",quantile="{quantile}"}} {stats[key]:.9f}')
+            lines.append(f'portal_call_seconds_sum{{name="{label}"}} {stats["total"]:.9f}')
+            lines.append(f'portal_call_seconds_count{{name="{label}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+@contextmanager
+def profile_session(username, mode=Config.PROFILE_MODE, directory=Config.PROFILE_DIR):
+    """Profile one session with cProfile ('cpu') or tracemalloc ('memory'), saving the result under directory."""
+    if mode not in ('cpu', 'memory'):
+        yield None
+        return
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"session_{username}_{datetime.now():%Y%m%dT%H%M%S}")
+    if mode == 'cpu':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield stem + '.prof'
+        finally:
+            profiler.disable()
+            profiler.dump_stats(stem + '.prof')
+    else:
+        import tracemalloc
+        started = tracemalloc.is_tracing()
+        if not started:
+            tracemalloc.start(10)
+        try:
+            yield stem + '.tracemalloc'
+        finally:
+            tracemalloc.take_snapshot().dump(stem + '.tracemalloc')
+            if not started:
+                tracemalloc.stop()
+
+# Buffered activity logger
+class ActivityLogger:
+    """Collects log entries in memory and writes them in batches from a background thread."""
+    def __init__(self, path=Config.LOG_FILE, flush_interval=Config.LOG_FLUSH_INTERVAL,
+                 flush_size=Config.LOG_FLUSH_SIZE, capacity=Config.LOG_BUFFER_CAPACITY,
+                 max_bytes=Config.LOG_MAX_BYTES, rotate_daily=Config.LOG_ROTATE_DAILY,
+                 backups=Config.LOG_BACKUPS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.backups = backups
+        self._buffer = deque()
+        self._lock = threading.Lock()        # Guards the buffer and thread start/stop
+        self._write_lock = threading.Lock()  # Serializes writes to the file
+        self._wakeup = threading.Event()
+        self._stop = None
+        self._thread = None
+        self._file = None
+        self._day = None
+        self._stamp_second = None
+        self._stamp_text = None
+
+    def log(self, username, action):
+        """Queue an entry; the background thread writes it out."""
+        with self._lock:
+            self._buffer.append((time.time(), username, action))
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._start()
+        if pending >= self.capacity:
+            self.flush()
+        elif pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name='activity-logger', daemon=True)
+        self._thread.start()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _timestamp(self, ts):
+        """Format a timestamp, reusing the text for entries in the same second."""
+        second = int(ts)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp_text = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S PKT')
+        return self._stamp_text
+
+    def _rotate(self, day=None):
+        """Close the current file and move it aside, by date or by number."""
+        if self._file:
+            self._file.close()
+            self._file = None
+        if not os.path.exists(self.path):
+            return
+        if day:
+            root, ext = os.path.splitext(self.path)
+            os.replace(self.path, f"{root}.{day}{ext}")
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def flush(self):
+        """Write every pending entry to the log file in one batch."""
+        with self._write_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                batch, self._buffer = self._buffer, deque()
+            if self.rotate_daily:
+                day = datetime.fromtimestamp(batch[0][0]).strftime('%Y-%m-%d')
+                if self._day is None and os.path.exists(self.path):
+                    self._day = datetime.fromtimestamp(os.path.getmtime(self.path)).strftime('%Y-%m-%d')
+                if self._day is not None and day != self._day:
+                    self._rotate(self._day)
+                self._day = day
+            # Encoded up front so the size check counts bytes, not characters
+            data = ''.join(f"{self._timestamp(ts)} - User: {username} - Action: {action}\n"
+                           for ts, username, action in batch).encode('utf-8')
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            if self.max_bytes and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+                self._file = open(self.path, 'ab')
+            self._file.write(data)
+            self._file.flush()
+
+    def close(self):
+        """Stop the background thread, flush pending entries and close the file."""
+        with self._lock:
+            thread, stop = self._thread, self._stop
+            self._thread = None
+        if thread is not None:
+            stop.set()
+            self._wakeup.set()
+            thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+ACTIVITY_LOGGER = ActivityLogger()
+atexit.register(ACTIVITY_LOGGER.close)
 
 # Utility functions
+@METRICS.instrument
 def log_action(username, action):
     """Log user actions to a text file with timestamp."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S PKT')
-    with open('activity_log.txt', 'a') as f:
-        f.write(f"{timestamp} - User: {username} - Action: {action}\n")
+    ACTIVITY_LOGGER.log(username, action)
+
+# Activity log audit index
+class ActivityLogIndex:
+    """Sparse time/user index over the activity log and its rotated copies for filtered queries and aggregates.
+
+    Each segment (the live log, its numbered backups and any dated files) is read through
+    mmap in blocks of about LOG_INDEX_BLOCK bytes. Each block's time span, per-user,
+    per-hour and failed-login counts are appended to a JSON-lines sidecar, so queries only
+    scan blocks that can match, aggregates reuse the stored counts, and each refresh only
+    reads lines written since the last one. Blocks are keyed by their segment's first line
+    plus offset rather than by file name, so when the logger rotates, the blocks of the
+    renamed file carry over and only its unindexed tail is read.
+    """
+    VERSION = 2
+    PREFIX = b' PKT - User: '
+    SEPARATOR = b' - Action: '
+    LINE = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d)(:\d\d:\d\d) PKT - User: (.*?) - Action: (Failed login)?', re.M)
+
+    def __init__(self, path=Config.LOG_FILE, block_size=Config.LOG_INDEX_BLOCK):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.block_size = block_size
+        self.segments = {}  # first line of a segment -> [{'head', 'start', 'end', 'first', 'last', 'users', 'hours', 'failed'}]
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, line):
+        """Split a log line into (timestamp, username, action), or None if it is malformed."""
+        if line[19:32] != cls.PREFIX:
+            return None
+        sep = line.find(cls.SEPARATOR, 32)
+        if sep < 0:
+            return None
+        return (line[:19].decode('ascii', 'replace'), line[32:sep].decode('utf-8', 'replace'),
+                line[sep + len(cls.SEPARATOR):].rstrip(b'\r\n').decode('utf-8', 'replace'))
+
+    def _lines(self, mm, start, end, needle=None):
+        """Yield the raw lines between two offsets; with a needle, jump straight to lines containing it."""
+        if needle is None:
+            yield from mm[start:end].splitlines()
+            return
+        pos = mm.find(needle, start, end)
+        while pos >= 0:
+            line_start = mm.rfind(b'\n', start, pos) + 1 or start
+            line_end = mm.find(b'\n', pos, end)
+            line_end = end if line_end < 0 else line_end
+            yield mm[line_start:line_end]
+            pos = mm.find(needle, line_end, end)
+
+    def _count(self, chunk, since, until, users, hours, failed):
+        """Add per-user, per-hour and failed-login counts (bytes keys) for a chunk of log within a time range.
+
+        Returns the matched (hour, minutes:seconds, username, failed) rows.
+        """
+        rows = self.LINE.findall(chunk)
+        if since or until:
+            rows = [row for row in rows if (not since or row[0] + row[1] >= since) and (not until or row[0] + row[1] <= until)]
+        users.update(map(itemgetter(2), rows))
+        hours.update(map(itemgetter(0), rows))
+        failed.update(compress(map(itemgetter(2), rows), map(itemgetter(3), rows)))
+        return rows
+
+    @staticmethod
+    def _decoded(counter):
+        return {key.decode('utf-8', 'replace'): n for key, n in counter.items()}
+
+    def _summarize(self, mm, start, end):
+        users, hours, failed = Counter(), Counter(), Counter()
+        rows = self._count(mm[start:end], None, None, users, hours, failed)
+        return {'start': start, 'end': end,
+                'first': (rows[0][0] + rows[0][1]).decode('ascii') if rows else '',
+                'last': (rows[-1][0] + rows[-1][1]).decode('ascii') if rows else '',
+                'users': self._decoded(users), 'hours': self._decoded(hours), 'failed': self._decoded(failed)}
+
+    def _load(self):
+        """Read the sidecar; returns False if it is missing or unusable and must be rewritten."""
+        self._loaded = True
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('version') != self.VERSION:
+                    return False
+                for line in f:
+                    if line.strip():
+                        block = json.loads(line)
+                        self.segments.setdefault(block['head'], []).append(block)
+            return True
+        except (OSError, ValueError, KeyError):
+            self.segments = {}
+            return False
+
+    def _save(self, new_blocks, rewrite):
+        mode = 'w' if rewrite else 'a'
+        with open(self.index_path, mode, encoding='utf-8') as f:
+            if rewrite:
+                f.write(json.dumps({'version': self.VERSION}) + '\n')
+                new_blocks = [block for blocks in self.segments.values() for block in blocks]
+            f.writelines(json.dumps(block) + '\n' for block in new_blocks)
+
+    def segment_paths(self):
+        """Return the rotated copies of the log that exist, then the live log."""
+        directory, base = os.path.split(self.path)
+        root, ext = os.path.splitext(base)
+        rotated = re.compile(rf"{re.escape(base)}\.\d+|{re.escape(root)}\.\d{{4}}-\d\d-\d\d{re.escape(ext)}")
+        try:
+            names = sorted(name for name in os.listdir(directory or '.') if rotated.fullmatch(name))
+        except OSError:
+            names = []
+        return [os.path.join(directory, name) for name in names] + [self.path]
+
+    def _rank(self, path):
+        """Order segments starting in the same second: higher-numbered backups first, the live log last."""
+        if path == self.path:
+            return 1
+        suffix = path.rpartition('.')[2]
+        return -int(suffix) if suffix.isdigit() else 0
+
+    def _refresh(self, files):
+        """Index the blocks added since the last refresh to each (path, mmap) segment.
+
+        Rotated segments no longer grow, so they are indexed to the end; the live log keeps
+        its last partial block as an unindexed tail. Returns (mmap, blocks, tail_start,
+        tail_end) per segment, oldest first.
+        """
+        rewrite = not self._loaded and not self._load()
+        found = {}
+        for path, mm in files:
+            first_line = mm.find(b'\n')
+            head = mm[:first_line + 1 if first_line >= 0 else len(mm)].decode('utf-8', 'replace')
+            found.setdefault(head, (path, mm))
+        order = sorted(found, key=lambda head: (head[:19], self._rank(found[head][0])))  # Oldest first
+        segments, kept, new_blocks = [], {}, []
+        rewrite = rewrite or bool(set(self.segments) - set(found))  # Or backups have since been deleted
+        for head in order:
+            path, mm = found[head]
+            size = len(mm)
+            blocks = self.segments.get(head, [])
+            indexed = blocks[-1]['end'] if blocks else 0
+            if indexed > size:
+                blocks, indexed, rewrite = [], 0, True
+            added = []
+            while size - indexed >= self.block_size:
+                cut = mm.find(b'\n', indexed + self.block_size - 1)
+                if cut < 0:
+                    break
+                added.append(self._summarize(mm, indexed, cut + 1))
+                indexed = cut + 1
+            if path != self.path and indexed < size:
+                added.append(self._summarize(mm, indexed, size))
+                indexed = size
+            for block in added:
+                block['head'] = head
+            kept[head] = blocks = blocks + added
+            new_blocks.extend(added)
+            segments.append((mm, blocks, indexed, max(mm.rfind(b'\n') + 1, indexed)))
+        self.segments = kept
+        if new_blocks or rewrite:
+            self._save(new_blocks, rewrite)
+        return segments
+
+    @contextmanager
+    def _mapped(self):
+        """Yield the refreshed (mmap, blocks, tail_start, tail_end) segments, oldest first."""
+        with self._lock, ExitStack() as stack:
+            files = []
+            for path in self.segment_paths():
+                try:
+                    f = stack.enter_context(open(path, 'rb'))
+                    if not os.fstat(f.fileno()).st_size:
+                        continue
+                    files.append((path, stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))))
+                except FileNotFoundError:  # Rotated away since the directory was listed
+                    continue
+            yield self._refresh(files)
+
+    @staticmethod
+    def _overlaps(block, since, until):
+        return (since is None or block['last'] >= since) and (until is None or block['first'] <= until)
+
+    @staticmethod
+    def _within(block, since, until):
+        return (since is None or block['first'] >= since) and (until is None or block['last'] <= until)
+
+    def query(self, user=None, action=None, since=None, until=None, limit=None):
+        """Return the latest matching (timestamp, username, action) entries in log order, across rotated files.
+
+        since and until are inclusive 'YYYY-MM-DD HH:MM:SS' strings; action matches as a prefix.
+        """
+        if user is not None:
+            needle = self.PREFIX + user.encode() + self.SEPARATOR + (action or '').encode()
+        elif action is not None:
+            needle = self.SEPARATOR + action.encode()
+        else:
+            needle = None
+        matches = deque(maxlen=limit)
+        with self._mapped() as segments:
+            for mm, blocks, tail_start, tail_end in segments:
+                spans = [(b['start'], b['end']) for b in blocks
+                         if self._overlaps(b, since, until) and (user is None or user in b['users'])]
+                spans.append((tail_start, tail_end))
+                for start, end in spans:
+                    for line in self._lines(mm, start, end, needle):
+                        entry = self.parse(line)
+                        if (entry and (user is None or entry[1] == user)
+                                and (action is None or entry[2].startswith(action))
+                                and (since is None or entry[0] >= since) and (until is None or entry[0] <= until)):
+                            matches.append(entry)
+        return list(matches)
+
+    def aggregate(self, since=None, until=None, top=10):
+        """Count actions per hour, top users and failed logins; only blocks straddling the range are read."""
+        users, hours, failed = Counter(), Counter(), Counter()
+        scanned = Counter(), Counter(), Counter()
+        with self._mapped() as segments:
+            for mm, blocks, tail_start, tail_end in segments:
+                spans = []
+                for block in blocks:
+                    if self._within(block, since, until):
+                        users.update(block['users'])
+                        hours.update(block['hours'])
+                        failed.update(block['failed'])
+                    elif self._overlaps(block, since, until):
+                        spans.append((block['start'], block['end']))
+                spans.append((tail_start, tail_end))
+                for start, end in spans:
+                    self._count(mm[start:end], since and since.encode(), until and until.encode(), *scanned)
+        for total, counter in zip((users, hours, failed), scanned):
+            total.update(self._decoded(counter))
+        return {'total': sum(users.values()),
+                'actions_per_hour': dict(sorted(hours.items())),
+                'top_users': users.most_common(top),
+                'failed_logins': sum(failed.values()),
+                'failed_by_user': failed.most_common(top)}
+
+AUDIT_LOG = ActivityLogIndex()
+
+CGPA_THRESHOLDS = sorted(Config.CGPA_SCALE)  # Ascending grade cut-offs, computed once
+CGPA_POINTS = [Config.CGPA_SCALE[k] for k in CGPA_THRESHOLDS]
+
+def grade_to_cgpa(grade):
+    """Map a percentage grade to CGPA points using the precomputed scale."""
+    i = bisect_right(CGPA_THRESHOLDS, grade) - 1
+    return CGPA_POINTS[i] if i >= 0 else 0.0
+
+def clear_screen():
+    """Clear the terminal screen."""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+def get_valid_input(prompt, valid_options=None, type_func=str, error_msg="Invalid input. Try again."):
+    """Get valid input from the user with optional validation."""
+    while True:
+        try:
+            choice = type_func(input(prompt).strip())
+            if valid_options and choice not in valid_options:
+                print(f"{error_msg} Options: {valid_options}")
+                continue
+            return choice
+        except ValueError:
+            print(error_msg)
+
+# Timetable and prerequisites
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+def parse_meeting(text):
+    """Parse 'Mon 09:00-10:30' into (start, end) minutes from the start of the week."""
+    match = re.fullmatch(r'\s*([A-Za-z]{3})[A-Za-z]*\s+(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*', str(text))
+    day = match and match.group(1).capitalize()
+    if day not in WEEKDAYS:
+        raise ValueError(f"Meeting times look like 'Mon 09:00-10:30', not {text!r}.")
+    start_h, start_m, end_h, end_m = map(int, match.groups()[1:])
+    start, end = start_h * 60 + start_m, end_h * 60 + end_m
+    if start_m > 59 or end_m > 59 or not start < end <= 24 * 60:
+        raise ValueError(f"Invalid meeting time {text!r}.")
+    offset = WEEKDAYS.index(day) * 24 * 60
+    return offset + start, offset + end
+
+def passed_courses(records):
+    """Course IDs from academic record dicts whose latest grade is a pass (non-zero CGPA)."""
+    return {rec['course_id'] for rec in records if rec['grades'] and rec['cgpa'] > 0}
+
+class Timetable:
+    """Weekly meeting times per course and a per-student interval index for clash checks.
+
+    Each student's meetings are kept sorted by start time alongside a running maximum of
+    their end times, so a clash check bisects to the meetings starting before each new one
+    ends and needs only the latest end among them. The running maximum keeps the check
+    exact even for enrollments restored from the store that overlap each other.
+    """
+    def __init__(self):
+        self.meetings = {}    # course_id -> sorted tuple of (start, end) minutes of the week
+        self.by_student = {}  # username -> sorted list of (start, end, course_id)
+        self.reach = {}       # username -> running maximum of the end times in by_student
+
+    @staticmethod
+    def intervals(meetings):
+        """Parse 'Mon 09:00-10:30' strings or (start, end) pairs into a sorted tuple of intervals."""
+        return tuple(sorted(parse_meeting(m) if isinstance(m, str) else tuple(m) for m in meetings or ()))
+
+    def set_meetings(self, course_id, meetings):
+        """Set a course's meetings from 'Mon 09:00-10:30' strings or (start, end) pairs."""
+        intervals = self.intervals(meetings)
+        if intervals:
+            self.meetings[course_id] = intervals
+        else:
+            self.meetings.pop(course_id, None)
+
+    def clash(self, username, course_id):
+        """Return an enrolled course whose meetings overlap course_id's, or None."""
+        taken = self.by_student.get(username)
+        if not taken:
+            return None
+        reach = self.reach[username]
+        for start, end in self.meetings.get(course_id, ()):
+            i = bisect_left(taken, (end,))  # Meetings starting before this one ends
+            if i and reach[i - 1] > start:
+                while taken[i - 1][1] <= start:
+                    i -= 1
+                return taken[i - 1][2]
+        return None
+
+    def _index(self, username, taken):
+        if taken:
+            self.by_student[username] = taken
+            self.reach[username] = list(accumulate((end for _, end, _ in taken), max))
+        else:
+            self.by_student.pop(username, None)
+            self.reach.pop(username, None)
+
+    def add(self, username, course_id):
+        meetings = self.meetings.get(course_id)
+        if meetings:
+            taken = self.by_student.get(username, [])
+            for start, end in meetings:
+                insort(taken, (start, end, course_id))
+            self._index(username, taken)
+
+    def remove(self, username, course_id):
+        taken = self.by_student.get(username)
+        if taken and course_id in self.meetings:
+            self._index(username, [meeting for meeting in taken if meeting[2] != course_id])
+
+    def reschedule(self, course_id, meetings, students):
+        """Move a course to new meetings and re-index its enrolled students.
+
+        Raises ValueError, keeping the old meetings, if the new ones clash with another
+        course of any of those students.
+        """
+        old = self.meetings.get(course_id, ())
+        for username in students:
+            self.remove(username, course_id)
+        self.set_meetings(course_id, meetings)
+        clashes = sorted(username for username in students if self.clash(username, course_id) is not None)
+        if clashes:
+            self.set_meetings(course_id, old)
+        for username in students:
+            self.add(username, course_id)
+        if clashes:
+            raise ValueError(f"New meetings for {course_id} clash with the timetable of "
+                             f"{len(clashes)} enrolled student(s), e.g. {clashes[0]}")
+
+    @staticmethod
+    def overlaps(meetings):
+        """Return the sorted (course_id, other) pairs that overlap among (start, end, course_id) meetings.
+
+        One sweep in start order; every clashing course appears in at least one pair.
+        """
+        pairs = set()
+        last_end, last_course = -1, None
+        for start, end, course_id in sorted(meetings):
+            if start < last_end and course_id != last_course:
+                pairs.add(tuple(sorted((last_course, course_id))))
+            if end > last_end:
+                last_end, last_course = end, course_id
+        return sorted(pairs)
+
+class PrerequisiteGraph:
+    """Prerequisite DAG over course IDs with a cached topological order and transitive closure.
+
+    Each course's closure (every course below it in its chain) is a bitmask over the
+    topological order, so checking eligibility is one AND-NOT against the mask of the
+    student's passed courses however long the chain. Both are rebuilt lazily after a change.
+    """
+    def __init__(self):
+        self.requires = {}  # course_id -> frozenset of direct prerequisites
+        self._index = None  # Cached (topological order, course_id -> bit, course_id -> closure mask)
+        self._lock = threading.Lock()
+
+    def set(self, course_id, prerequisites):
+        """Replace a course's direct prerequisites; raises ValueError if that would create a cycle."""
+        prerequisites = frozenset(prerequisites or ())
+        with self._lock:
+            stack, seen = list(prerequisites), set()
+            while stack:  # A cycle means course_id is already below one of its new prerequisites
+                current = stack.pop()
+                if current == course_id:
+                    raise ValueError(f"Prerequisites of {course_id} would form a cycle.")
+                if current not in seen:
+                    seen.add(current)
+                    stack.extend(self.requires.get(current, ()))
+            if prerequisites:
+                self.requires[course_id] = prerequisites
+            else:
+                self.requires.pop(course_id, None)
+            self._index = None
+
+    def _build(self):
+        """Return the cached index, building it with Kahn's algorithm after a change."""
+        index = self._index
+        if index is not None:
+            return index
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            pending, dependents = {}, {}
+            for course_id, prerequisites in self.requires.items():
+                pending[course_id] = len(prerequisites)
+                for prerequisite in prerequisites:
+                    pending.setdefault(prerequisite, 0)
+                    dependents.setdefault(prerequisite, []).append(course_id)
+            ready = sorted((c for c, count in pending.items() if not count), reverse=True)
+            order = []
+            while ready:
+                course_id = ready.pop()
+                order.append(course_id)
+                for dependent in dependents.get(course_id, ()):
+                    pending[dependent] -= 1
+                    if not pending[dependent]:
+                        ready.append(dependent)
+            bit = {course_id: i for i, course_id in enumerate(order)}
+            closure = {}
+            for course_id in order:  # Prerequisites come first, so their closures are ready
+                mask = 0
+                for prerequisite in self.requires.get(course_id, ()):
+                    mask |= closure[prerequisite] | 1 << bit[prerequisite]
+                closure[course_id] = mask
+            self._index = index = (order, bit, closure)
+            return index
+
+    def order(self):
+        """Return every course in the graph, prerequisites before the courses needing them."""
+        return list(self._build()[0])
+
+    def mask(self, course_ids):
+        """Return the bitmask of the given courses; courses outside the graph are ignored."""
+        bit = self._build()[1]
+        mask = 0
+        for course_id in course_ids:
+            i = bit.get(course_id)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def closure(self, course_id):
+        """Return every transitive prerequisite of a course, in topological order."""
+        return self.missing(course_id, 0)
+
+    def missing(self, course_id, passed_mask):
+        """Return the transitive prerequisites of course_id outside passed_mask, in topological order."""
+        order, _, closure = self._build()
+        need = closure.get(course_id, 0) & ~passed_mask
+        if not need:
+            return []
+        bits = format(need, 'b')[::-1]  # Bit i is order[i]; one conversion beats shifting a wide int per course
+        missing, i = [], bits.find('1')
+        while i >= 0:
+            missing.append(order[i])
+            i = bits.find('1', i + 1)
+        return missing
+
+def validate_enrollments(rows, catalog):
+    """Check (username, course_id, cgpa) enrollment rows, grouped by student, in one pass.
+
+    cgpa is None for ungraded enrollments, the only ones whose prerequisites must be passed.
+    Returns the counts checked plus every meeting clash and unmet prerequisite found.
+    """
+    meetings, graph = catalog.timetable.meetings, catalog.prerequisites
+    result = {'students': 0, 'enrollments': 0, 'conflicts': [], 'missing_prerequisites': []}
+    for username, group in groupby(rows, key=itemgetter(0)):
+        group = list(group)
+        result['students'] += 1
+        result['enrollments'] += len(group)
+        passed = graph.mask(course_id for _, course_id, cgpa in group if cgpa)
+        taken = []
+        for _, course_id, cgpa in group:
+            taken.extend((start, end, course_id) for start, end in meetings.get(course_id, ()))
+            missing = graph.missing(course_id, passed) if cgpa is None else None
+            if missing:
+                result['missing_prerequisites'].append({'username': username, 'course_id': course_id, 'missing': missing})
+        for course_id, other in Timetable.overlaps(taken):
+            result['conflicts'].append({'username': username, 'course_id': course_id, 'other': other})
+    return result
+
+# Course catalog shared by all roles
+class CourseCatalog:
+    """In-process course store indexed by course ID, student and remaining seats.
+
+    Sections may carry weekly meetings and prerequisites: enrollment refuses a section that
+    clashes with the student's timetable, checked under the student's lock like the limit.
+    Safe to share between threads: each course has its own lock and students map onto
+    a fixed set of striped locks. A student lock is always taken before a course lock
+    and never more than one of each, so concurrent enrollments cannot deadlock.
+    """
+    STUDENT_LOCK_STRIPES = 256
+
+    def __init__(self, courses=None, on_promote=None, on_change=None):
+        self.courses = {}        # course_id -> {'name', 'section', 'students' (set), 'max_seats', 'credits', 'meetings', 'prerequisites'}
+        self.by_student = {}     # username -> set of enrolled course_ids
+        self.timetable = Timetable()
+        self.prerequisites = PrerequisiteGraph()
+        self.seats_left = {}     # course_id -> remaining seats
+        self.by_seats_left = {}  # remaining seats -> set of course_ids
+        self.waitlists = {}      # course_id -> deque of (username, enrollment limit)
+        self.on_promote = on_promote  # Called as on_promote(username, course_id) after a waitlist promotion
+        self.on_change = on_change    # Called as on_change(course_id, enrolled_delta, seats_delta) under the course lock
+        self._course_locks = {}
+        self._student_locks = [threading.Lock() for _ in range(self.STUDENT_LOCK_STRIPES)]
+        self._index_lock = threading.Lock()  # Guards the shared remaining-seats buckets
+        for course_id, info in (courses or {}).items():
+            self.add_course(course_id, info['name'], info.get('section', 'N/A'), info.get('max_seats', 0),
+                            info.get('credits', Config.DEFAULT_CREDITS), info.get('meetings'), info.get('prerequisites'))
+            for username in info.get('students', []):
+                self.enroll(username, course_id)
+
+    def __contains__(self, course_id):
+        return course_id in self.courses
+
+    def __getitem__(self, course_id):
+        return self.courses[course_id]
+
+    def __len__(self):
+        return len(self.courses)
+
+    def _student_lock(self, username):
+        return self._student_locks[hash(username) % self.STUDENT_LOCK_STRIPES]
+
+    def _move_bucket(self, course_id, old, new):
+        """Move a course between remaining-seat buckets."""
+        with self._index_lock:
+            if old is not None:
+                bucket = self.by_seats_left[old]
+                bucket.discard(course_id)
+                if not bucket:
+                    del self.by_seats_left[old]
+            self.by_seats_left.setdefault(new, set()).add(course_id)
+            self.seats_left[course_id] = new
+
+    def add_course(self, course_id, name, section='N/A', max_seats=0, credits=Config.DEFAULT_CREDITS,
+                   meetings=None, prerequisites=None):
+        """Add a course section, or update its details if it already exists.
+
+        meetings are 'Mon 09:00-10:30' strings and prerequisites are course IDs; raises
+        ValueError for a malformed meeting, a prerequisite cycle, or new meetings that clash
+        with an enrolled student's timetable. Seats left go negative if max_seats drops
+        below the roster, so promotion waits until enough students leave.
+        """
+        meetings = list(meetings or ())
+        prerequisites = sorted(set(prerequisites or ()))
+        for meeting in meetings:
+            parse_meeting(meeting)
+        self.prerequisites.set(course_id, prerequisites)
+        lock = self._course_locks.setdefault(course_id, threading.Lock())
+        with lock:
+            course = self.courses.get(course_id)
+            if course is None:
+                self.waitlists[course_id] = deque()
+                self._move_bucket(course_id, None, max_seats)
+                self.timetable.set_meetings(course_id, meetings)
+                course = self.courses[course_id] = {'name': name, 'section': section, 'students': set(),
+                                                    'max_seats': max_seats, 'credits': credits,
+                                                    'meetings': meetings, 'prerequisites': prerequisites}
+                if self.on_change:
+                    self.on_change(course_id, 0, max_seats)
+                return course
+            if meetings != course['meetings']:  # Refused if the new times clash for an enrolled student
+                try:
+                    self.timetable.reschedule(course_id, meetings, course['students'])
+                except ValueError:
+                    self.prerequisites.set(course_id, course['prerequisites'])
+                    raise
+            seats_delta = max_seats - course['max_seats']
+            course.update({'name': name, 'section': section, 'max_seats': max_seats, 'credits': credits,
+                           'meetings': meetings, 'prerequisites': prerequisites})
+            self._move_bucket(course_id, self.seats_left[course_id], max_seats - len(course['students']))
+            if self.on_change and seats_delta:  # Reported only once the update has fully applied
+                self.on_change(course_id, 0, seats_delta)
+        self._promote(course_id)
+        return course
+
+    def get(self, course_id, default=None):
+        """Return the course dict for course_id."""
+        return self.courses.get(course_id, default)
+
+    def roster(self, course_id):
+        """Return a snapshot of the usernames enrolled in a course."""
+        with self._course_locks[course_id]:
+            return set(self.courses[course_id]['students'])
+
+    def courses_for(self, username):
+        """Return the set of course IDs a student is enrolled in."""
+        return self.by_student.get(username, set())
+
+    def is_enrolled(self, username, course_id):
+        """Check whether a student is enrolled in a course."""
+        return course_id in self.by_student.get(username, ())
+
+    def open_courses(self, min_seats=1):
+        """Return the course IDs with at least min_seats seats remaining."""
+        with self._index_lock:
+            return {c for seats, ids in self.by_seats_left.items() if seats >= min_seats for c in ids}
+
+    def waitlist(self, course_id):
+        """Return the usernames waiting for a seat, in promotion order."""
+        with self._course_locks[course_id]:
+            return [username for username, _ in self.waitlists[course_id]]
+
+    def clash(self, username, course_id):
+        """Return the student's enrolled course whose meetings overlap course_id's, or None."""
+        return self.timetable.clash(username, course_id)
+
+    def missing_prerequisites(self, course_id, passed):
+        """Return course_id's transitive prerequisites absent from the passed course IDs, in order."""
+        return self.prerequisites.missing(course_id, self.prerequisites.mask(passed))
+
+    def _reserve(self, username, course_id, limit):
+        """Take a seat; the caller holds the student's lock and the course lock."""
+        enrolled = self.by_student.get(username, ())
+        if limit is not None and len(enrolled) >= limit:
+            return 'limit'
+        if course_id in enrolled:
+            return 'duplicate'
+        if self.timetable.clash(username, course_id) is not None:
+            return 'conflict'
+        if self.seats_left[course_id] <= 0:
+            return 'full'
+        self._place(username, course_id)
+        return 'ok'
+
+    def _place(self, username, course_id):
+        """Record a student in a course and its indexes; the caller holds both locks."""
+        seats = self.seats_left[course_id]
+        self.courses[course_id]['students'].add(username)
+        self.by_student.setdefault(username, set()).add(course_id)
+        self.timetable.add(username, course_id)
+        self._move_bucket(course_id, seats, seats - 1)
+        if self.on_change:
+            self.on_change(course_id, 1, 0)
+
+    def restore(self, username, course_id):
+        """Put back a stored enrollment, skipping the limit, clash and seat checks.
+
+        The store is the record of truth, so an enrollment the checks would now refuse
+        (the section shrank or moved) is kept rather than dropped. Returns 'ok', 'invalid'
+        or 'duplicate'.
+        """
+        if course_id not in self.courses:
+            return 'invalid'
+        with self._student_lock(username), self._course_locks[course_id]:
+            if course_id in self.by_student.get(username, ()):
+                return 'duplicate'
+            self._place(username, course_id)
+            return 'ok'
+
+    def enroll(self, username, course_id, limit=None, waitlist=False):
+        """Atomically enroll a student. Returns 'ok', 'invalid', 'limit', 'duplicate', 'conflict', 'full' or 'waitlisted'.
+
+        With waitlist=True a student who finds the section full joins its waitlist instead.
+        """
+        if course_id not in self.courses:
+            return 'invalid'
+        with self._student_lock(username), self._course_locks[course_id]:
+            status = self._reserve(username, course_id, limit)
+            if status == 'full' and waitlist:
+                queue = self.waitlists[course_id]
+                if not any(name == username for name, _ in queue):
+                    queue.append((username, limit))
+                return 'waitlisted'
+            return status
+
+    def unenroll(self, username, course_id):
+        """Unenroll a student and promote from the waitlist.
+
+        Returns 'ok', 'invalid', 'not_enrolled' or 'unwaitlisted' (left the waitlist instead).
+        """
+        if course_id not in self.courses:
+            return 'invalid'
+        with self._student_lock(username), self._course_locks[course_id]:
+            enrolled = self.by_student.get(username)
+            if not enrolled or course_id not in enrolled:
+                queue = self.waitlists[course_id]
+                for entry in queue:
+                    if entry[0] == username:
+                        queue.remove(entry)
+                        return 'unwaitlisted'
+                return 'not_enrolled'
+            enrolled.discard(course_id)
+            if not enrolled:
+                del self.by_student[username]
+            self.courses[course_id]['students'].discard(username)
+            self.timetable.remove(username, course_id)
+            seats = self.seats_left[course_id]
+            self._move_bucket(course_id, seats, seats + 1)
+            if self.on_change:
+                self.on_change(course_id, -1, 0)
+        self._promote(course_id)
+        return 'ok'
+
+    def _promote(self, course_id):
+        """Move waitlisted students into free seats, in order."""
+        lock = self._course_locks[course_id]
+        while True:
+            with lock:
+                queue = self.waitlists[course_id]
+                if not queue or self.seats_left[course_id] <= 0:
+                    return
+                username, limit = queue.popleft()
+            # Re-take the locks in student -> course order before reserving the seat
+            with self._student_lock(username), lock:
+                status = self._reserve(username, course_id, limit)
+                if status == 'full':
+                    queue.appendleft((username, limit))
+                    return
+            if status == 'ok' and self.on_promote:
+                self.on_promote(username, course_id)
+
+    def close(self):
+        pass
+
+# Multi-process sharded catalog
+def _serve_connections(conns, handle):
+    """Answer (op, args) requests from many pipes until every peer has closed its end."""
+    from multiprocessing.connection import wait
+    conns = list(conns)
+    while conns:
+        for conn in wait(conns):
+            try:
+                op, args = conn.recv()
+            except EOFError:
+                conns.remove(conn)
+                continue
+            try:
+                reply = (True, handle(op, args))
+            except Exception as e:
+                reply = (False, f"{type(e).__name__}: {e}")
+            conn.send(reply)
+
+def _coordinator_main(conns):
+    """Coordinator process: tracks every student's courses and timetable across shards to enforce limits and clashes."""
+    enrolled = {}  # username -> set of course_ids
+    timetable = Timetable()
+
+    def handle(op, args):
+        if op == 'reserve':
+            username, course_id, limit = args
+            courses = enrolled.get(username, ())
+            if limit is not None and len(courses) >= limit:
+                return 'limit'
+            if course_id in courses:
+                return 'duplicate'
+            if timetable.clash(username, course_id) is not None:
+                return 'conflict'
+            enrolled.setdefault(username, set()).add(course_id)
+            timetable.add(username, course_id)
+            return 'ok'
+        if op == 'restore':
+            username, course_id = args
+            courses = enrolled.setdefault(username, set())
+            if course_id not in courses:
+                courses.add(course_id)
+                timetable.add(username, course_id)
+            return None
+        if op == 'release':
+            username, course_id = args
+            courses = enrolled.get(username)
+            if courses:
+                courses.discard(course_id)
+                if not courses:
+                    del enrolled[username]
+            timetable.remove(username, course_id)
+            return None
+        if op == 'courses_for':
+            return set(enrolled.get(args[0], ()))
+        if op == 'clash':
+            return timetable.clash(*args)
+        if op == 'set_meetings':  # Returns the error message if the new times clash for an enrolled student
+            course_id, meetings = args
+            students = [username for username, courses in enrolled.items() if course_id in courses]
+            try:
+                timetable.reschedule(course_id, meetings, students)
+            except ValueError as e:
+                return str(e)
+            return None
+        raise ValueError(f"unknown coordinator op {op}")
+
+    _serve_connections(conns, handle)
+
+class _Channel:
+    """One request/reply pipe to a shard or the coordinator, shared safely between threads."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def call(self, op, *args):
+        with self.lock:
+            self.conn.send((op, args))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise RuntimeError(f"Shard call {op} failed: {result}")
+        return result
+
+class _ShardCatalog(CourseCatalog):
+    """A shard's CourseCatalog; each student's course set lives in the coordinator instead."""
+    def __init__(self, coordinator, **kwargs):
+        self.coordinator = coordinator
+        super().__init__(**kwargs)
+
+    def _reserve(self, username, course_id, limit):
+        status = self.coordinator.call('reserve', username, course_id, limit)
+        if status != 'ok':
+            return status
+        status = super()._reserve(username, course_id, None)
+        if status != 'ok':
+            self.coordinator.call('release', username, course_id)
+        return status
+
+    def restore(self, username, course_id):
+        if course_id not in self.courses:
+            return 'invalid'
+        self.coordinator.call('restore', username, course_id)
+        return super().restore(username, course_id)
+
+    def unenroll(self, username, course_id):
+        status = super().unenroll(username, course_id)
+        if status == 'ok':
+            self.coordinator.call('release', username, course_id)
+        return status
+
+def _shard_main(conns, coordinator_conn):
+    """Shard process: serves catalog calls for the courses hashed to it; replies are (result, events)."""
+    events = []
+    catalog = _ShardCatalog(_Channel(coordinator_conn),
+                            on_promote=lambda username, course_id: events.append(('promote', username, course_id)),
+                            on_change=lambda course_id, enrolled, seats: events.append(('change', course_id, enrolled, seats)))
+    allowed = {'add_course', 'enroll', 'restore', 'unenroll', 'roster', 'waitlist', 'open_courses'}
+
+    def handle(op, args):
+        if op not in allowed:
+            raise ValueError(f"unknown shard op {op}")
+        del events[:]
+        return getattr(catalog, op)(*args), list(events)
+
+    _serve_connections(conns, handle)
+
+class ShardRouter:
+    """Routes enroll/unenroll calls to the shard owning each course, by a stable hash of the course ID.
+
+    One router per process; pass it the connections from ShardedCatalog.client_connections().
+    """
+    def __init__(self, shard_conns, coordinator_conn, on_promote=None, on_change=None):
+        self.shards = [_Channel(conn) for conn in shard_conns]
+        self.coordinator = _Channel(coordinator_conn)
+        self.on_promote = on_promote
+        self.on_change = on_change
+
+    def _channels(self):
+        """Return the (shard channels, coordinator channel) this thread talks through."""
+        return self.shards, self.coordinator
+
+    def shard_for(self, course_id):
+        shards = self._channels()[0]
+        return shards[zlib.crc32(course_id.encode()) % len(shards)]
+
+    def _call(self, course_id, op, *args):
+        result, events = self.shard_for(course_id).call(op, *args)
+        for event in events:
+            if event[0] == 'promote' and self.on_promote:
+                self.on_promote(*event[1:])
+            elif event[0] == 'change' and self.on_change:
+                self.on_change(*event[1:])
+        return result
+
+    def enroll(self, username, course_id, limit=None, waitlist=False):
+        """Same statuses as CourseCatalog.enroll; the limit is checked by the coordinator across shards."""
+        return self._call(course_id, 'enroll', username, course_id, limit, waitlist)
+
+    def restore(self, username, course_id):
+        """Same as CourseCatalog.restore, recorded in the coordinator as well as the shard."""
+        return self._call(course_id, 'restore', username, course_id)
+
+    def unenroll(self, username, course_id):
+        return self._call(course_id, 'unenroll', username, course_id)
+
+    def courses_for(self, username):
+        return self._channels()[1].call('courses_for', username)
+
+    def is_enrolled(self, username, course_id):
+        return course_id in self.courses_for(username)
+
+    def clash(self, username, course_id):
+        return self._channels()[1].call('clash', username, course_id)
+
+class ShardedCatalog(ShardRouter):
+    """Course catalog partitioned by course_id across worker processes, for registration peaks.
+
+    Each shard process runs an ordinary CourseCatalog over its share of the courses, and a
+    coordinator process tracks every student's courses and timetable so limits and clash
+    checks hold across shards. Course details, meetings and prerequisites are mirrored here;
+    rosters, seats and waitlists live only in the shards.
+    extra_clients reserves connections for other processes (see client_connections).
+    threads reserves connections for that many threads of this process: each thread
+    claims its own on first use, so their round trips to the shards overlap instead of
+    queueing on one pipe; any further threads share the first connection.
+    """
+    def __init__(self, courses=None, shards=2, on_promote=None, on_change=None, extra_clients=0, threads=0):
+        import multiprocessing
+        slots = extra_clients + threads + 1
+        coordinator_pipes = [multiprocessing.Pipe() for _ in range(shards + slots)]
+        shard_pipes = [[multiprocessing.Pipe() for _ in range(slots)] for _ in range(shards)]
+        self.processes = [multiprocessing.Process(target=_coordinator_main, name='catalog-coordinator', daemon=True,
+                                                  args=([child for _, child in coordinator_pipes],))]
+        for i in range(shards):
+            self.processes.append(multiprocessing.Process(
+                target=_shard_main, name=f"catalog-shard-{i}", daemon=True,
+                args=([child for _, child in shard_pipes[i]], coordinator_pipes[i][0])))
+        for process in self.processes:
+            process.start()
+        for pipes in [coordinator_pipes] + shard_pipes:
+            for _, child in pipes:
+                child.close()
+        for i in range(shards):
+            coordinator_pipes[i][0].close()  # Now owned by the shard process
+        self._clients = [([shard_pipes[i][k][0] for i in range(shards)], coordinator_pipes[shards + k][0])
+                         for k in range(slots)]
+        super().__init__(*self._clients[0], on_promote=on_promote, on_change=on_change)
+        self._free = deque(([_Channel(conn) for conn in shard_conns], _Channel(coordinator_conn))
+                           for shard_conns, coordinator_conn in self._clients[extra_clients + 1:])
+        self._local = threading.local()
+        self._free_lock = threading.Lock()
+        self.courses = {}  # course_id -> {'name', 'section', 'max_seats', 'credits', 'meetings', 'prerequisites'}
+        self.timetable = Timetable()  # Meetings only; students' timetables live in the coordinator
+        self.prerequisites = PrerequisiteGraph()
+        for course_id, info in (courses or {}).items():
+            self.add_course(course_id, info['name'], info.get('section', 'N/A'), info.get('max_seats', 0),
+                            info.get('credits', Config.DEFAULT_CREDITS), info.get('meetings'), info.get('prerequisites'))
+            for username in info.get('students', []):
+                self.enroll(username, course_id)
+
+    def client_connections(self, index):
+        """Return (shard_conns, coordinator_conn) for extra client number index, to build a ShardRouter."""
+        return self._clients[index + 1]
+
+    def _channels(self):
+        channels = getattr(self._local, 'channels', None)
+        if channels is None:
+            with self._free_lock:
+                channels = self._free.popleft() if self._free else (self.shards, self.coordinator)
+            self._local.channels = channels
+        return channels
+
+    def __contains__(self, course_id):
+        return course_id in self.courses
+
+    def __getitem__(self, course_id):
+        return self.courses[course_id]
+
+    def __len__(self):
+        return len(self.courses)
+
+    def get(self, course_id, default=None):
+        return self.courses.get(course_id, default)
+
+    def add_course(self, course_id, name, section='N/A', max_seats=0, credits=Config.DEFAULT_CREDITS,
+                   meetings=None, prerequisites=None):
+        """Add a course section to its shard, or update its details if it already exists."""
+        meetings = list(meetings or ())
+        prerequisites = sorted(set(prerequisites or ()))
+        intervals = Timetable.intervals(meetings)
+        self.prerequisites.set(course_id, prerequisites)
+        error = self._channels()[1].call('set_meetings', course_id, intervals)
+        if error:
+            self.prerequisites.set(course_id, self.courses.get(course_id, {}).get('prerequisites', ()))
+            raise ValueError(error)
+        self.timetable.set_meetings(course_id, intervals)
+        self._call(course_id, 'add_course', course_id, name, section, max_seats, credits)
+        course = self.courses[course_id] = {'name': name, 'section': section, 'max_seats': max_seats, 'credits': credits,
+                                            'meetings': meetings, 'prerequisites': prerequisites}
+        return course
+
+    def missing_prerequisites(self, course_id, passed):
+        return self.prerequisites.missing(course_id, self.prerequisites.mask(passed))
+
+    def roster(self, course_id):
+        return self._call(course_id, 'roster', course_id)
+
+    def waitlist(self, course_id):
+        return self._call(course_id, 'waitlist', course_id)
+
+    def open_courses(self, min_seats=1):
+        open_ids = set()
+        for shard in self._channels()[0]:
+            open_ids |= shard.call('open_courses', min_seats)[0]
+        return open_ids
+
+    def close(self):
+        """Stop the worker processes; the store, not the shards, holds the durable enrollments."""
+        for shard_conns, coordinator_conn in self._clients:
+            for conn in shard_conns + [coordinator_conn]:
+                conn.close()
+        for process in self.processes:
+            process.terminate()
+            process.join()
+
+# Storage backends for users, enrollments, academic records and salary slips
+class SalaryLedger:
+    """Append-only salary slips partitioned by month, indexed by (username, month).
+
+    Each teacher's months are kept sorted, so range and page queries bisect to the
+    requested slice instead of scanning the teacher's whole history.
+    """
+    def __init__(self):
+        self.partitions = {}  # 'YYYY-MM' -> {username: (gross, deductions, net)}
+        self.months = {}      # username -> sorted months with a slip
+
+    def append(self, rows):
+        """Add (username, month, gross, deductions, net) rows, skipping slips already issued; returns the count added."""
+        added = 0
+        for username, month, gross, deductions, net in rows:
+            partition = self.partitions.setdefault(month, {})
+            if username in partition:
+                continue
+            partition[username] = (gross, deductions, net)
+            months = self.months.setdefault(username, [])
+            if not months or months[-1] < month:
+                months.append(month)
+            else:
+                insort(months, month)
+            added += 1
+        return added
+
+    def _span(self, username, start, end):
+        months = self.months.get(username, [])
+        lo = bisect_left(months, start) if start else 0
+        hi = bisect_right(months, end) if end else len(months)
+        return months, lo, hi
+
+    def query(self, username, start=None, end=None, offset=0, limit=None):
+        """Return slips between start and end (inclusive 'YYYY-MM'), newest first, skipping offset."""
+        months, lo, hi = self._span(username, start, end)
+        hi = max(lo, hi - offset)
+        lo = lo if limit is None else max(lo, hi - limit)
+        slips = []
+        for month in reversed(months[lo:hi]):
+            gross, deductions, net = self.partitions[month][username]
+            slips.append({'month': month, 'gross': gross, 'deductions': deductions, 'amount': net})
+        return slips
+
+    def count(self, username, start=None, end=None):
+        _, lo, hi = self._span(username, start, end)
+        return hi - lo
+
+    def issued(self, month):
+        """Return the usernames that already have a slip for the month."""
+        return set(self.partitions.get(month, ()))
+
+class UserRecord:
+    """Compact user row; role strings are interned so every user shares one copy."""
+    __slots__ = ('role', 'name', 'password', 'qualification')
+
+    def __init__(self, info):
+        self.role = sys.intern(info['role'])
+        self.name = info['name']
+        self.password = info['password']
+        self.qualification = info.get('qualification')
+
+    def as_dict(self):
+        info = {'role': self.role, 'name': self.name, 'password': self.password}
+        if self.qualification is not None:
+            info['qualification'] = self.qualification
+        return info
+
+class AcademicRecord:
+    """Compact per-course record; grades stay None until the first one is entered."""
+    __slots__ = ('course_id', 'semester', 'grades', 'cgpa')
+
+    def __init__(self, course_id, semester):
+        self.course_id = sys.intern(course_id)
+        self.semester = semester
+        self.grades = None  # array('d') once graded
+        self.cgpa = 0.0
+
+    def as_dict(self):
+        return {'course_id': self.course_id, 'semester': self.semester,
+                'grades': list(self.grades or ()), 'cgpa': self.cgpa}
+
+class MemoryStore:
+    """In-memory storage backend holding compact UserRecord / AcademicRecord rows.
+
+    Readers get plain dicts built on demand, so callers see the same shapes as from SQLiteStore.
+    Scans walk a snapshot of the top-level dicts, since server ops run them on executor
+    threads while the event loop keeps adding and removing users' rows.
+    """
+    def __init__(self, users=None):
+        self.users = {}    # username -> UserRecord
+        self.records = {}  # username -> [AcademicRecord]
+        self.salaries = SalaryLedger()
+        self.add_users((users or {}).items())
+
+    def get_user(self, username):
+        """Return the user's info dict, or None."""
+        user = self.users.get(username)
+        return user.as_dict() if user is not None else None
+
+    def has_user(self, username):
+        return username in self.users
+
+    def add_user(self, username, info):
+        self.users[username] = UserRecord(info)
+
+    def add_users(self, rows):
+        """Add many (username, info) pairs."""
+        for username, info in rows:
+            self.users[username] = UserRecord(info)
+
+    def update_user(self, username, **fields):
+        user = self.users[username]
+        for field in UserRecord.__slots__:
+            if field in fields:
+                setattr(user, field, sys.intern(fields[field]) if field == 'role' else fields[field])
+
+    def iter_users(self, role=None):
+        """Yield (username, info) pairs, optionally filtered by role."""
+        for username, user in list(self.users.items()):
+            if role is None or user.role == role:
+                yield username, user.as_dict()
+
+    def count_by_role(self):
+        counts = {}
+        for user in list(self.users.values()):
+            counts[user.role] = counts.get(user.role, 0) + 1
+        return counts
+
+    def _record(self, username, course_id):
+        for rec in self.records.get(username, ()):
+            if rec.course_id == course_id:
+                return rec
+        return None
+
+    def get_records(self, username):
+        """Return the student's academic records as dicts ordered by semester."""
+        return [rec.as_dict() for rec in sorted(self.records.get(username, ()), key=lambda r: r.semester)]
+
+    def add_enrollment(self, username, course_id, semester):
+        self.remove_enrollment(username, course_id)
+        self.records.setdefault(username, []).append(AcademicRecord(course_id, semester))
+
+    def add_enrollments(self, rows):
+        """Add many (username, course_id, semester) enrollments."""
+        for username, course_id, semester in rows:
+            self.add_enrollment(username, course_id, semester)
+
+    def remove_enrollment(self, username, course_id):
+        """Remove an enrollment and its grades; returns how many grades were dropped."""
+        rec = self._record(username, course_id)
+        if rec is None:
+            return 0
+        records = self.records[username]
+        records.remove(rec)
+        if not records:
+            del self.records[username]
+        return len(rec.grades or ())
+
+    def iter_enrollments(self):
+        """Yield (username, course_id) for every enrollment."""
+        for username, records in list(self.records.items()):
+            for rec in records:
+                yield username, rec.course_id
+
+    def iter_enrollment_results(self):
+        """Yield (username, course_id, cgpa) for every enrollment, grouped by student; cgpa is None until graded."""
+        for username, records in list(self.records.items()):
+            for rec in records:
+                yield username, rec.course_id, rec.cgpa if rec.grades else None
+
+    def iter_grade_rows(self):
+        """Yield (username, course_id, semester, grade) for every grade entered."""
+        for username, records in list(self.records.items()):
+            for rec in records:
+                for grade in rec.grades or ():
+                    yield username, rec.course_id, rec.semester, grade
+
+    def grade_columns(self):
+        """Return every record as columns for bulk loading, grades packed as float64 bytes.
+
+        (usernames, records per user, course_id per record, semester per record,
+        grades per record, grades) with each record's grades in entry order.
+        """
+        items = list(self.records.items())
+        usernames = [username for username, _ in items]
+        records = [rec for _, recs in items for rec in recs]
+        grades = [rec.grades or b'' for rec in records]
+        return (usernames, [len(recs) for _, recs in items], [rec.course_id for rec in records],
+                array('l', [rec.semester for rec in records]), array('l', map(len, grades)), b''.join(grades))
+
+    def count_grades(self):
+        return sum(len(rec.grades or ()) for records in list(self.records.values()) for rec in records)
+
+    def add_grade(self, username, course_id, grade, cgpa):
+        rec = self._record(username, course_id)
+        if rec.grades is None:
+            rec.grades = array('d')
+        rec.grades.append(grade)
+        rec.cgpa = cgpa
+
+    def add_grades(self, course_id, rows):
+        """Record many (username, grade, cgpa) grades for one course."""
+        for username, grade, cgpa in rows:
+            self.add_grade(username, course_id, grade, cgpa)
+
+    def graded_records(self, usernames):
+        """Yield (username, course_id, cgpa) for each graded record of the given students."""
+        for username in usernames:
+            for rec in self.records.get(username, ()):
+                if rec.grades:
+                    yield username, rec.course_id, rec.cgpa
+
+    def add_salary_slips(self, rows):
+        """Append (username, month, gross, deductions, net) slips; returns how many were new."""
+        return self.salaries.append(rows)
+
+    def salary_slips(self, username, start=None, end=None, offset=0, limit=None):
+        return self.salaries.query(username, start, end, offset, limit)
+
+    def count_salary_slips(self, username, start=None, end=None):
+        return self.salaries.count(username, start, end)
+
+    def salary_usernames(self, month):
+        return self.salaries.issued(month)
+
+    @contextmanager
+    def batch(self):
+        """Group writes; a no-op for the in-memory backend."""
+        yield self
+
+    def close(self):
+        pass
+
+class SQLiteStore:
+    """SQLite storage backend in WAL mode; rows are read on demand, never preloaded."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY, role TEXT NOT NULL, name TEXT NOT NULL,
+            password TEXT NOT NULL, qualification TEXT);
+        CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+        CREATE TABLE IF NOT EXISTS enrollments (
+            username TEXT NOT NULL, course_id TEXT NOT NULL, semester INTEGER NOT NULL,
+            cgpa REAL NOT NULL DEFAULT 0.0, PRIMARY KEY (username, course_id));
+        CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments(course_id);
+        CREATE TABLE IF NOT EXISTS grades (
+            id INTEGER PRIMARY KEY, username TEXT NOT NULL, course_id TEXT NOT NULL, grade REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS idx_grades_record ON grades(username, course_id);
+        CREATE INDEX IF NOT EXISTS idx_grades_course ON grades(course_id);
+        CREATE TABLE IF NOT EXISTS salary_slips (
+            username TEXT NOT NULL, month TEXT NOT NULL, gross REAL NOT NULL, deductions REAL NOT NULL,
+            net REAL NOT NULL, PRIMARY KEY (username, month)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_salary_month ON salary_slips(month);
+    """
+    USER_FIELDS = ('role', 'name', 'password', 'qualification')
+    VERSION = 1  # Kept in PRAGMA user_version; 1 = every password is hashed
+
+    def __init__(self, path=None):
+        self.path = path or Config.DB_PATH
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            self.conn.execute(sql, params)
+            if not self._batch_depth:
+                self.conn.commit()
+
+    def _user_info(self, row):
+        info = {'role': row['role'], 'name': row['name'], 'password': row['password']}
+        if row['qualification'] is not None:
+            info['qualification'] = row['qualification']
+        return info
+
+    def get_user(self, username):
+        """Return the user's info dict, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._user_info(row) if row else None
+
+    def has_user(self, username):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def add_user(self, username, info):
+        self._write("INSERT INTO users (username, role, name, password, qualification) VALUES (?, ?, ?, ?, ?)",
+                    (username, info['role'], info['name'], info['password'], info.get('qualification')))
+
+    def add_users(self, rows):
+        """Add many (username, info) pairs in a single statement."""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO users (username, role, name, password, qualification) VALUES (?, ?, ?, ?, ?)",
+                ((u, i['role'], i['name'], i['password'], i.get('qualification')) for u, i in rows))
+            if not self._batch_depth:
+                self.conn.commit()
+
+    def update_user(self, username, **fields):
+        columns = [f for f in fields if f in self.USER_FIELDS]
+        if columns:
+            self._write(f"UPDATE users SET {', '.join(f'{c} = ?' for c in columns)} WHERE username = ?",
+                        [fields[c] for c in columns] + [username])
+
+    def _stream(self, sql, params=(), size=1000):
+        """Yield rows from a query in chunks instead of fetching them all at once."""
+        cursor = self.conn.cursor()
+        with self._lock:
+            cursor.execute(sql, params)
+            rows = cursor.fetchmany(size)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(size)
+
+    def iter_users(self, role=None):
+        """Yield (username, info) pairs, optionally filtered by role, streaming from the database."""
+        if role is None:
+            rows = self._stream("SELECT * FROM users ORDER BY rowid")
+        else:
+            rows = self._stream("SELECT * FROM users WHERE role = ? ORDER BY rowid", (role,))
+        for row in rows:
+            yield row['username'], self._user_info(row)
+
+    def count_by_role(self):
+        with self._lock:
+            return {row[0]: row[1] for row in self.conn.execute("SELECT role, COUNT(*) FROM users GROUP BY role")}
+
+    def get_version(self):
+        with self._lock:
+            return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def set_version(self, version):
+        with self._lock:
+            self.conn.execute(f"PRAGMA user_version = {int(version)}")
+
+    def get_records(self, username):
+        """Return the student's academic records ordered by semester."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT course_id, semester, cgpa FROM enrollments WHERE username = ? ORDER BY semester", (username,)).fetchall()
+            grades = self.conn.execute(
+                "SELECT course_id, grade FROM grades WHERE username = ? ORDER BY id", (username,)).fetchall()
+        records = {row['course_id']: {'course_id': row['course_id'], 'semester': row['semester'], 'grades': [], 'cgpa': row['cgpa']}
+                   for row in rows}
+        for row in grades:
+            if row['course_id'] in records:
+                records[row['course_id']]['grades'].append(row['grade'])
+        return list(records.values())
+
+    def add_enrollment(self, username, course_id, semester):
+        self._write("INSERT OR REPLACE INTO enrollments (username, course_id, semester) VALUES (?, ?, ?)",
+                    (username, course_id, semester))
+
+    def add_enrollments(self, rows):
+        """Add many (username, course_id, semester) enrollments in a single statement."""
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO enrollments (username, course_id, semester) VALUES (?, ?, ?)", rows)
+            if not self._batch_depth:
+                self.conn.commit()
+
+    def remove_enrollment(self, username, course_id):
+        """Remove an enrollment and its grades; returns how many grades were dropped."""
+        with self.batch():
+            self._write("DELETE FROM enrollments WHERE username = ? AND course_id = ?", (username, course_id))
+            return self.conn.execute("DELETE FROM grades WHERE username = ? AND course_id = ?", (username, course_id)).rowcount
+
+    def iter_enrollments(self):
+        """Yield (username, course_id) for every enrollment."""
+        for row in self._stream("SELECT username, course_id FROM enrollments"):
+            yield row[0], row[1]
+
+    def iter_enrollment_results(self):
+        """Yield (username, course_id, cgpa) for every enrollment, grouped by student; cgpa is None until graded."""
+        for row in self._stream(
+                "SELECT username, course_id, CASE WHEN EXISTS (SELECT 1 FROM grades g WHERE g.username = e.username "
+                "AND g.course_id = e.course_id) THEN cgpa END FROM enrollments e ORDER BY username", size=10000):
+            yield row[0], row[1], row[2]
+
+    def iter_grade_rows(self):
+        """Yield (username, course_id, semester, grade) for every grade entered, in entry order."""
+        yield from self._stream(
+            "SELECT g.username, g.course_id, e.semester, g.grade FROM grades g "
+            "JOIN enrollments e ON e.username = g.username AND e.course_id = g.course_id ORDER BY g.id", size=10000)
+
+    def grade_columns(self):
+        """Same columns as MemoryStore.grade_columns, with one record per grade row."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT g.username, g.course_id, e.semester, g.grade FROM grades g "
+                "JOIN enrollments e ON e.username = g.username AND e.course_id = g.course_id "
+                "ORDER BY g.username, g.id").fetchall()
+        if not rows:
+            return [], [], [], array('l'), array('l'), b''
+        users, course_ids, semesters, grades = zip(*rows)
+        runs = [(username, len(list(group))) for username, group in groupby(users)]
+        return ([username for username, _ in runs], [n for _, n in runs], list(course_ids), array('l', semesters),
+                array('l', repeat(1, len(rows))), array('d', grades).tobytes())
+
+    def count_grades(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+
+    def add_grade(self, username, course_id, grade, cgpa):
+        with self.batch():
+            self._write("INSERT INTO grades (username, course_id, grade) VALUES (?, ?, ?)", (username, course_id, grade))
+            self._write("UPDATE enrollments SET cgpa = ? WHERE username = ? AND course_id = ?", (cgpa, username, course_id))
+
+    def add_grades(self, course_id, rows):
+        """Record many (username, grade, cgpa) grades for one course in a single transaction."""
+        with self.batch():
+            self.conn.executemany("INSERT INTO grades (username, course_id, grade) VALUES (?, ?, ?)",
+                                  [(username, course_id, grade) for username, grade, _ in rows])
+            self.conn.executemany("UPDATE enrollments SET cgpa = ? WHERE username = ? AND course_id = ?",
+                                  [(cgpa, username, course_id) for username, _, cgpa in rows])
+
+    def graded_records(self, usernames, chunk=500):
+        """Yield (username, course_id, cgpa) for each graded record of the given students."""
+        for batch in batched(usernames, chunk):
+            marks = ','.join('?' * len(batch))
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT username, course_id, cgpa FROM enrollments e WHERE username IN ({marks}) AND EXISTS "
+                    "(SELECT 1 FROM grades g WHERE g.username = e.username AND g.course_id = e.course_id)", batch).fetchall()
+            for row in rows:
+                yield row[0], row[1], row[2]
+
+    def add_salary_slips(self, rows):
+        """Append (username, month, gross, deductions, net) slips, ignoring ones already issued; returns how many were new."""
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO salary_slips (username, month, gross, deductions, net) VALUES (?, ?, ?, ?, ?)", rows)
+            if not self._batch_depth:
+                self.conn.commit()
+            return self.conn.total_changes - before
+
+    def salary_slips(self, username, start=None, end=None, offset=0, limit=None):
+        """Return slips between start and end (inclusive 'YYYY-MM'), newest first, read through the primary key."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT month, gross, deductions, net FROM salary_slips WHERE username = ? AND month BETWEEN ? AND ? "
+                "ORDER BY month DESC LIMIT ? OFFSET ?",
+                (username, start or '', end or '9999-12', -1 if limit is None else limit, offset)).fetchall()
+        return [{'month': row[0], 'gross': row[1], 'deductions': row[2], 'amount': row[3]} for row in rows]
+
+    def count_salary_slips(self, username, start=None, end=None):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM salary_slips WHERE username = ? AND month BETWEEN ? AND ?",
+                                     (username, start or '', end or '9999-12')).fetchone()[0]
+
+    def salary_usernames(self, month):
+        """Return the usernames that already have a slip for the month."""
+        return {row[0] for row in self._stream("SELECT username FROM salary_slips WHERE month = ?", (month,))}
+
+    @contextmanager
+    def batch(self):
+        """Group writes into a single transaction, committed when the outermost batch exits."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.conn.rollback()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+# Write-ahead log and snapshots for the in-memory backend
+class WriteAheadLog:
+    """Append-only binary log of store mutations, written and fsynced in groups by a background thread.
+
+    Each frame is an (lsn, length, crc32) header followed by the pickled record. Reading
+    stops at the first torn or corrupt frame, which is where a crash cut a write short.
+    """
+    HEADER = struct.Struct('<QII')
+
+    def __init__(self, path, next_lsn=1, flush_interval=Config.WAL_FLUSH_INTERVAL, group_size=Config.WAL_GROUP_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.group_size = group_size
+        self.next_lsn = next_lsn
+        self.durable_lsn = next_lsn - 1
+        self.since_snapshot = 0
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0  # Bytes logged, including unwritten frames
+        self._buffer = []
+        self._lock = threading.Lock()        # Guards the buffer and LSN counters
+        self._write_lock = threading.Lock()  # Serializes writes to the file
+        self._durable = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._file = open(path, 'ab')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='wal-writer', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def scan(cls, path):
+        """Yield (lsn, record, end offset) for every intact frame, stopping at a torn or corrupt one."""
+        with open(path, 'rb') as f:
+            data = memoryview(f.read())
+        pos, size = 0, cls.HEADER.size
+        while pos + size <= len(data):
+            lsn, length, crc = cls.HEADER.unpack_from(data, pos)
+            payload = data[pos + size:pos + size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            pos += size + length
+            yield lsn, pickle.loads(payload), pos
+
+    def append(self, record):
+        """Queue a record for the next group write; returns its lsn."""
+        payload = pickle.dumps(record, protocol=5)
+        with self._lock:
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            self._buffer.append(self.HEADER.pack(lsn, len(payload), zlib.crc32(payload)) + payload)
+            self.since_snapshot += 1
+            self.size += self.HEADER.size + len(payload)
+            pending = len(self._buffer)
+        if pending >= self.group_size:
+            self._wakeup.set()
+        return lsn
+
+    def wait(self, lsn):
+        """Block until the frame with this lsn is on disk; one fsync covers every writer waiting on it."""
+        with self._lock:
+            while self.durable_lsn < lsn:
+                self._wakeup.set()
+                self._durable.wait()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.sync()
+
+    def sync(self):
+        """Write every pending frame as one group and fsync it."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                last = self.next_lsn - 1
+            if batch:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            with self._lock:
+                self.durable_lsn = max(self.durable_lsn, last)
+                self._durable.notify_all()
+
+    def mark(self):
+        """Return (last lsn, bytes logged through it, frames since the last snapshot) for a snapshot to cover."""
+        with self._lock:
+            return self.next_lsn - 1, self.size, self.since_snapshot
+
+    def discard(self, offset, frames):
+        """Drop the first offset bytes once a snapshot covers them, keeping the frames logged since."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                last = self.next_lsn - 1
+            self._file.write(b''.join(batch))
+            self._file.flush()
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            fsync_directory(self.path)
+            self._file = open(self.path, 'ab')
+            with self._lock:
+                self.size -= offset
+                self.since_snapshot -= frames
+                self.durable_lsn = max(self.durable_lsn, last)
+                self._durable.notify_all()
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.sync()
+        self._file.close()
+
+@contextmanager
+def gc_paused():
+    """Suspend cycle collection while building or walking millions of rows at once.
+
+    Those loops only allocate, so the collector's repeated passes over the new objects
+    find nothing yet roughly double the time taken.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+def fsync_directory(path):
+    """Make a rename in path's directory durable, where the platform allows it."""
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+class JournaledStore(MemoryStore):
+    """MemoryStore made durable by a write-ahead log plus periodic compact snapshots.
+
+    Each mutation is applied in memory and appended to the WAL under one lock, so log
+    order matches apply order; reads never touch the disk. Opening the store loads the
+    latest snapshot and replays the WAL frames written after it. Snapshots are written by
+    a background thread once SNAPSHOT_EVERY frames have been logged, never by the writer
+    that crossed the threshold.
+    """
+    APPLY = {
+        'add_user': MemoryStore.add_user,
+        'add_users': MemoryStore.add_users,
+        'update_user': lambda store, username, fields: MemoryStore.update_user(store, username, **fields),
+        'add_enrollment': MemoryStore.add_enrollment,
+        'add_enrollments': MemoryStore.add_enrollments,
+        'remove_enrollment': MemoryStore.remove_enrollment,
+        'add_grade': MemoryStore.add_grade,
+        'add_grades': MemoryStore.add_grades,
+        'add_salary_slips': MemoryStore.add_salary_slips,
+        'set_version': lambda store, version: setattr(store, 'version', version),
+    }
+    VERSION = 1  # Kept in the snapshot and WAL like SQLiteStore's user_version; 1 = every password is hashed
+
+    def __init__(self, path=Config.JOURNAL_PATH, snapshot_every=Config.SNAPSHOT_EVERY, sync_commit=Config.WAL_SYNC_COMMIT):
+        self._lock = threading.RLock()
+        self._nested = True  # Recovery applies records without logging them again
+        super().__init__()
+        self.path = path
+        self.snapshot_path = path + '.snap'
+        self.snapshot_every = snapshot_every
+        self.sync_commit = sync_commit
+        self.version = 0
+        try:
+            with gc_paused():
+                lsn, replayed = self._recover()
+        finally:
+            self._nested = False
+        self.wal = WriteAheadLog(path + '.wal', lsn + 1)
+        self.wal.since_snapshot = replayed  # The next snapshot also folds in the replayed tail
+        self._snapshot_lock = threading.Lock()  # One snapshot at a time
+        self._snapshot_due = threading.Event()
+        self._closing = False
+        self._snapshotter = threading.Thread(target=self._run_snapshots, name='snapshot-writer', daemon=True)
+        self._snapshotter.start()
+
+    def _recover(self):
+        """Load the latest snapshot and replay the WAL after it, cutting off a torn tail.
+
+        Returns (last lsn, frames replayed).
+        """
+        lsn = self._load_snapshot() if os.path.exists(self.snapshot_path) else 0
+        wal_path = self.path + '.wal'
+        if not os.path.exists(wal_path):
+            return lsn, 0
+        end = replayed = 0
+        for frame_lsn, record, end in WriteAheadLog.scan(wal_path):
+            if frame_lsn > lsn:  # Older frames are already in the snapshot
+                self.APPLY[record[0]](self, *record[1:])
+                lsn = frame_lsn
+                replayed += 1
+        if end < os.path.getsize(wal_path):
+            with open(wal_path, 'r+b') as f:
+                f.truncate(end)
+        return lsn, replayed
+
+    def _apply(self, record):
+        """Apply one mutation and log it; nested calls made by the mutation itself are not logged."""
+        with self._lock:
+            nested, self._nested = self._nested, True
+            try:
+                result = self.APPLY[record[0]](self, *record[1:])
+            finally:
+                self._nested = nested
+            if nested:
+                return result
+            lsn = self.wal.append(record)
+        if self.sync_commit:
+            self.wal.wait(lsn)
+        if self.wal.since_snapshot >= self.snapshot_every:
+            self._snapshot_due.set()
+        return result
+
+    def _run_snapshots(self):
+        while True:
+            self._snapshot_due.wait()
+            self._snapshot_due.clear()
+            if self._closing:
+                return
+            if self.wal.since_snapshot >= self.snapshot_every:
+                try:
+                    self.snapshot()
+                except OSError as e:  # The WAL still holds every frame; retried after the next write
+                    print(f"Snapshot failed: {e}", file=sys.stderr)
+
+    def add_user(self, username, info):
+        self._apply(('add_user', username, dict(info)))
+
+    def add_users(self, rows):
+        self._apply(('add_users', [(username, dict(info)) for username, info in rows]))
+
+    def update_user(self, username, **fields):
+        self._apply(('update_user', username, fields))
+
+    def add_enrollment(self, username, course_id, semester):
+        self._apply(('add_enrollment', username, course_id, semester))
+
+    def add_enrollments(self, rows):
+        self._apply(('add_enrollments', list(rows)))
+
+    def remove_enrollment(self, username, course_id):
+        return self._apply(('remove_enrollment', username, course_id))
+
+    def add_grade(self, username, course_id, grade, cgpa):
+        self._apply(('add_grade', username, course_id, grade, cgpa))
+
+    def add_grades(self, course_id, rows):
+        self._apply(('add_grades', course_id, list(rows)))
+
+    def add_salary_slips(self, rows):
+        return self._apply(('add_salary_slips', list(rows)))
+
+    def get_version(self):
+        return self.version
+
+    def set_version(self, version):
+        if version != self.version:
+            self._apply(('set_version', version))
+
+    def _state(self, lsn):
+        """The whole store as flat columns, which pickle far smaller and faster than row objects."""
+        users, records = self.users, [(username, rec) for username, recs in self.records.items() for rec in recs]
+        grades, counts = array('d'), array('I')
+        for _, rec in records:
+            counts.append(len(rec.grades or ()))
+            if rec.grades:
+                grades.extend(rec.grades)
+        return {
+            'version': 1, 'lsn': lsn, 'user_version': self.version,
+            'users': (list(users), [u.role for u in users.values()], [u.name for u in users.values()],
+                      [u.password for u in users.values()], [u.qualification for u in users.values()]),
+            'records': ([username for username, _ in records], [rec.course_id for _, rec in records],
+                        array('i', (rec.semester for _, rec in records)), array('d', (rec.cgpa for _, rec in records)),
+                        counts, grades),
+            'salaries': [(username, month, *slip) for month, partition in self.salaries.partitions.items()
+                         for username, slip in partition.items()],
+        }
+
+    def _load_snapshot(self):
+        with open(self.snapshot_path, 'rb') as f:
+            state = pickle.load(f)
+        for username, role, name, password, qualification in zip(*state['users']):
+            info = {'role': role, 'name': name, 'password': password}
+            if qualification is not None:
+                info['qualification'] = qualification
+            self.users[username] = UserRecord(info)
+        pos = 0
+        usernames, course_ids, semesters, cgpas, counts, grades = state['records']
+        for username, course_id, semester, cgpa, count in zip(usernames, course_ids, semesters, cgpas, counts):
+            rec = AcademicRecord(course_id, semester)
+            rec.cgpa = cgpa
+            if count:
+                rec.grades = grades[pos:pos + count]
+                pos += count
+            self.records.setdefault(username, []).append(rec)
+        self.salaries.append(state['salaries'])
+        self.version = state.get('user_version', 0)
+        return state['lsn']
+
+    def _write_state(self, state, path):
+        with gc_paused(), open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=5)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def snapshot(self):
+        """Write a snapshot of the whole state, then drop the WAL frames it covers; returns its lsn.
+
+        Where the platform can fork, a child process writes the state from its copy-on-write
+        view of memory, so writers wait only for the fork; elsewhere the state is copied
+        into columns under the lock and pickled outside it.
+        """
+        tmp = self.snapshot_path + '.tmp'
+        with self._snapshot_lock:
+            with self._lock:
+                lsn, offset, frames = self.wal.mark()
+                if hasattr(os, 'fork'):
+                    state, pid = None, os.fork()
+                    if pid == 0:  # Child: write the state as of the fork and leave without any cleanup
+                        status = 1
+                        try:
+                            gc.disable()
+                            self._write_state(self._state(lsn), tmp)
+                            status = 0
+                        finally:
+                            os._exit(status)
+                else:
+                    with gc_paused():
+                        state = self._state(lsn)
+            if state is None:
+                _, status = os.waitpid(pid, 0)
+                if status:
+                    raise OSError(f"snapshot writer exited with status {status}")
+            else:
+                self._write_state(state, tmp)
+            os.replace(tmp, self.snapshot_path)
+            fsync_directory(self.snapshot_path)
+            self.wal.discard(offset, frames)
+        return lsn
+
+    def close(self):
+        """Stop the snapshot thread, then snapshot anything logged since, so the next start replays nothing."""
+        self._closing = True
+        self._snapshot_due.set()
+        self._snapshotter.join()
+        if self.wal.since_snapshot:
+            self.snapshot()
+        self.wal.close()
+
+def open_store(backend=None):
+    """Create the configured storage backend, seeded with INITIAL_USERS when empty and free of plaintext passwords."""
+    backend = backend or Config.STORAGE_BACKEND
+    if backend == 'memory':
+        return MemoryStore(INITIAL_USERS)
+    if backend == 'sqlite':
+        store = SQLiteStore(Config.DB_PATH)
+        if not store.count_by_role():
+            store.add_users(INITIAL_USERS.items())
+        elif store.get_version() < 1:
+            hash_plaintext_passwords(store)
+        store.set_version(SQLiteStore.VERSION)
+        return store
+    if backend == 'journal':
+        store = JournaledStore(Config.JOURNAL_PATH)
+        if not store.users:
+            store.add_users(INITIAL_USERS.items())
+        elif store.get_version() < 1:
+            hash_plaintext_passwords(store)
+        store.set_version(JournaledStore.VERSION)
+        return store
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+# Bulk import pipeline
+def read_rows(path):
+    """Yield (line_number, row dict) from a CSV or JSONL file, one row at a time."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_no, {'_error': f"Invalid JSON: {e}"}
+                    continue
+                yield line_no, row if isinstance(row, dict) else {'_error': "Row is not a JSON object"}
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+def batched(rows, size):
+    """Group an iterable into lists of at most size items."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def validate_user_rows(batch, store):
+    """Split a batch of user rows into (username, info) pairs and (line, username, error) tuples."""
+    valid, errors, seen = [], [], set()
+    for line_no, row in batch:
+        username = str(row.get('username') or '').strip()
+        role = str(row.get('role') or '').strip().lower()
+        name = str(row.get('name') or '').strip()
+        password = str(row.get('password') or '').strip()
+        if '_error' in row:
+            errors.append((line_no, username, row['_error']))
+        elif not username or not name or not password:
+            errors.append((line_no, username, "Missing username, name or password"))
+        elif role not in ('student', 'teacher'):
+            errors.append((line_no, username, f"Invalid role: {role or '(empty)'}"))
+        elif username in seen or store.has_user(username):
+            errors.append((line_no, username, "User already exists"))
+        else:
+            seen.add(username)
+            info = {'role': role, 'name': name, 'password': password}
+            if role == 'teacher':
+                info['qualification'] = str(row.get('qualification') or '').strip()
+            valid.append((username, info))
+    return valid, errors
+
+def hash_user_passwords(valid, pool):
+    """Replace plaintext passwords in validated user rows with hashes, computed in parallel."""
+    plain = [info for _, info in valid if not is_password_hash(info['password'])]
+    for info, stored in zip(plain, pool.map(hash_password, [info['password'] for info in plain])):
+        info['password'] = stored
+
+def hash_plaintext_passwords(store):
+    """One-time migration: hash the passwords a store from before hashing still holds in plaintext.
+
+    Returns how many were hashed; logins never accept a plaintext stored value.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    legacy = [(username, dict(info)) for username, info in store.iter_users() if not is_password_hash(info['password'])]
+    if legacy:
+        with ThreadPoolExecutor() as pool:
+            hash_user_passwords(legacy, pool)
+        with store.batch():
+            for username, info in legacy:
+                store.update_user(username, password=info['password'])
+    return len(legacy)
+
+def validate_enrollment_rows(batch, store, catalog):
+    """Reserve catalog seats for a batch of enrollment rows; returns (enrollments, errors)."""
+    valid, errors = [], []
+    messages = {'invalid': "Invalid course ID", 'limit': "Maximum course enrollment limit reached",
+                'duplicate': "Already enrolled in this course", 'conflict': "Meeting times clash with another enrolled course",
+                'full': "Course section full"}
+    for line_no, row in batch:
+        username = str(row.get('username') or '').strip()
+        course_id = str(row.get('course_id') or '').strip()
+        if '_error' in row:
+            errors.append((line_no, username, row['_error']))
+            continue
+        if not store.has_user(username):
+            errors.append((line_no, username, "User not found"))
+            continue
+        status = catalog.enroll(username, course_id, limit=Config.MAX_ENROLLMENT)
+        if status != 'ok':
+            errors.append((line_no, username, messages[status]))
+            continue
+        valid.append((username, course_id, len(catalog.courses_for(username))))
+    return valid, errors
+
+def parse_grade_text(lines):
+    """Parse pasted 'username,grade' lines (an optional header row is skipped) into row dicts."""
+    rows = [row for row in csv.reader(line.strip() for line in lines) if row]
+    if rows and rows[0][0].strip().lower() == 'username':
+        header = [cell.strip().lower() for cell in rows.pop(0)]
+    else:
+        header = ['username', 'grade']
+    return [dict(zip(header, row)) for row in rows]
+
+def validate_grade_rows(rows, course_id, roster):
+    """Split a section's grade rows into (username, grade) pairs and (line, username, error) tuples."""
+    valid, errors, seen = [], [], set()
+    for line_no, row in rows:
+        if not isinstance(row, dict):
+            errors.append((line_no, '', "Row is not an object"))
+            continue
+        username = str(row.get('username') or '').strip()
+        row_course = str(row.get('course_id') or course_id).strip()
+        if '_error' in row:
+            errors.append((line_no, username, row['_error']))
+            continue
+        if not username:
+            errors.append((line_no, username, "Missing username"))
+            continue
+        if row_course != course_id:
+            errors.append((line_no, username, f"Row is for course {row_course}"))
+            continue
+        if username not in roster:
+            errors.append((line_no, username, "Student is not enrolled in this course"))
+            continue
+        if username in seen:
+            errors.append((line_no, username, "Duplicate grade for student"))
+            continue
+        try:
+            grade = float(row.get('grade'))
+        except (TypeError, ValueError):
+            errors.append((line_no, username, "Invalid grade value"))
+            continue
+        if not 0 <= grade <= 100:
+            errors.append((line_no, username, "Grade must be between 0 and 100"))
+            continue
+        seen.add(username)
+        valid.append((username, grade))
+    return valid, errors
+
+def cumulative_cgpa(records, catalog):
+    """Credit-weighted CGPA per student from (username, course_id, cgpa) rows of graded courses."""
+    points, credits = {}, {}
+    for username, course_id, cgpa in records:
+        weight = catalog.get(course_id, {}).get('credits', Config.DEFAULT_CREDITS)
+        points[username] = points.get(username, 0.0) + cgpa * weight
+        credits[username] = credits.get(username, 0) + weight
+    return {username: round(points[username] / credits[username], 2) if credits[username] else 0.0
+            for username in points}
+
+IMPORT_KINDS = ('users', 'enrollments')
+
+def bulk_import(path, kind='users', batch_size=1000, report_path=None):
+    """Stream users or enrollments from a CSV/JSONL file into the store, committing per batch.
+
+    Plaintext passwords are hashed on a thread pool (the KDF releases the GIL);
+    values that are already password hashes are stored as given.
+    Per-row errors are written to report_path (CSV: line, username, error).
+    Returns a dict with the imported and error counts.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"Unknown import kind {kind!r}")
+    report_path = report_path or f"{path}.errors.csv"
+    imported = failed = 0
+    with open(report_path, 'w', newline='', encoding='utf-8') as report, ThreadPoolExecutor() as pool:
+        writer = csv.writer(report)
+        writer.writerow(['line', 'username', 'error'])
+        for batch in batched(read_rows(path), batch_size):
+            if kind == 'users':
+                valid, errors = validate_user_rows(batch, STORE)
+                hash_user_passwords(valid, pool)
+                with STORE.batch():
+                    STORE.add_users(valid)
+                for _, info in valid:
+                    STATS.user_added(info['role'])
+                DIRECTORY.add_many(valid)
+            else:
+                valid, errors = validate_enrollment_rows(batch, STORE, COURSE_CATALOG)
+                try:
+                    with STORE.batch():
+                        STORE.add_enrollments(valid)
+                except Exception:
+                    for username, course_id, _ in valid:
+                        COURSE_CATALOG.unenroll(username, course_id)
+                    raise
+                SESSIONS.records_changed(*(username for username, _, _ in valid))
+            writer.writerows(errors)
+            imported += len(valid)
+            failed += len(errors)
+    return {'imported': imported, 'errors': failed, 'report': report_path}
+
+# Institution-wide grade analytics
+class GradeAnalytics:
+    """Grade and GPA statistics for every student, computed in one batched NumPy pass.
+
+    Each row is one entered grade. A course record's grade points come from its latest
+    grade (as in Student.enter_cgpa) and are weighted by course credits for GPAs.
+    """
+    PERCENTILES = (10, 25, 50, 75, 90)
+
+    def __init__(self, usernames, course_ids, user_idx, course_idx, semester, grade, credits):
+        import numpy as np
+        self.usernames = usernames
+        self.course_ids = course_ids
+        self._user_codes = None
+        grade = np.asarray(grade, dtype=np.float64)
+        user_idx = np.asarray(user_idx, dtype=np.int64)
+        course_idx = np.asarray(course_idx, dtype=np.int64)
+        semester = np.asarray(semester, dtype=np.int64)
+        credits = np.asarray(credits, dtype=np.float64)
+        n_courses = len(course_ids)
+        thresholds = np.asarray(CGPA_THRESHOLDS, dtype=np.float64)
+        scale = np.asarray(CGPA_POINTS, dtype=np.float64)
+        self.grade_rows = len(grade)
+
+        # Bucket lookup: index of the highest cut-off each grade reaches
+        bucket = np.clip(np.searchsorted(thresholds, grade, side='right') - 1, 0, len(scale) - 1)
+        points = scale[bucket]
+
+        # Latest grade per (student, course) record
+        record_key = user_idx * n_courses + course_idx
+        _, last = np.unique(record_key[::-1], return_index=True)
+        last = len(record_key) - 1 - last
+        r_user, r_course, r_sem = user_idx[last], course_idx[last], semester[last]
+        r_points, r_credits = points[last], credits[course_idx[last]]
+        weighted = r_points * r_credits
+
+        # Credit-weighted GPA per (student, semester) and cumulative per student
+        sem_key = r_user * (int(r_sem.max(initial=0)) + 1) + r_sem
+        sem_keys, sem_inv = np.unique(sem_key, return_inverse=True)
+        self.semester_gpa = np.bincount(sem_inv, weights=weighted) / np.bincount(sem_inv, weights=r_credits)
+        self.semester_user = r_user[np.unique(sem_inv, return_index=True)[1]]
+        self.semester_number = sem_keys - self.semester_user * (int(r_sem.max(initial=0)) + 1)
+        graded_users, user_inv = np.unique(r_user, return_inverse=True)
+        self.graded_users = graded_users
+        self.cumulative_gpa = np.bincount(user_inv, weights=weighted) / np.bincount(user_inv, weights=r_credits)
+
+        # Per-course means and grade distributions over all grade rows
+        self.course_counts = np.bincount(course_idx, minlength=n_courses)
+        sums = np.bincount(course_idx, weights=grade, minlength=n_courses)
+        self.course_means = np.divide(sums, self.course_counts, out=np.zeros(n_courses), where=self.course_counts > 0)
+        self.course_distribution = np.bincount(course_idx * len(scale) + bucket,
+                                               minlength=n_courses * len(scale)).reshape(n_courses, len(scale))
+
+        pct = list(self.PERCENTILES)
+        self.gpa_percentiles = dict(zip(pct, np.percentile(self.cumulative_gpa, pct).tolist())) if len(graded_users) else {}
+        self.grade_percentiles = dict(zip(pct, np.percentile(grade, pct).tolist())) if len(grade) else {}
+        self.mean_gpa = float(self.cumulative_gpa.mean()) if len(graded_users) else 0.0
+
+    @classmethod
+    def from_store(cls, store=None, catalog=None):
+        """Load every grade row from the store's columnar export, interning course IDs to integer codes."""
+        import numpy as np
+        store = store or STORE
+        catalog = catalog or COURSE_CATALOG
+        with gc_paused():
+            usernames, user_counts, record_courses, semesters, grade_counts, grades = store.grade_columns()
+        course_ids = list(dict.fromkeys(record_courses))
+        codes = {course_id: i for i, course_id in enumerate(course_ids)}
+        grade_counts = np.frombuffer(grade_counts, dtype=grade_counts.typecode)
+        users = np.repeat(np.repeat(np.arange(len(usernames)), user_counts), grade_counts)
+        courses = np.repeat(np.fromiter(map(codes.__getitem__, record_courses), np.int64, len(record_courses)), grade_counts)
+        sems = np.repeat(np.frombuffer(semesters, dtype=semesters.typecode), grade_counts)
+        credits = [catalog.get(c, {}).get('credits', Config.DEFAULT_CREDITS) for c in course_ids]
+        return cls(usernames, course_ids, users, courses, sems, np.frombuffer(grades, dtype=np.float64), credits)
+
+    def student_gpa(self, username):
+        """Return (cumulative GPA, {semester: GPA}) for one student, or None if ungraded."""
+        import numpy as np
+        if self._user_codes is None:
+            self._user_codes = {u: i for i, u in enumerate(self.usernames)}
+        code = self._user_codes.get(username)
+        if code is None:
+            return None
+        pos = np.searchsorted(self.graded_users, code)
+        if pos >= len(self.graded_users) or self.graded_users[pos] != code:
+            return None
+        mask = self.semester_user == code
+        return float(self.cumulative_gpa[pos]), dict(zip(self.semester_number[mask].tolist(), self.semester_gpa[mask].tolist()))
+
+    def course_report(self):
+        """Return [(course_id, grade count, mean grade, {CGPA points: count})] per course."""
+        report = []
+        for i, course_id in enumerate(self.course_ids):
+            dist = {CGPA_POINTS[b]: int(n) for b, n in enumerate(self.course_distribution[i]) if n}
+            report.append((course_id, int(self.course_counts[i]), float(self.course_means[i]), dist))
+        return report
+
+# Monthly payroll
+def month_offset(month, delta):
+    """Return the 'YYYY-MM' month delta months after (or before) the given one."""
+    year, mon = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + delta, 12)
+    return f"{year:04d}-{mon + 1:02d}"
+
+def run_payroll(month=None, store=None):
+    """Issue the month's slip for every teacher who lacks one, computed in one NumPy pass; returns slips issued."""
+    import numpy as np
+    store = store or STORE
+    month = month or datetime.now().strftime('%Y-%m')
+    issued = store.salary_usernames(month)
+    usernames, allowances = [], []
+    for username, info in store.iter_users(role='teacher'):
+        if username not in issued:
+            usernames.append(username)
+            allowances.append(Config.PAYROLL_ALLOWANCES.get((info.get('qualification') or '').strip().lower(), 0.0))
+    if not usernames:
+        return 0
+
+    gross = Config.PAYROLL_BASE_SALARY * (1 + np.asarray(allowances, dtype=np.float64))
+    floors = np.asarray([floor for floor, _ in Config.PAYROLL_TAX_BRACKETS], dtype=np.float64)
+    rates = np.asarray([rate for _, rate in Config.PAYROLL_TAX_BRACKETS], dtype=np.float64)
+    widths = np.append(floors[1:], np.inf) - floors
+    deductions = (np.clip(gross[:, None] - floors, 0, widths) * rates).sum(axis=1)
+    net = gross - deductions
+    with store.batch():
+        return store.add_salary_slips(zip(usernames, repeat(month), gross.round(2).tolist(),
+                                          deductions.round(2).tolist(), net.round(2).tolist()))
+
+# Password hashing and login throttling
+def hash_password(password, kdf=None, cost=None):
+    """Hash a password with a random salt; returns a self-describing string.
+
+    scrypt hashes look like 'scrypt$n$r$p$salt$hash'; PBKDF2 hashes like
+    'pbkdf2_sha256$iterations$salt$hash'. cost overrides SCRYPT_N or PBKDF2_ITERATIONS.
+    """
+    kdf = kdf or Config.KDF
+    salt = os.urandom(16)
+    if kdf == 'scrypt':
+        n, r, p = cost or Config.SCRYPT_N, Config.SCRYPT_R, Config.SCRYPT_P
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * n * r * 2)
+        return f"scrypt${n}${r}${p}${salt.hex()}${digest.hex()}"
+    if kdf == 'pbkdf2_sha256':
+        iterations = cost or Config.PBKDF2_ITERATIONS
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+        return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+    raise ValueError(f"Unknown KDF: {kdf}")
+
+def is_password_hash(stored):
+    """Check whether a stored value is a hash rather than a legacy plaintext password."""
+    return stored.startswith(('scrypt$', 'pbkdf2_sha256$'))
+
+def verify_password(password, stored):
+    """Check a password against a stored hash in constant time; a stored value that is not a hash never matches."""
+    if not is_password_hash(stored):
+        return False
+    parts = stored.split('$')
+    if parts[0] == 'scrypt':
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        digest = hashlib.scrypt(password.encode(), salt=bytes.fromhex(parts[4]), n=n, r=r, p=p, maxmem=128 * n * r * 2)
+        return hmac.compare_digest(digest, bytes.fromhex(parts[5]))
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(parts[2]), int(parts[1]))
+    return hmac.compare_digest(digest, bytes.fromhex(parts[3]))
+
+def needs_rehash(stored):
+    """Check whether a stored hash uses outdated KDF settings (or is not a hash at all)."""
+    if not is_password_hash(stored):
+        return True
+    parts = stored.split('$')
+    if Config.KDF == 'scrypt':
+        return parts[0] != 'scrypt' or parts[1:4] != [str(Config.SCRYPT_N), str(Config.SCRYPT_R), str(Config.SCRYPT_P)]
+    return parts[0] != Config.KDF or parts[1] != str(Config.PBKDF2_ITERATIONS)
+
+class CredentialManager:
+    """Verifies passwords through a bounded cache of recent successes and throttles repeated failures."""
+    def __init__(self, cache_size=Config.CREDENTIAL_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._key = os.urandom(32)   # Per-process key; cached entries never hold the password itself
+        self._cache = OrderedDict()  # username -> (stored hash, HMAC of the verified password)
+        self._failures = {}          # ('user' | 'source', name) -> deque of failure times
+        self._lock = threading.Lock()
+
+    def _tag(self, password):
+        return hmac.new(self._key, password.encode(), hashlib.sha256).digest()
+
+    def _recent_failures(self, key, now):
+        times = self._failures.get(key)
+        if not times:
+            return 0
+        while times and now - times[0] > Config.LOGIN_FAILURE_WINDOW:
+            times.popleft()
+        if not times:
+            del self._failures[key]
+        return len(times)
+
+    def is_throttled(self, username, source='local'):
+        """Check whether a user or source has too many recent failed attempts."""
+        now = time.monotonic()
+        with self._lock:
+            return (self._recent_failures(('user', username), now) >= Config.LOGIN_MAX_USER_FAILURES
+                    or self._recent_failures(('source', source), now) >= Config.LOGIN_MAX_SOURCE_FAILURES)
+
+    def record_failure(self, username, source='local'):
+        now = time.monotonic()
+        with self._lock:
+            for key in (('user', username), ('source', source)):
+                self._failures.setdefault(key, deque()).append(now)
+            if len(self._failures) > 10 * self.cache_size:
+                for key in list(self._failures):
+                    self._recent_failures(key, now)
+
+    def verify(self, username, password, stored, source='local'):
+        """Verify a login attempt. Returns 'ok', 'invalid' or 'throttled'."""
+        if self.is_throttled(username, source):
+            return 'throttled'
+        tag = self._tag(password)
+        with self._lock:
+            entry = self._cache.get(username)
+            if entry and entry[0] == stored and hmac.compare_digest(entry[1], tag):
+                self._cache.move_to_end(username)
+                return 'ok'
+        if not verify_password(password, stored):
+            self.record_failure(username, source)
+            return 'invalid'
+        with self._lock:
+            self._failures.pop(('user', username), None)
+        self._remember(username, stored, tag)
+        return 'ok'
+
+    def _remember(self, username, stored, tag):
+        with self._lock:
+            self._cache[username] = (stored, tag)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def upgrade(self, username, password, stored):
+        """Rehash a verified password stored with old KDF settings; returns the stored value."""
+        if not needs_rehash(stored):
+            return stored
+        stored = self.set_password(username, password)
+        self._remember(username, stored, self._tag(password))
+        return stored
+
+    def set_password(self, username, new_password):
+        """Hash and store a new password, dropping any cached verification."""
+        stored = hash_password(new_password)
+        STORE.update_user(username, password=stored)
+        self.invalidate(username)
+        SESSIONS.invalidate(username)
+        return stored
+
+    def invalidate(self, username):
+        with self._lock:
+            self._cache.pop(username, None)
+
+CREDENTIALS = CredentialManager()
+
+# Session tokens and cached user objects
+class CachedUser:
+    """A cached user profile with its lazily built user object and academic records."""
+    __slots__ = ('role', 'name', 'password', 'user', 'records', 'version', 'sessions', 'last_used')
+
+    def __init__(self, info):
+        self.role, self.name, self.password = info['role'], info['name'], info['password']
+        self.user = None
+        self.records = None
+        self.version = 0   # Bumped whenever the cached records go stale
+        self.sessions = 0  # Open session tokens; entries in use are never evicted
+        self.last_used = time.monotonic()
+
+class SessionManager:
+    """Session tokens over an LRU cache of user profiles and hydrated user objects.
+
+    A repeat login for a cached user skips the store read and reuses the same object.
+    Idle entries expire after ttl seconds and the least recently used idle entries
+    are evicted past capacity. Every service write goes straight to the store, so
+    cached entries are only ever dropped or refreshed, never written back.
+    """
+    def __init__(self, capacity=Config.SESSION_CACHE_SIZE, ttl=Config.SESSION_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()  # username -> CachedUser, least recently used first
+        self._tokens = {}              # token -> username
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+            self.hits = self.misses = 0
+
+    def _evict(self, now):
+        """Drop expired idle entries and, past capacity, the least recently used idle ones."""
+        excess, victims = len(self._entries) - self.capacity, []
+        for username, entry in self._entries.items():
+            if entry.sessions:
+                continue
+            if excess <= 0 and now - entry.last_used <= self.ttl:
+                break
+            victims.append(username)
+            excess -= 1
+        for username in victims:
+            del self._entries[username]
+
+    def profile(self, username):
+        """Return the (role, name, password hash) of a user, from the cache when fresh; None if unknown."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and (entry.sessions or now - entry.last_used <= self.ttl):
+                self._entries.move_to_end(username)
+                entry.last_used = now
+                self.hits += 1
+                return entry.role, entry.name, entry.password
+            self.misses += 1
+        info = STORE.get_user(username)
+        if info is None:
+            return None
+        with self._lock:
+            self._entries[username] = CachedUser(info)
+            self._evict(now)
+        return info['role'], info['name'], info['password']
 
-def clear_screen():
-    """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    def open(self, username):
+        """Start a session for a user whose profile was just read; returns its token."""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                entry = self._entries[username] = CachedUser(STORE.get_user(username))
+            entry.sessions += 1
+            entry.last_used = time.monotonic()
+            self._tokens[token] = username
+        return token
 
-def get_valid_input(prompt, valid_options=None, type_func=str, error_msg="Invalid input. Try again."):
-    """Get valid input from the user with optional validation."""
-    while True:
+    def close(self, token):
+        """End a session; its user stays cached for repeat logins until evicted."""
+        with self._lock:
+            username = self._tokens.pop(token, None)
+            entry = self._entries.get(username)
+            if entry is not None:
+                entry.sessions -= 1
+                entry.last_used = time.monotonic()
+
+    def user(self, token):
+        """Return the session's user object, building it on first use; None for an unknown token."""
+        with self._lock:
+            username = self._tokens.get(token)
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            if entry.user is None:
+                user_class = {'student': Student, 'teacher': Teacher, 'admin': Admin}[entry.role]
+                entry.user = user_class(username, entry.password, entry.name)
+            return entry.user
+
+    def records(self, username):
+        """Return a student's academic records, loading and caching them on first access."""
+        entry = self._entries.get(username)  # Lock-free: writers only swap whole attributes, under the lock
+        if entry is None:
+            return STORE.get_records(username)
+        records, version = entry.records, entry.version
+        if records is not None:
+            return records
+        records = STORE.get_records(username)
+        with self._lock:
+            if entry.version == version:  # Not changed while reading
+                entry.records = records
+        return records
+
+    def records_changed(self, *usernames):
+        """Drop cached records after a write to them."""
+        with self._lock:
+            for username in usernames:
+                entry = self._entries.get(username)
+                if entry is not None:
+                    entry.records = None
+                    entry.version += 1
+
+    def invalidate(self, username):
+        """Forget a user's cached profile after an edit, re-reading it if sessions are open.
+
+        The cached user object is dropped and rebuilt from the fresh profile on next use;
+        a user who no longer exists loses the entry, so their tokens stop resolving.
+        """
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return
+            if not entry.sessions:
+                del self._entries[username]
+                return
+        info = STORE.get_user(username)
+        with self._lock:
+            if info is None:
+                if self._entries.get(username) is entry:
+                    del self._entries[username]
+                return
+            entry.role, entry.name, entry.password = info['role'], info['name'], info['password']
+            entry.user = None
+            entry.records = None
+            entry.version += 1
+
+    def stats(self):
+        with self._lock:
+            return {'cached_users': len(self._entries), 'open_sessions': len(self._tokens),
+                    'hits': self.hits, 'misses': self.misses}
+
+SESSIONS = SessionManager()
+
+# CGPA trend plotting; matplotlib is only imported when a chart is drawn
+class CGPAPlotter:
+    """Draws CGPA trends in a window, to a PNG/SVG file, or as a terminal sparkline.
+
+    In 'auto' mode a window is used when a display is available; otherwise charts are
+    written to files, falling back to a sparkline when matplotlib is not installed.
+    """
+    SPARKS = '▁▂▃▄▅▆▇█'
+
+    def __init__(self, mode=Config.PLOT_MODE, directory=Config.PLOT_DIR, fmt=Config.PLOT_FORMAT):
+        self.mode = mode
+        self.directory = directory
+        self.fmt = fmt
+
+    def resolve_mode(self):
+        if self.mode != 'auto':
+            return self.mode
+        has_display = os.name == 'nt' or sys.platform == 'darwin' or os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')
+        if not importlib.util.find_spec('matplotlib'):
+            return 'ascii'
+        return 'window' if has_display else 'file'
+
+    def sparkline(self, values, low=0.0, high=4.0):
+        """Return one block character per value, scaled between low and high."""
+        top = len(self.SPARKS) - 1
+        return ''.join(self.SPARKS[max(0, min(top, round((v - low) / (high - low) * top)))] for v in values)
+
+    def plot(self, title, semesters, cgpas, name='cgpa'):
+        """Draw a trend; returns (mode, output) where output is a file path, sparkline text or None."""
+        mode = self.resolve_mode()
+        if mode != 'ascii':
+            try:
+                import matplotlib
+                if mode == 'file':
+                    matplotlib.use('Agg')
+                import matplotlib.pyplot as plt
+            except ImportError:
+                mode = 'ascii'
+        if mode == 'ascii':
+            lines = [title, f"  {self.sparkline(cgpas)}  (0.0 - 4.0)"]
+            lines += [f"  Semester {s}: {c:.2f}" for s, c in zip(semesters, cgpas)]
+            return mode, '\n'.join(lines)
+
+        fig = plt.figure()
+        plt.plot(semesters, cgpas, marker='o')
+        plt.title(title)
+        plt.xlabel('Semester')
+        plt.ylabel('CGPA')
+        plt.ylim(0, 4)
+        plt.grid(True)
+        if mode == 'window':
+            plt.show()
+            return mode, None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.{self.fmt}")
+        fig.savefig(path, format=self.fmt)
+        plt.close(fig)
+        return mode, path
+
+PLOTTER = CGPAPlotter()
+
+# User directory and search
+class SortedKeyList:
+    """Sorted list of strings kept in bounded blocks, so inserts and removals stay cheap at millions of keys."""
+    LOAD = 1000
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self.blocks = [items[i:i + self.LOAD] for i in range(0, len(items), self.LOAD)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(items)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value):
+        self.size += 1
+        if not self.blocks:
+            self.blocks, self.maxes = [[value]], [value]
+            return
+        i = min(bisect_left(self.maxes, value), len(self.blocks) - 1)
+        block = self.blocks[i]
+        insort(block, value)
+        self.maxes[i] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self.blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self.maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def discard(self, value):
+        i = bisect_left(self.maxes, value)
+        if i == len(self.blocks):
+            return
+        block = self.blocks[i]
+        j = bisect_left(block, value)
+        if j < len(block) and block[j] == value:
+            del block[j]
+            self.size -= 1
+            if block:
+                self.maxes[i] = block[-1]
+            else:
+                del self.blocks[i], self.maxes[i]
+
+    def startswith(self, prefix):
+        """Yield the values starting with prefix, in order."""
+        first = bisect_left(self.maxes, prefix)
+        for i in range(first, len(self.blocks)):
+            block = self.blocks[i]
+            for j in range(bisect_left(block, prefix) if i == first else 0, len(block)):
+                if not block[j].startswith(prefix):
+                    return
+                yield block[j]
+
+class UserDirectory:
+    """In-memory directory of every user with per-role, qualification and prefix indexes.
+
+    Lowercase usernames and the words of each name are kept as sorted 'key\0username'
+    strings, so a prefix search is a bisect plus a short scan (the flat equivalent of a
+    trie). The keys are indexed three ways, over everyone, per role and per teacher
+    qualification, so a filtered search bisects straight into the matching users instead
+    of skipping past everyone else. Every query is paged, so no lookup walks the whole
+    user base. Loaded from the store on first use and kept current by the service as
+    users are created or edited.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything; the next lookup reloads from the store."""
+        with self._lock:
+            self.loaded = False
+            self.entries = {}           # username -> (role, name, qualification)
+            self.order = []             # usernames in creation order
+            self.by_role = {}           # role -> usernames in creation order
+            self.by_qualification = {}  # lowercase qualification -> {teacher username: None}, in insertion order
+            self.index = SortedKeyList()
+            self.role_index = {}           # role -> SortedKeyList of that role's keys
+            self.qualification_index = {}  # lowercase qualification -> SortedKeyList of its teachers' keys
+
+    @staticmethod
+    def _search_keys(username, name):
+        return [f"{key}\0{username}" for key in {username.lower(), *name.lower().split()}]
+
+    def _indexes(self, role, qualification):
+        """Return the key lists a user's search keys belong in, creating them as needed."""
+        indexes = [self.index, self.role_index.setdefault(role, SortedKeyList())]
+        if role == 'teacher' and qualification:
+            indexes.append(self.qualification_index.setdefault(qualification.lower(), SortedKeyList()))
+        return indexes
+
+    def _add_entry(self, username, info):
+        role, name = info.get('role'), info.get('name', '')
+        qualification = info.get('qualification') or ''
+        self.entries[username] = (role, name, qualification)
+        self.order.append(username)
+        self.by_role.setdefault(role, []).append(username)
+        if role == 'teacher' and qualification:
+            self.by_qualification.setdefault(qualification.lower(), {})[username] = None
+
+    def load(self, rows):
+        """Build every index from (username, info) rows in one pass and one sort per index."""
+        with self._lock:
+            self.reset()
+            keys, role_keys, qualification_keys = [], {}, {}
+            for username, info in rows:
+                self._add_entry(username, info)
+                role, qualification = info.get('role'), (info.get('qualification') or '').lower()
+                user_keys = self._search_keys(username, info.get('name', ''))
+                keys.extend(user_keys)
+                role_keys.setdefault(role, []).extend(user_keys)
+                if role == 'teacher' and qualification:
+                    qualification_keys.setdefault(qualification, []).extend(user_keys)
+            self.index = SortedKeyList(keys)
+            self.role_index = {role: SortedKeyList(k) for role, k in role_keys.items()}
+            self.qualification_index = {q: SortedKeyList(k) for q, k in qualification_keys.items()}
+            self.loaded = True
+
+    def add_many(self, rows):
+        """Index newly created (username, info) rows; a no-op until the directory is loaded."""
+        with self._lock:
+            if not self.loaded:
+                return
+            for username, info in rows:
+                if username not in self.entries:
+                    self._add_entry(username, info)
+                    role, name, qualification = self.entries[username]
+                    for index in self._indexes(role, qualification):
+                        for key in self._search_keys(username, name):
+                            index.add(key)
+
+    def update(self, username, name=None, qualification=None):
+        """Re-index a user whose name or qualification changed."""
+        with self._lock:
+            if not self.loaded or username not in self.entries:
+                return
+            role, old_name, old_qual = self.entries[username]
+            name = old_name if name is None else name
+            qualification = old_qual if qualification is None else qualification
+            if name != old_name or qualification.lower() != old_qual.lower():
+                for index in self._indexes(role, old_qual):
+                    for key in self._search_keys(username, old_name):
+                        index.discard(key)
+                if role == 'teacher' and old_qual and not self.qualification_index[old_qual.lower()]:
+                    del self.qualification_index[old_qual.lower()]
+                for index in self._indexes(role, qualification):
+                    for key in self._search_keys(username, name):
+                        index.add(key)
+            if role == 'teacher' and qualification.lower() != old_qual.lower():
+                if old_qual:
+                    holders = self.by_qualification[old_qual.lower()]
+                    del holders[username]
+                    if not holders:
+                        del self.by_qualification[old_qual.lower()]
+                if qualification:
+                    self.by_qualification.setdefault(qualification.lower(), {})[username] = None
+            self.entries[username] = (role, name, qualification)
+
+    def _prefix_matches(self, prefix, index):
+        """Yield each user with a key in index starting with prefix once, in key order."""
+        seen = set()
+        for key in index.startswith(prefix):
+            owner = key[key.index('\0') + 1:]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+
+    def _matches_words(self, username, words):
+        keys = {username.lower(), *self.entries[username][1].lower().split()}
+        return all(any(key.startswith(word) for key in keys) for word in words)
+
+    def search(self, query='', role=None, qualification=None, page=1, page_size=Config.DIRECTORY_PAGE_SIZE):
+        """Return ([(username, role, name, qualification)], more) for one page of matches.
+
+        Each word of query must match the start of the username or of a word in the name;
+        qualification matches the start of a teacher's qualification; both are case-insensitive.
+        """
+        words = (query or '').lower().replace('\0', '').split()
+        qualification = (qualification or '').strip().lower()
+        offset = (max(page, 1) - 1) * page_size
+        with self._lock:
+            if qualification:
+                if role not in (None, 'teacher'):
+                    return [], False
+                qualifications = sorted(q for q in self.by_qualification if q.startswith(qualification))
+                if words:
+                    matches = (u for q in qualifications
+                               for u in self._prefix_matches(max(words, key=len), self.qualification_index[q]))
+                else:
+                    matches = (u for q in qualifications for u in self.by_qualification[q])
+            elif words:
+                index = self.index if role is None else self.role_index.get(role)
+                if index is None:
+                    return [], False
+                matches = self._prefix_matches(max(words, key=len), index)
+            else:
+                matches = self.order if role is None else self.by_role.get(role, [])
+                window = matches[offset:offset + page_size + 1]
+                return [(u,) + self.entries[u] for u in window[:page_size]], len(window) > page_size
+            if len(words) > 1:
+                matches = (u for u in matches if self._matches_words(u, words))
+            window = list(islice(matches, offset, offset + page_size + 1))
+            return [(u,) + self.entries[u] for u in window[:page_size]], len(window) > page_size
+
+DIRECTORY = UserDirectory()
+
+# Incrementally maintained system statistics
+class SystemStats:
+    """Counters kept up to date as users, enrollments, grades and sessions change.
+
+    Reading the summary is O(1); check() recomputes everything from the store and
+    catalog and reports any counter that has drifted.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.users_by_role = {}
+        self.enrollments = {}  # course_id -> enrolled students
+        self.seats = {}        # course_id -> max seats
+        self.total_users = self.total_enrollments = self.total_seats = 0
+        self.grades_entered = 0
+        self.active_sessions = self.logins = 0
+
+    def clear_courses(self):
+        """Forget per-course counters before a replacement catalog reports its courses."""
+        with self._lock:
+            self.enrollments, self.seats = {}, {}
+            self.total_enrollments = self.total_seats = 0
+
+    def load(self, store):
+        """Take user and grade counts from a newly opened store."""
+        counts = store.count_by_role()
+        grades = store.count_grades()
+        with self._lock:
+            self.users_by_role = counts
+            self.total_users = sum(counts.values())
+            self.grades_entered = grades
+
+    def user_added(self, role, count=1):
+        with self._lock:
+            self.users_by_role[role] = self.users_by_role.get(role, 0) + count
+            self.total_users += count
+
+    def enrollment_changed(self, course_id, enrolled_delta, seats_delta):
+        """CourseCatalog on_change hook."""
+        with self._lock:
+            self.enrollments[course_id] = self.enrollments.get(course_id, 0) + enrolled_delta
+            self.seats[course_id] = self.seats.get(course_id, 0) + seats_delta
+            self.total_enrollments += enrolled_delta
+            self.total_seats += seats_delta
+
+    def grade_entered(self, count=1):
+        with self._lock:
+            self.grades_entered += count
+
+    def session_opened(self):
+        with self._lock:
+            self.active_sessions += 1
+            self.logins += 1
+
+    def session_closed(self):
+        with self._lock:
+            self.active_sessions = max(self.active_sessions - 1, 0)
+
+    def summary(self):
+        """Return the headline counters without touching any data."""
+        with self._lock:
+            return {'total_users': self.total_users,
+                    'total_students': self.users_by_role.get('student', 0),
+                    'total_teachers': self.users_by_role.get('teacher', 0),
+                    'total_admins': self.users_by_role.get('admin', 0),
+                    'total_courses': len(self.seats),
+                    'total_enrollments': self.total_enrollments,
+                    'seat_fill': self.total_enrollments / self.total_seats if self.total_seats else 0.0,
+                    'grades_entered': self.grades_entered,
+                    'active_sessions': self.active_sessions,
+                    'logins': self.logins}
+
+    def snapshot(self):
+        """Return every counter, including per-course enrollments and fill ratios."""
+        snapshot = self.summary()
+        with self._lock:
+            snapshot['users_by_role'] = dict(self.users_by_role)
+            snapshot['courses'] = {c: {'enrolled': self.enrollments.get(c, 0), 'max_seats': seats,
+                                       'fill': self.enrollments.get(c, 0) / seats if seats else 0.0}
+                                   for c, seats in self.seats.items()}
+        snapshot['taken_at'] = datetime.now().isoformat(timespec='seconds')
+        return snapshot
+
+    def recompute(self, store, catalog):
+        """Count everything from scratch; session counters cannot be recomputed and are left out."""
+        users_by_role = {}
+        for _, info in store.iter_users():
+            users_by_role[info.get('role')] = users_by_role.get(info.get('role'), 0) + 1
+        enrollments = {course_id: len(catalog.roster(course_id)) for course_id in list(catalog.courses)}
+        seats = {course_id: catalog[course_id]['max_seats'] for course_id in enrollments}
+        return {'users_by_role': users_by_role, 'total_users': sum(users_by_role.values()),
+                'enrollments': enrollments, 'total_enrollments': sum(enrollments.values()),
+                'seats': seats, 'total_seats': sum(seats.values()),
+                'grades_entered': sum(1 for _ in store.iter_grade_rows())}
+
+    def check(self, store, catalog, repair=False):
+        """Diff the counters against a full recount; returns {counter: {'counted', 'expected'}} for mismatches."""
+        expected = self.recompute(store, catalog)
+        with self._lock:
+            diffs = {}
+            for key, value in expected.items():
+                counted = getattr(self, key)
+                if counted != value:
+                    diffs[key] = {'counted': counted, 'expected': value}
+                    if repair:
+                        setattr(self, key, value)
+        return diffs
+
+STATS = SystemStats()
+
+# Non-interactive service API
+class PortalError(Exception):
+    """A portal operation was rejected; the message is meant for the user."""
+
+class SectionFullError(PortalError):
+    """The requested section has no seats left; the student may join its waitlist."""
+
+class PortalService:
+    """Portal operations that return values instead of printing, shared by the CLI and the server."""
+    ENROLL_ERRORS = {'invalid': "Invalid course ID.",
+                     'limit': "You have reached the maximum course enrollment limit.",
+                     'duplicate': "Already enrolled in this course."}
+
+    # Authentication
+    @METRICS.instrument
+    def authenticate(self, username, password, source='local'):
+        """Verify credentials and open a session; returns {'username', 'role', 'name', 'password_hash', 'token'}."""
+        profile = SESSIONS.profile(username)
+        if profile is None:
+            raise PortalError("User not found.")
+        role, name, stored = profile
+        status = CREDENTIALS.verify(username, password, stored, source=source)
+        if status == 'throttled':
+            log_action(username, f"Failed login (throttled) from {source}")
+            raise PortalError("Too many failed attempts. Try again later.")
+        if status != 'ok':
+            log_action(username, f"Failed login (incorrect password) from {source}")
+            raise PortalError("Incorrect password.")
+        if role not in ('student', 'teacher', 'admin'):
+            raise PortalError("Invalid role assigned to user.")
+        stored = CREDENTIALS.upgrade(username, password, stored)
+        token = SESSIONS.open(username)
+        log_action(username, "Logged in")
+        STATS.session_opened()
+        return {'username': username, 'role': role, 'name': name, 'password_hash': stored, 'token': token}
+
+    def logout(self, username, token=None):
+        if token:
+            SESSIONS.close(token)
+        log_action(username, "Logged out")
+        STATS.session_closed()
+
+    def user_exists(self, username):
+        return STORE.has_user(username)
+
+    def set_password(self, username, new_password):
+        """Hash and store a new password; returns the stored hash."""
+        stored = CREDENTIALS.set_password(username, new_password)
+        log_action(username, "Changed password")
+        return stored
+
+    @METRICS.instrument
+    def change_password(self, username, current, new_password):
+        """Change a password after checking the current one."""
+        info = STORE.get_user(username)
+        if info is None or CREDENTIALS.verify(username, current, info['password']) != 'ok':
+            raise PortalError("Incorrect password.")
+        self.set_password(username, new_password)
+
+    # Student operations
+    @METRICS.instrument
+    def enroll(self, username, course_id, waitlist=False):
+        """Enroll a student; returns {'course_id', 'section', 'semester'}.
+
+        If the section is full and waitlist is true, the student joins the waitlist and
+        the result is {'course_id', 'section', 'waitlisted': True, 'position'} instead.
+        """
+        log_action(username, f"Enrolled in course {course_id}")
+        if course_id in COURSE_CATALOG:
+            missing = COURSE_CATALOG.missing_prerequisites(course_id, passed_courses(SESSIONS.records(username)))
+            if missing:
+                raise PortalError(f"Missing prerequisites for {course_id}: {', '.join(missing)}.")
+        status = COURSE_CATALOG.enroll(username, course_id, limit=Config.MAX_ENROLLMENT, waitlist=bool(waitlist))
+        if status == 'conflict':
+            raise PortalError(self._clash_message(username, course_id))
+        if status in self.ENROLL_ERRORS:
+            raise PortalError(self.ENROLL_ERRORS[status])
+        section = COURSE_CATALOG[course_id].get('section', 'N/A')
+        if status == 'full':
+            raise SectionFullError(f"Section {section} is full. Cannot enroll.")
+        if status == 'waitlisted':
+            position = COURSE_CATALOG.waitlist(course_id).index(username) + 1
+            return {'course_id': course_id, 'section': section, 'waitlisted': True, 'position': position}
+        semester = len(SESSIONS.records(username)) + 1
+        STORE.add_enrollment(username, course_id, semester)
+        SESSIONS.records_changed(username)
+        return {'course_id': course_id, 'section': section, 'semester': semester}
+
+    def _clash_message(self, username, course_id):
+        other = COURSE_CATALOG.clash(username, course_id)
+        return f"{course_id} meets at the same time as {other or 'another enrolled course'}."
+
+    def record_promotion(self, username, course_id):
+        """Persist an enrollment the catalog made when promoting from a waitlist."""
+        STORE.add_enrollment(username, course_id, len(SESSIONS.records(username)) + 1)
+        SESSIONS.records_changed(username)
+        log_action(username, f"Promoted from waitlist into course {course_id}")
+
+    @METRICS.instrument
+    def unenroll(self, username, course_id):
+        """Unenroll a student, or take them off the waitlist; returns {'course_id', 'waitlist'}."""
+        log_action(username, f"Unenrolled from course {course_id}")
+        status = COURSE_CATALOG.unenroll(username, course_id)
+        if status == 'invalid':
+            raise PortalError("Invalid course ID.")
+        if status == 'not_enrolled':
+            raise PortalError("You are not enrolled in this course.")
+        if status == 'ok':
+            STATS.grade_entered(-STORE.remove_enrollment(username, course_id))
+            SESSIONS.records_changed(username)
+        return {'course_id': course_id, 'waitlist': status == 'unwaitlisted'}
+
+    @METRICS.instrument
+    def records(self, username):
+        """Return the student's academic records, each with its course name."""
+        log_action(username, "Viewed academic records")
+        return [dict(rec, course_name=COURSE_CATALOG.get(rec['course_id'], {}).get('name', 'Unknown'))
+                for rec in SESSIONS.records(username)]
+
+    @METRICS.instrument
+    def enter_grade(self, username, course_id, grade):
+        """Record a percentage grade; returns {'course_id', 'grade', 'cgpa'}."""
+        log_action(username, f"Entered CGPA for course {course_id}")
+        records = SESSIONS.records(username)
+        if not records:
+            raise PortalError("No academic records found. Please enroll in a course first.")
+        if not any(rec['course_id'] == course_id for rec in records):
+            raise PortalError(f"No record found for course {course_id}.")
         try:
-            choice = type_func(input(prompt).strip())
-            if valid_options and choice not in valid_options:
-                print(f"{error_msg} Options: {valid_options}")
-                continue
-            return choice
-        except ValueError:
-            print(error_msg)
+            grade = float(grade)
+        except (TypeError, ValueError):
+            raise PortalError("Invalid grade value.")
+        if not 0 <= grade <= 100:
+            raise PortalError("Grade must be between 0 and 100.")
+        cgpa = grade_to_cgpa(grade)
+        STORE.add_grade(username, course_id, grade, cgpa)
+        SESSIONS.records_changed(username)
+        STATS.grade_entered()
+        return {'course_id': course_id, 'grade': grade, 'cgpa': cgpa}
+
+    @METRICS.instrument
+    def submit_grades(self, teacher, course_id, grades, dry_run=False):
+        """Validate a section's grades and apply the valid ones in one transaction.
+
+        grades is a list of {'username', 'grade'} rows; files are read by the caller, never here,
+        since this is reachable over the network. Errors are numbered by row.
+        Returns the applied count, per-row errors and each graded student's new CGPAs.
+        """
+        log_action(teacher, f"Submitted grades for course {course_id}")
+        if course_id not in COURSE_CATALOG:
+            raise PortalError("Invalid course ID.")
+        if not isinstance(grades, list):
+            raise PortalError("Grades must be a list of {'username', 'grade'} rows.")
+        valid, errors = validate_grade_rows(enumerate(grades, 1), course_id, COURSE_CATALOG.roster(course_id))
+        result = {'course_id': course_id, 'valid': len(valid), 'applied': 0, 'students': [],
+                  'errors': [{'line': line, 'username': username, 'error': error} for line, username, error in errors]}
+        if dry_run or not valid:
+            return result
+
+        graded = [(username, grade, grade_to_cgpa(grade)) for username, grade in valid]
+        STORE.add_grades(course_id, graded)
+        SESSIONS.records_changed(*(username for username, _ in valid))
+        STATS.grade_entered(len(graded))
+        cumulative = cumulative_cgpa(STORE.graded_records([username for username, _ in valid]), COURSE_CATALOG)
+        result['applied'] = len(graded)
+        result['students'] = [{'username': username, 'grade': grade, 'cgpa': cgpa, 'cumulative_cgpa': cumulative.get(username, cgpa)}
+                              for username, grade, cgpa in graded]
+        return result
+
+    def _directory(self):
+        """Return the user directory, loading it from the store on first use."""
+        if not DIRECTORY.loaded:
+            DIRECTORY.load(STORE.iter_users())
+        return DIRECTORY
+
+    @METRICS.instrument
+    def teacher_profiles(self, username, query=None, qualification=None, page=None):
+        """Return one page of teachers matching a name/username prefix and qualification."""
+        log_action(username, "Viewed teacher profiles")
+        page = max(int(page or 1), 1)
+        rows, more = self._directory().search(query, role='teacher', qualification=qualification, page=page)
+        return {'teachers': [{'username': u, 'name': name, 'qualification': qual} for u, _, name, qual in rows],
+                'page': page, 'more': more}
+
+    # Teacher operations
+    def _check_month(self, month):
+        """Return the month normalised to 'YYYY-MM'."""
+        try:
+            return datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
+        except (TypeError, ValueError):
+            raise PortalError("Month must be in YYYY-MM format.")
+
+    @METRICS.instrument
+    def salary_slips(self, username, page=1, last=None, start=None, end=None, page_size=Config.SALARY_PAGE_SIZE):
+        """Return one page of the teacher's slips, newest first, from the last N months or a start/end month range."""
+        log_action(username, "Viewed salary slips")
+        start = self._check_month(start) if start is not None else None
+        end = self._check_month(end) if end is not None else None
+        if last is not None:
+            start = month_offset(datetime.now().strftime('%Y-%m'), 1 - max(int(last), 1))
+        page = max(int(page or 1), 1)
+        total = STORE.count_salary_slips(username, start, end)
+        slips = STORE.salary_slips(username, start, end, (page - 1) * page_size, page_size)
+        return {'slips': slips, 'page': page, 'pages': -(-total // page_size), 'total': total}
+
+    @METRICS.instrument
+    def update_info(self, username, name=None, qualification=None):
+        """Update a teacher's name and qualification; blank values keep the current ones."""
+        info = STORE.get_user(username)
+        if info is None:
+            raise PortalError("User not found.")
+        new_name = (name or '').strip() or info['name']
+        new_qual = (qualification or '').strip() or info.get('qualification', '')
+        STORE.update_user(username, name=new_name, qualification=new_qual)
+        SESSIONS.invalidate(username)
+        DIRECTORY.update(username, new_name, new_qual)
+        log_action(username, "Updated personal information")
+        return {'name': new_name, 'qualification': new_qual}
+
+    # Admin operations
+    @METRICS.instrument
+    def all_users(self, admin, query=None, role=None, page=None):
+        """Return one page of users (without password hashes), optionally filtered by prefix and role."""
+        log_action(admin, "Viewed full access data")
+        page = max(int(page or 1), 1)
+        rows, more = self._directory().search(query, role=role or None, page=page)
+        users = []
+        for username, user_role, name, qualification in rows:
+            info = {'username': username, 'role': user_role, 'name': name}
+            if user_role == 'teacher':
+                info['qualification'] = qualification
+            users.append(info)
+        return {'users': users, 'page': page, 'more': more}
+
+    @METRICS.instrument
+    def create_user(self, admin, role, username, name, password):
+        log_action(admin, f"Created new {role} user")
+        if not isinstance(username, str) or not username.strip():
+            raise PortalError("Username cannot be empty.")
+        if STORE.has_user(username):
+            raise PortalError("User already exists.")
+        if role not in ['student', 'teacher']:
+            raise PortalError("Invalid role for creation.")
+        if not isinstance(name, str) or not name.strip():
+            raise PortalError("Name cannot be empty.")
+        if not isinstance(password, str) or not password:
+            raise PortalError("Password cannot be empty.")
+        info = {'role': role, 'name': name, 'password': hash_password(password)}
+        if role == 'teacher':
+            info['qualification'] = ''
+        STORE.add_user(username, info)
+        STATS.user_added(role)
+        DIRECTORY.add_many([(username, info)])
+        return {'username': username, 'role': role, 'name': name}
+
+    @METRICS.instrument
+    def manage_enrollment(self, admin, course_id, action, username):
+        """Add ('a') or remove ('r') a user from a course.
+
+        Admins may waive prerequisites, but not a timetable clash.
+        """
+        log_action(admin, "Managed enrollments")
+        if course_id not in COURSE_CATALOG:
+            raise PortalError("Invalid Course ID.")
+        if action not in ('a', 'r'):
+            raise PortalError("Action must be 'a' or 'r'.")
+        if not STORE.has_user(username):
+            raise PortalError("User not found.")
+        if action == 'a':
+            status = COURSE_CATALOG.enroll(username, course_id)
+            if status == 'full':
+                raise PortalError("Course section full.")
+            if status == 'conflict':
+                raise PortalError(self._clash_message(username, course_id))
+            if status != 'ok':
+                raise PortalError("User already enrolled.")
+            STORE.add_enrollment(username, course_id, len(SESSIONS.records(username)) + 1)
+        else:
+            status = COURSE_CATALOG.unenroll(username, course_id)
+            if status == 'ok':
+                STATS.grade_entered(-STORE.remove_enrollment(username, course_id))
+            elif status != 'unwaitlisted':
+                raise PortalError("User is not enrolled in this course.")
+        SESSIONS.records_changed(username)
+        return {'course_id': course_id, 'action': action, 'username': username}
+
+    @METRICS.instrument
+    def validate_enrollments(self, admin):
+        """Re-check every stored enrollment for timetable clashes and unmet prerequisites in one pass."""
+        log_action(admin, "Validated term enrollments")
+        return validate_enrollments(STORE.iter_enrollment_results(), COURSE_CATALOG)
+
+    @METRICS.instrument
+    def bulk_import(self, admin, path, kind, batch_size=1000):
+        log_action(admin, f"Bulk imported {kind} from {path}")
+        if kind not in IMPORT_KINDS:
+            raise PortalError("Import kind must be 'users' or 'enrollments'.")
+        if not os.path.isfile(path):
+            raise PortalError("File not found.")
+        return bulk_import(path, kind, max(batch_size, 1))
+
+    @METRICS.instrument
+    def grade_analytics(self, admin):
+        """Return institution-wide GPA and grade reports as plain data."""
+        log_action(admin, "Viewed grade analytics")
+        try:
+            analytics = GradeAnalytics.from_store()
+        except ImportError:
+            raise PortalError("Grade analytics requires NumPy (pip install numpy).")
+        return {'grade_rows': analytics.grade_rows,
+                'students_graded': len(analytics.graded_users),
+                'mean_gpa': analytics.mean_gpa,
+                'gpa_percentiles': analytics.gpa_percentiles,
+                'grade_percentiles': analytics.grade_percentiles,
+                'courses': [{'course_id': c, 'count': n, 'mean': m, 'distribution': {str(k): v for k, v in d.items()}}
+                            for c, n, m, d in analytics.course_report()]}
+
+    @METRICS.instrument
+    def run_payroll(self, admin, month=None):
+        """Issue the month's salary slips (the current month by default) for every teacher."""
+        month = self._check_month(month) if month else datetime.now().strftime('%Y-%m')
+        log_action(admin, f"Ran payroll for {month}")
+        try:
+            issued = run_payroll(month)
+        except ImportError:
+            raise PortalError("Payroll requires NumPy (pip install numpy).")
+        return {'month': month, 'issued': issued}
+
+    def _check_time(self, value, end=False):
+        """Normalise 'YYYY-MM-DD[ HH:MM[:SS]]' to a log timestamp; a bare end date covers the whole day."""
+        if value in (None, ''):
+            return None
+        for fmt, suffix in (('%Y-%m-%d %H:%M:%S', ''), ('%Y-%m-%d %H:%M', ':59' if end else ':00'),
+                            ('%Y-%m-%d', ' 23:59:59' if end else ' 00:00:00')):
+            try:
+                return datetime.strptime(str(value).strip(), fmt).strftime(fmt) + suffix
+            except ValueError:
+                pass
+        raise PortalError("Times must be YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS].")
+
+    @METRICS.instrument
+    def audit_log(self, admin, user=None, action=None, since=None, until=None, limit=None):
+        """Return the latest activity log entries matching a user, action prefix and time range."""
+        since, until = self._check_time(since), self._check_time(until, end=True)
+        log_action(admin, "Queried the activity log")
+        ACTIVITY_LOGGER.flush()
+        entries = AUDIT_LOG.query(user or None, action or None, since, until, limit=int(limit or 100))
+        return [{'time': ts, 'username': username, 'action': text} for ts, username, text in entries]
+
+    @METRICS.instrument
+    def audit_summary(self, admin, since=None, until=None, top=None):
+        """Return actions per hour, the most active users and failed logins for a time range."""
+        since, until = self._check_time(since), self._check_time(until, end=True)
+        log_action(admin, "Summarized the activity log")
+        ACTIVITY_LOGGER.flush()
+        return AUDIT_LOG.aggregate(since, until, top=int(top or 10))
+
+    def teacher_updates(self, admin, limit=None):
+        """Return the latest personal-information updates made by teachers."""
+        log_action(admin, "Viewed updates by teachers")
+        ACTIVITY_LOGGER.flush()
+        entries = AUDIT_LOG.query(action="Updated personal information")
+        roles = {}
+        updates = []
+        for ts, username, text in reversed(entries):
+            if username not in roles:
+                info = STORE.get_user(username)
+                roles[username] = info and info['role']
+            if roles[username] == 'teacher':
+                updates.append({'time': ts, 'username': username, 'action': text})
+                if len(updates) >= int(limit or 50):
+                    break
+        return updates
+
+    @METRICS.instrument
+    def system_stats(self, admin):
+        """Return the incrementally maintained headline counters."""
+        log_action(admin, "Viewed system stats")
+        return STATS.summary()
+
+    def stats_snapshot(self, admin):
+        log_action(admin, "Took a stats snapshot")
+        return STATS.snapshot()
+
+    def export_stats(self, admin, path=None):
+        """Write a stats snapshot to a JSON file; returns its path."""
+        log_action(admin, "Exported system stats")
+        snapshot = STATS.snapshot()
+        path = path or f"stats_{snapshot['taken_at'].replace(':', '')}.json"
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+        except OSError as e:
+            raise PortalError(f"Could not write {path}: {e.strerror}")
+        return {'path': path}
+
+    def check_stats(self, admin, repair=False):
+        """Recount everything and return the counters that drifted, optionally fixing them."""
+        log_action(admin, "Checked system stats")
+        return STATS.check(STORE, COURSE_CATALOG, repair=bool(repair))
+
+    def metrics(self, admin, fmt=None):
+        """Return live call metrics as a dict ('json', the default) or Prometheus text ('prometheus')."""
+        log_action(admin, "Viewed metrics")
+        if not METRICS.enabled:
+            raise PortalError("Metrics are off; start the portal with PORTAL_METRICS=1.")
+        if fmt == 'prometheus':
+            return METRICS.to_prometheus()
+        if fmt not in (None, 'json'):
+            raise PortalError("Format must be 'json' or 'prometheus'.")
+        return {'since': datetime.fromtimestamp(METRICS.started).isoformat(timespec='seconds'), 'metrics': METRICS.snapshot()}
+
+    def export_metrics(self, admin, fmt='json', path=None):
+        """Write the live metrics to a JSON or Prometheus text file; returns its path."""
+        result = self.metrics(admin, fmt)
+        path = path or f"metrics_{datetime.now():%Y-%m-%dT%H%M%S}.{'prom' if fmt == 'prometheus' else 'json'}"
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(result if fmt == 'prometheus' else json.dumps(result, indent=2))
+        except OSError as e:
+            raise PortalError(f"Could not write {path}: {e.strerror}")
+        return {'path': path}
+
+SERVICE = PortalService()
+
+# Asyncio JSON-lines server
+class PortalServer:
+    """Serves many concurrent sessions from one process over newline-delimited JSON.
+
+    Each connection is one session. A request is a JSON object such as
+    {"op": "enroll", "course_id": "CSE101"}; the reply is {"ok": true, "result": ...}
+    or {"ok": false, "error": "..."}, echoing any "id" the client sent.
+    """
+    # op -> (required role or None for any logged-in user, service method, parameters; '?' marks optional)
+    OPS = {
+        'change_password': (None, 'change_password', ('current', 'new')),
+        'enroll': ('student', 'enroll', ('course_id', 'waitlist?')),
+        'unenroll': ('student', 'unenroll', ('course_id',)),
+        'records': ('student', 'records', ()),
+        'enter_grade': ('student', 'enter_grade', ('course_id', 'grade')),
+        'teacher_profiles': ('student', 'teacher_profiles', ('query?', 'qualification?', 'page?')),
+        'salary_slips': ('teacher', 'salary_slips', ('page?', 'last?', 'start?', 'end?')),
+        'submit_grades': ('teacher', 'submit_grades', ('course_id', 'grades', 'dry_run?')),
+        'update_info': ('teacher', 'update_info', ('name?', 'qualification?')),
+        'users': ('admin', 'all_users', ('query?', 'role?', 'page?')),
+        'create_user': ('admin', 'create_user', ('role', 'username', 'name', 'password')),
+        'manage_enrollment': ('admin', 'manage_enrollment', ('course_id', 'action', 'username')),
+        'validate_enrollments': ('admin', 'validate_enrollments', ()),
+        'stats': ('admin', 'system_stats', ()),
+        'stats_snapshot': ('admin', 'stats_snapshot', ()),
+        'stats_check': ('admin', 'check_stats', ('repair?',)),
+        'audit_log': ('admin', 'audit_log', ('user?', 'action?', 'since?', 'until?', 'limit?')),
+        'audit_summary': ('admin', 'audit_summary', ('since?', 'until?', 'top?')),
+        'teacher_updates': ('admin', 'teacher_updates', ('limit?',)),
+        'grade_analytics': ('admin', 'grade_analytics', ()),
+        'run_payroll': ('admin', 'run_payroll', ('month?',)),
+        'metrics': ('admin', 'metrics', ('format?',)),
+    }
+    BLOCKING_OPS = {'login', 'change_password', 'create_user', 'grade_analytics', 'run_payroll', 'stats_check',
+                    'audit_log', 'audit_summary', 'teacher_updates', 'submit_grades', 'validate_enrollments'}  # Run off the event loop
+    CATALOG_OPS = {'enroll', 'unenroll', 'manage_enrollment'}  # Round trips to the shards when the catalog is sharded
+
+    def __init__(self, host=Config.SERVER_HOST, port=Config.SERVER_PORT, service=None):
+        self.host = host
+        self.port = port
+        self.service = service or SERVICE
+        self.server = None
+        self.sessions = 0
+        self._catalog_executor = None
+
+    def _executor_for(self, op):
+        """Return the executor an op must run on, None for the default one, or False to run it on the loop.
+
+        With a sharded catalog, CATALOG_OPS get their own threads so they neither block the
+        loop on pipe round trips nor queue behind password hashing in the default executor.
+        """
+        if op in self.BLOCKING_OPS:
+            return None
+        if op in self.CATALOG_OPS and isinstance(COURSE_CATALOG, ShardRouter):
+            if self._catalog_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._catalog_executor = ThreadPoolExecutor(Config.SHARD_THREADS, thread_name_prefix='catalog')
+            return self._catalog_executor
+        return False
+
+    async def start(self):
+        import asyncio
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=1 << 20)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        print(f"Portal server listening on {self.host}:{self.port}")
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if self._catalog_executor is not None:
+                self._catalog_executor.shutdown()
+
+    def dispatch(self, session, request):
+        """Run one request for a session; returns the result or raises PortalError."""
+        op = request.get('op')
+        if METRICS.enabled and (op in self.OPS or op in ('login', 'logout')):
+            with METRICS.timer(f"op:{op}"):
+                return self._dispatch(session, request, op)
+        return self._dispatch(session, request, op)
+
+    def _dispatch(self, session, request, op):
+        if op == 'login':
+            profile = self.service.authenticate(str(request.get('username', '')), str(request.get('password', '')),
+                                                source=session['source'])
+            if session['username']:
+                self.service.logout(session['username'], session['token'])
+            session['username'], session['role'], session['token'] = profile['username'], profile['role'], profile['token']
+            return {'username': profile['username'], 'role': profile['role'], 'name': profile['name'], 'token': profile['token']}
+        if op == 'logout':
+            if session['username']:
+                self.service.logout(session['username'], session['token'])
+            session['username'] = session['role'] = session['token'] = None
+            return {}
+        if op not in self.OPS:
+            raise PortalError(f"Unknown operation: {op}")
+        role, method, params = self.OPS[op]
+        if session['username'] is None:
+            raise PortalError("Not logged in.")
+        if role and session['role'] != role:
+            raise PortalError(f"Operation '{op}' requires the {role} role.")
+        args = []
+        for param in params:
+            name = param.rstrip('?')
+            if name not in request and not param.endswith('?'):
+                raise PortalError(f"Missing parameter: {name}")
+            args.append(request.get(name))
+        return getattr(self.service, method)(session['username'], *args)
+
+    async def handle_client(self, reader, writer):
+        import asyncio
+        peer = writer.get_extra_info('peername')
+        session = {'username': None, 'role': None, 'token': None, 'source': peer[0] if peer else 'unknown'}
+        loop = asyncio.get_running_loop()
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # The line outgrew the stream limit; the connection can't be resynced
+                    writer.write(json.dumps({'ok': False, 'error': "Bad request: request too large"}).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"Bad request: {e}"}
+                else:
+                    try:
+                        executor = self._executor_for(request.get('op'))
+                        if executor is not False:
+                            result = await loop.run_in_executor(executor, self.dispatch, session, request)
+                        else:
+                            result = self.dispatch(session, request)
+                        response = {'ok': True, 'result': result}
+                    except PortalError as e:
+                        response = {'ok': False, 'error': str(e)}
+                    except Exception as e:
+                        response = {'ok': False, 'error': f"Internal error: {type(e).__name__}"}
+                    if 'id' in request:
+                        response['id'] = request['id']
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self.sessions -= 1
+            if session['username']:
+                self.service.logout(session['username'], session['token'])
+            writer.close()
 
 # Base User class
 class User(ABC):
     """Abstract base class for all users."""
-    def __init__(self, username, password, name):
+    def __init__(self, username, password_hash, name):
         self.username = username
-        self.__password = password
+        self.__password_hash = password_hash
         self.name = name
 
     def check_password(self, password):
-        """Check if the provided password matches the stored password."""
-        return self.__password == password
+        """Check if the provided password matches the stored password hash."""
+        return CREDENTIALS.verify(self.username, password, self.__password_hash) == 'ok'
 
     def set_password(self, new_password):
-        """Set a new password."""
-        self.__password = new_password
+        """Hash and store a new password."""
+        self.__password_hash = SERVICE.set_password(self.username, new_password)
 
     @abstractmethod
     def show_menu(self):
@@ -55,88 +3816,55 @@ class User(ABC):
 # Student class
 class Student(User):
     """Class representing a student user."""
-    def __init__(self, username, password, name):
-        super().__init__(username, password, name)
-        self.academic_records = {}  # Instance variable to store records
+    @property
+    def academic_records(self):
+        """Records keyed by username, loaded on first access and cached with the session."""
+        records = SESSIONS.records(self.username)
+        return {self.username: records} if records else {}
 
     def enroll_course(self, course_id):
         """Enroll the student in a course if capacity and limits allow."""
-        courses = {'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15},
-                   'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15},
-                   'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15}}
-        log_action(self.username, f"Enrolled in course {course_id}")
-
-        if course_id not in courses:
-            print("Invalid course ID.")
-            return
-
-        enrolled_courses = [rec['course_id'] for rec in self.academic_records.get(self.username, [])]
-        if len(enrolled_courses) >= Config.MAX_ENROLLMENT:
-            print("You have reached the maximum course enrollment limit.")
-            return
-
-        if course_id in enrolled_courses:
-            print("Already enrolled in this course.")
+        try:
+            result = SERVICE.enroll(self.username, course_id)
+        except SectionFullError as e:
+            print(e)
+            if get_valid_input("Join the waitlist? (y/n): ", ['y', 'n']) == 'n':
+                return
+            try:
+                result = SERVICE.enroll(self.username, course_id, waitlist=True)
+            except PortalError as e:
+                print(e)
+                return
+        except PortalError as e:
+            print(e)
             return
-
-        section = courses[course_id].get('section', 'N/A')
-        students = courses[course_id].get('students', [])
-        if len(students) >= courses[course_id].get('max_seats', 0):
-            print(f"Section {section} is full. Cannot enroll.")
+        if result.get('waitlisted'):
+            print(f"Added to the waitlist for {course_id} at position {result['position']}.")
             return
-
-        students.append(self.username)
-        courses[course_id]['students'] = students
-
-        if self.username not in self.academic_records:
-            self.academic_records[self.username] = []
-        self.academic_records[self.username].append({
-            'course_id': course_id,
-            'semester': len(self.academic_records.get(self.username, [])) + 1,
-            'grades': [],
-            'cgpa': 0.0
-        })
-        print(f"Enrolled in course {course_id}, section {section} successfully.")
+        print(f"Enrolled in course {course_id}, section {result['section']} successfully.")
 
     def unenroll_course(self, course_id):
         """Unenroll the student from a course."""
-        courses = {'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15},
-                   'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15},
-                   'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15}}
-        log_action(self.username, f"Unenrolled from course {course_id}")
-
-        if course_id not in courses:
-            print("Invalid course ID.")
+        try:
+            result = SERVICE.unenroll(self.username, course_id)
+        except PortalError as e:
+            print(e)
             return
-
-        students = courses[course_id].get('students', [])
-        if self.username in students:
-            students.remove(self.username)
-            courses[course_id]['students'] = students
-        else:
-            print("You are not enrolled in this course.")
+        if result['waitlist']:
+            print(f"Removed from the waitlist for course {course_id}.")
             return
-
-        if self.username in self.academic_records:
-            self.academic_records[self.username] = [rec for rec in self.academic_records[self.username] if rec['course_id'] != course_id]
-
         print(f"Unenrolled from course {course_id} successfully.")
 
     def view_academic_records(self):
         """Display the student's academic records."""
-        courses = {'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15},
-                   'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15},
-                   'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15}}
-        log_action(self.username, "Viewed academic records")
-
-        if self.username not in self.academic_records or not self.academic_records[self.username]:
+        records = SERVICE.records(self.username)
+        if not records:
             print("No academic records found.")
             return
 
         print(f"Academic records for {self.name}:")
-        for rec in self.academic_records[self.username]:
-            course_name = courses.get(rec['course_id'], {}).get('name', 'Unknown')
-            print(f"- Course: {course_name} ({rec['course_id']})")
+        for rec in records:
+            print(f"- Course: {rec['course_name']} ({rec['course_id']})")
             print(f"  Semester: {rec['semester']}")
             print(f"  Grades: {rec['grades']}")
             print(f"  CGPA: {rec['cgpa']}")
@@ -144,44 +3872,34 @@ class Student(User):
 
     def enter_cgpa(self, course_id):
         """Allow the student to enter grades and calculate CGPA for a specific course."""
-        log_action(self.username, f"Entered CGPA for course {course_id}")
-        if self.username not in self.academic_records or not self.academic_records[self.username]:
-            print("No academic records found. Please enroll in a course first.")
+        records = self.academic_records.get(self.username, [])
+        if records and any(rec['course_id'] == course_id for rec in records):
+            grade = get_valid_input(f"Enter grade percentage for {course_id} (0-100): ", type_func=float, error_msg="Grade must be a number between 0 and 100")
+        else:
+            grade = None  # Let the service report the missing record
+        try:
+            result = SERVICE.enter_grade(self.username, course_id, grade)
+        except PortalError as e:
+            print(e)
             return
-
-        for rec in self.academic_records[self.username]:
-            if rec['course_id'] == course_id:
-                try:
-                    grade = float(get_valid_input(f"Enter grade percentage for {course_id} (0-100): ", type_func=float, error_msg="Grade must be a number between 0 and 100"))
-                    if 0 <= grade <= 100:
-                        cgpa = next((v for k, v in sorted(Config.CGPA_SCALE.items(), reverse=True) if grade >= k), 0.0)
-                        rec['grades'].append(grade)
-                        rec['cgpa'] = cgpa
-                        print(f"CGPA updated to {cgpa} for {course_id} based on grade {grade}%.")
-                    else:
-                        print("Grade must be between 0 and 100.")
-                except ValueError:
-                    print("Invalid grade value.")
-                return
-        print(f"No record found for course {course_id}.")
+        print(f"CGPA updated to {result['cgpa']} for {course_id} based on grade {result['grade']}%.")
 
     def plot_cgpa(self):
         """Plot the CGPA trend over semesters."""
         log_action(self.username, "Plotted CGPA trend")
-        if self.username not in self.academic_records or not self.academic_records[self.username]:
+        records = self.academic_records.get(self.username)
+        if not records:
             print("No CGPA data available to plot.")
             return
 
-        semesters = [rec['semester'] for rec in self.academic_records[self.username]]
-        cgpas = [rec['cgpa'] for rec in self.academic_records[self.username]]
+        semesters = [rec['semester'] for rec in records]
+        cgpas = [rec['cgpa'] for rec in records]
 
-        plt.plot(semesters, cgpas, marker='o')
-        plt.title(f"CGPA Trend for {self.name}")
-        plt.xlabel('Semester')
-        plt.ylabel('CGPA')
-        plt.ylim(0, 4)
-        plt.grid(True)
-        plt.show()
+        mode, output = PLOTTER.plot(f"CGPA Trend for {self.name}", semesters, cgpas, name=f"cgpa_{self.username}")
+        if mode == 'file':
+            print(f"CGPA trend saved to {output}")
+        elif mode == 'ascii':
+            print(output)
 
     def change_password(self):
         """Change the student's password."""
@@ -191,17 +3909,25 @@ class Student(User):
             return
         new_pass = input("Enter new password: ")
         self.set_password(new_pass)
-        log_action(self.username, "Changed password")
         print("Password changed successfully.")
 
     def view_teacher_profiles(self):
-        """Display profiles of all teachers."""
-        users = INITIAL_USERS  # Use embedded users
-        log_action(self.username, "Viewed teacher profiles")
-        print("Teachers list and profiles:")
-        for u, info in users.items():
-            if info.get('role') == 'teacher':
-                print(f"- {info['name']} (Username: {u})")
+        """Display teacher profiles, optionally searched by name or qualification, one page at a time."""
+        query = input("Search by name or username (blank for all): ").strip()
+        qualification = input("Qualification (blank for any): ").strip()
+        page = 1
+        while True:
+            result = SERVICE.teacher_profiles(self.username, query, qualification, page)
+            if not result['teachers']:
+                print("No teachers found.")
+                return
+            print(f"Teachers list and profiles (page {page}):")
+            for teacher in result['teachers']:
+                qualification_text = f", {teacher['qualification']}" if teacher['qualification'] else ""
+                print(f"- {teacher['name']} (Username: {teacher['username']}{qualification_text})")
+            if not result['more'] or input("Enter 'n' for the next page, anything else to return: ").strip().lower() != 'n':
+                return
+            page += 1
 
     def show_menu(self):
         """Display and handle the student menu."""
@@ -243,29 +3969,75 @@ class Student(User):
 class Teacher(User):
     """Class representing a teacher user."""
     def view_salary_slips(self):
-        """Display the teacher's salary slips."""
-        salaries = {}  # In-memory salaries
-        log_action(self.username, "Viewed salary slips")
-        slips = salaries.get(self.username, [])
-        if not slips:
-            print("No salary slips found.")
+        """Display the teacher's salary slips, newest first, one page at a time."""
+        page = 1
+        while True:
+            result = SERVICE.salary_slips(self.username, page)
+            if not result['total']:
+                print("No salary slips found.")
+                return
+            print(f"Salary slips for {self.name} (page {result['page']} of {result['pages']}):")
+            for slip in result['slips']:
+                print(f"Month: {slip['month']}, Gross: {slip['gross']:.2f}, Deductions: {slip['deductions']:.2f}, "
+                      f"Amount: {slip['amount']:.2f}")
+            if page >= result['pages'] or input("Enter 'n' for older slips, anything else to return: ").strip().lower() != 'n':
+                return
+            page += 1
+
+    def submit_section_grades(self):
+        """Submit a whole section's grades from a CSV/JSONL file or pasted 'username,grade' lines."""
+        course_id = input("Enter course ID: ").strip()
+        path = input("Enter CSV/JSONL file path (blank to paste 'username,grade' lines): ").strip()
+        if path:
+            if not os.path.isfile(path):
+                print("File not found.")
+                return
+            source = [row for _, row in read_rows(path)]
+        else:
+            print("Paste one 'username,grade' line per student; finish with a blank line.")
+            lines = []
+            while True:
+                line = input()
+                if not line.strip():
+                    break
+                lines.append(line)
+            source = parse_grade_text(lines)
+
+        try:
+            result = SERVICE.submit_grades(self.username, course_id, source, dry_run=True)
+            for error in result['errors']:
+                print(f"Row {error['line']} ({error['username'] or '-'}): {error['error']}")
+            if not result['valid']:
+                print("No valid grades to submit.")
+                return
+            if result['errors'] and get_valid_input(f"Apply the {result['valid']} valid grades? (y/n): ", ['y', 'n']) != 'y':
+                print("No grades were submitted.")
+                return
+            start = time.perf_counter()
+            result = SERVICE.submit_grades(self.username, course_id, source)
+        except PortalError as e:
+            print(e)
             return
-        print(f"Salary slips for {self.name}:")
-        for slip in slips:
-            print(f"Month: {slip['month']}, Amount: {slip['amount']}")
+        elapsed = time.perf_counter() - start
+        print(f"Submitted {result['applied']} grades for {course_id} in {elapsed * 1000:.1f} ms.")
+        for student in result['students'][:20]:
+            print(f"{student['username']}: grade {student['grade']}%, course CGPA {student['cgpa']}, "
+                  f"cumulative CGPA {student['cumulative_cgpa']}")
+        if len(result['students']) > 20:
+            print(f"... and {len(result['students']) - 20} more.")
 
     def add_update_delete_info(self):
         """Update the teacher's personal information."""
-        users = INITIAL_USERS  # Use embedded users
-        info = users[self.username]
-
         print("Update your personal information:")
-        new_name = input(f"Name ({info['name']}): ").strip() or info['name']
-        new_qual = input("Qualification (optional): ").strip() or info.get('qualification', '')
+        new_name = input(f"Name ({self.name}): ")
+        new_qual = input("Qualification (optional): ")
 
-        info.update({'name': new_name, 'qualification': new_qual})
-        users[self.username] = info
-        log_action(self.username, "Updated personal information")
+        try:
+            result = SERVICE.update_info(self.username, new_name, new_qual)
+        except PortalError as e:
+            print(e)
+            return
+        self.name = result['name']
         print("Information updated.")
 
     def change_password(self):
@@ -276,9 +4048,6 @@ class Teacher(User):
             return
         new_pass = input("Enter new password: ")
         self.set_password(new_pass)
-        users = INITIAL_USERS  # Use embedded users
-        users[self.username]['password'] = new_pass
-        log_action(self.username, "Changed password")
         print("Password changed successfully.")
 
     def show_menu(self):
@@ -287,18 +4056,21 @@ class Teacher(User):
             clear_screen()
             print(f"\nTeacher Menu - {self.name}")
             print("1. View salary slips")
-            print("2. Update personal information")
-            print("3. Change password")
-            print("4. Logout")
+            print("2. Submit section grades")
+            print("3. Update personal information")
+            print("4. Change password")
+            print("5. Logout")
 
-            choice = get_valid_input("Enter your choice: ", ['1', '2', '3', '4'])
+            choice = get_valid_input("Enter your choice: ", ['1', '2', '3', '4', '5'])
             if choice == '1':
                 self.view_salary_slips()
             elif choice == '2':
-                self.add_update_delete_info()
+                self.submit_section_grades()
             elif choice == '3':
-                self.change_password()
+                self.add_update_delete_info()
             elif choice == '4':
+                self.change_password()
+            elif choice == '5':
                 break
             input("Press Enter to continue...")
 
@@ -306,97 +4078,211 @@ class Teacher(User):
 class Admin(User):
     """Class representing an admin user."""
     def full_access(self):
-        """Display all user data."""
-        users = INITIAL_USERS  # Use embedded users
-        log_action(self.username, "Viewed full access data")
-        print("All user data:")
-        for u, info in users.items():
-            print(f"{u}: {info}")
+        """Search the user directory and display matching user data, one page at a time."""
+        query = input("Search by name or username (blank for all): ").strip()
+        role = input("Role (student/teacher/admin, blank for any): ").strip().lower()
+        page = 1
+        while True:
+            result = SERVICE.all_users(self.username, query, role, page)
+            if not result['users']:
+                print("No users found.")
+                return
+            print(f"User data (page {page}):")
+            for info in result['users']:
+                username = info.pop('username')
+                print(f"{username}: {info}")
+            if not result['more'] or input("Enter 'n' for the next page, anything else to return: ").strip().lower() != 'n':
+                return
+            page += 1
 
     def create_login_ids(self, role):
         """Create new user login IDs for the specified role."""
-        users = INITIAL_USERS  # Use embedded users
-        log_action(self.username, f"Created new {role} user")
-
         username = input("Enter username: ").strip()
-        if username in users:
-            print("User already exists.")
-            return
+        if SERVICE.user_exists(username) or role not in ['student', 'teacher']:
+            name = password = ''  # Rejected below without prompting further
+        else:
+            name = input("Enter full name: ").strip()
+            password = input("Enter password: ").strip()
 
-        if role not in ['student', 'teacher']:
-            print("Invalid role for creation.")
+        try:
+            SERVICE.create_user(self.username, role, username, name, password)
+        except PortalError as e:
+            print(e)
             return
-
-        name = input("Enter full name: ").strip()
-        password = input("Enter password: ").strip()
-
-        users[username] = {'role': role, 'name': name, 'password': password}
-        if role == 'teacher':
-            users[username]['qualification'] = ''
         print(f"{role.capitalize()} user created successfully.")
 
     def manage_enrollments(self):
         """Manage course enrollments for users."""
-        courses = {'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15},
-                   'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15},
-                   'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15}}
-        users = INITIAL_USERS  # Use embedded users
-        log_action(self.username, "Managed enrollments")
-
         course_id = input("Enter course ID: ")
-        if course_id not in courses:
-            print("Invalid Course ID.")
+        if course_id in COURSE_CATALOG:
+            action = get_valid_input("Add or Remove user? (a/r): ", ['a', 'r'])
+            username = input("Enter username: ").strip()
+        else:
+            action = username = None  # Rejected below without prompting further
+
+        try:
+            SERVICE.manage_enrollment(self.username, course_id, action, username)
+        except PortalError as e:
+            print(e)
+            return
+        if action == 'a':
+            print(f"User {username} added to course {course_id}.")
+        else:
+            print(f"User {username} removed from course {course_id}.")
+
+    def bulk_import_data(self):
+        """Import users or enrollments in bulk from a CSV or JSONL file."""
+        kind = get_valid_input("Import users or enrollments? (u/e): ", ['u', 'e'])
+        path = input("Enter CSV/JSONL file path: ").strip()
+        batch_size = 1000
+        if os.path.isfile(path):
+            batch_size = get_valid_input("Batch size (default 1000): ", type_func=lambda s: int(s or 1000),
+                                         error_msg="Batch size must be a number.")
+        kind = 'users' if kind == 'u' else 'enrollments'
+
+        start = time.perf_counter()
+        try:
+            result = SERVICE.bulk_import(self.username, path, kind, batch_size)
+        except PortalError as e:
+            print(e)
             return
+        elapsed = time.perf_counter() - start
+        print(f"Imported {result['imported']} {kind} in {elapsed:.2f}s; {result['errors']} rows rejected.")
+        if result['errors']:
+            print(f"Error report written to {result['report']}")
 
-        action = get_valid_input("Add or Remove user? (a/r): ", ['a', 'r'])
-        username = input("Enter username: ").strip()
+    def view_grade_analytics(self):
+        """Display institution-wide GPA and grade reports."""
+        try:
+            report = SERVICE.grade_analytics(self.username)
+        except PortalError as e:
+            print(e)
+            return
+        if not report['grade_rows']:
+            print("No grades have been entered yet.")
+            return
+
+        print("Grade analytics:")
+        print(f"Grade rows: {report['grade_rows']}")
+        print(f"Students graded: {report['students_graded']}")
+        print(f"Mean cumulative GPA: {report['mean_gpa']:.2f}")
+        print("GPA percentiles: " + ", ".join(f"p{p}={v:.2f}" for p, v in report['gpa_percentiles'].items()))
+        print("Grade percentiles: " + ", ".join(f"p{p}={v:.1f}%" for p, v in report['grade_percentiles'].items()))
+        print()
+        print("Per course:")
+        for course in report['courses']:
+            spread = ", ".join(f"{points}: {n}" for points, n in sorted(course['distribution'].items(), reverse=True))
+            print(f"- {course['course_id']}: {course['count']} grades, mean {course['mean']:.1f}% ({spread})")
 
-        if username not in users:
-            print("User not found.")
+    def validate_enrollments(self):
+        """Re-check the whole term's enrollments for timetable clashes and missing prerequisites."""
+        result = SERVICE.validate_enrollments(self.username)
+        print(f"Checked {result['enrollments']} enrollments of {result['students']} students.")
+        if not result['conflicts'] and not result['missing_prerequisites']:
+            print("No timetable clashes or missing prerequisites found.")
             return
+        for conflict in result['conflicts']:
+            print(f"- {conflict['username']}: {conflict['course_id']} clashes with {conflict['other']}")
+        for row in result['missing_prerequisites']:
+            print(f"- {row['username']}: {row['course_id']} is missing {', '.join(row['missing'])}")
 
-        students = courses[course_id].get('students', [])
-        if action == 'a':
-            if username not in students:
-                if len(students) >= courses[course_id].get('max_seats', 0):
-                    print("Course section full.")
-                    return
-                students.append(username)
-                print(f"User {username} added to course {course_id}.")
-            else:
-                print("User already enrolled.")
-        elif action == 'r':
-            if username in students:
-                students.remove(username)
-                print(f"User {username} removed from course {course_id}.")
-            else:
-                print("User is not enrolled in this course.")
-        courses[course_id]['students'] = students
+    def run_payroll(self):
+        """Generate salary slips for every teacher for a month."""
+        month = input("Payroll month (YYYY-MM, blank for current): ").strip() or None
+        try:
+            result = SERVICE.run_payroll(self.username, month)
+        except PortalError as e:
+            print(e)
+            return
+        print(f"Issued {result['issued']} salary slips for {result['month']}.")
 
     def view_system_stats(self):
         """Display system statistics."""
-        users = INITIAL_USERS  # Use embedded users
-        courses = {'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15},
-                   'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15},
-                   'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15}}
-        log_action(self.username, "Viewed system stats")
-
-        total_users = len(users)
-        total_students = sum(1 for u in users.values() if u.get('role') == 'student')
-        total_teachers = sum(1 for u in users.values() if u.get('role') == 'teacher')
-        total_admins = sum(1 for u in users.values() if u.get('role') == 'admin')
+        stats = SERVICE.system_stats(self.username)
 
         print("System statistics:")
-        print(f"Total users: {total_users}")
-        print(f"Total students: {total_students}")
-        print(f"Total teachers: {total_teachers}")
-        print(f"Total admins: {total_admins}")
-        print(f"Total courses: {len(courses)}")
+        print(f"Total users: {stats['total_users']}")
+        print(f"Total students: {stats['total_students']}")
+        print(f"Total teachers: {stats['total_teachers']}")
+        print(f"Total admins: {stats['total_admins']}")
+        print(f"Total courses: {stats['total_courses']}")
+        print(f"Total enrollments: {stats['total_enrollments']} ({stats['seat_fill']:.0%} of seats filled)")
+        print(f"Grades entered: {stats['grades_entered']}")
+        print(f"Active sessions: {stats['active_sessions']} ({stats['logins']} logins since startup)")
+
+        action = input("Enter 'e' to export a snapshot, 'c' to run a consistency check, anything else to return: ").strip().lower()
+        if action == 'e':
+            path = input("Export path (blank for a timestamped file): ").strip() or None
+            try:
+                print(f"Snapshot written to {SERVICE.export_stats(self.username, path)['path']}")
+            except PortalError as e:
+                print(e)
+        elif action == 'c':
+            diffs = SERVICE.check_stats(self.username)
+            if not diffs:
+                print("All counters match a full recount.")
+                return
+            for key, diff in diffs.items():
+                print(f"- {key}: counted {diff['counted']}, recount {diff['expected']}")
+            if get_valid_input("Replace the drifted counters with the recount? (y/n): ", ['y', 'n']) == 'y':
+                SERVICE.check_stats(self.username, repair=True)
+                print("Counters repaired.")
 
     def view_updates_by_teachers(self):
-        """Placeholder for viewing teacher updates."""
-        log_action(self.username, "Viewed updates by teachers")
-        print("Viewing updates by teachers is not implemented.")
+        """Display the latest personal-information updates made by teachers."""
+        updates = SERVICE.teacher_updates(self.username)
+        if not updates:
+            print("No updates by teachers found.")
+            return
+        print("Latest updates by teachers:")
+        for entry in updates:
+            print(f"{entry['time']} - {entry['username']}: {entry['action']}")
+
+    def audit_activity_log(self):
+        """Query the activity log by user, action and time range, with a summary."""
+        user = input("Username (blank for all): ").strip()
+        action = input("Action starts with (blank for any): ").strip()
+        since = input("From (YYYY-MM-DD [HH:MM], blank for start of log): ").strip()
+        until = input("To (YYYY-MM-DD [HH:MM], blank for now): ").strip()
+        try:
+            entries = SERVICE.audit_log(self.username, user, action, since, until, limit=50)
+            summary = SERVICE.audit_summary(self.username, since, until, top=5)
+        except PortalError as e:
+            print(e)
+            return
+
+        print(f"Latest {len(entries)} matching entries:")
+        for entry in entries:
+            print(f"{entry['time']} - {entry['username']}: {entry['action']}")
+        print()
+        print(f"Actions in range: {summary['total']}")
+        print("Top users: " + ", ".join(f"{u} ({n})" for u, n in summary['top_users']))
+        print(f"Failed logins: {summary['failed_logins']}"
+              + "".join(f", {u} ({n})" for u, n in summary['failed_by_user']))
+        busiest = sorted(summary['actions_per_hour'].items(), key=lambda item: -item[1])[:3]
+        print("Busiest hours: " + ", ".join(f"{hour}:00 ({n})" for hour, n in busiest))
+
+    def view_metrics(self):
+        """Display live call counts and latency percentiles, with JSON / Prometheus export."""
+        try:
+            result = SERVICE.metrics(self.username)
+        except PortalError as e:
+            print(e)
+            return
+        if not result['metrics']:
+            print("No calls recorded yet.")
+            return
+        print(f"Call latencies since {result['since']} (ms):")
+        print(f"{'Name':<34}{'Calls':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'Max':>10}")
+        for name, stats in result['metrics'].items():
+            print(f"{name:<34}{stats['count']:>9}" + "".join(f"{stats[k] * 1000:>10.3f}" for k in ('p50', 'p95', 'p99', 'max')))
+        action = input("Enter 'j' to export JSON, 'p' for Prometheus text, anything else to return: ").strip().lower()
+        if action in ('j', 'p'):
+            path = input("Export path (blank for a timestamped file): ").strip() or None
+            try:
+                print(f"Metrics written to {SERVICE.export_metrics(self.username, 'json' if action == 'j' else 'prometheus', path)['path']}")
+            except PortalError as e:
+                print(e)
 
     def change_password(self):
         """Change the admin's password."""
@@ -406,9 +4292,6 @@ class Admin(User):
             return
         new_pass = input("Enter new password: ")
         self.set_password(new_pass)
-        users = INITIAL_USERS  # Use embedded users
-        users[self.username]['password'] = new_pass
-        log_action(self.username, "Changed password")
         print("Password changed successfully.")
 
     def show_menu(self):
@@ -420,11 +4303,18 @@ class Admin(User):
             print("2. Create new teacher")
             print("3. Manage enrollments")
             print("4. View system statistics")
-            print("5. View updates by teachers (not implemented)")
-            print("6. Change password")
-            print("7. Logout")
+            print("5. Search user directory")
+            print("6. View updates by teachers")
+            print("7. Audit activity log")
+            print("8. Bulk import users / enrollments")
+            print("9. View grade analytics")
+            print("10. Run monthly payroll")
+            print("11. View live metrics")
+            print("12. Validate term enrollments")
+            print("13. Change password")
+            print("14. Logout")
 
-            choice = get_valid_input("Enter your choice: ", ['1', '2', '3', '4', '5', '6', '7'])
+            choice = get_valid_input("Enter your choice: ", [str(i) for i in range(1, 15)])
             if choice == '1':
                 self.create_login_ids('student')
             elif choice == '2':
@@ -434,97 +4324,208 @@ class Admin(User):
             elif choice == '4':
                 self.view_system_stats()
             elif choice == '5':
-                self.view_updates_by_teachers()
+                self.full_access()
             elif choice == '6':
-                self.change_password()
+                self.view_updates_by_teachers()
             elif choice == '7':
+                self.audit_activity_log()
+            elif choice == '8':
+                self.bulk_import_data()
+            elif choice == '9':
+                self.view_grade_analytics()
+            elif choice == '10':
+                self.run_payroll()
+            elif choice == '11':
+                self.view_metrics()
+            elif choice == '12':
+                self.validate_enrollments()
+            elif choice == '13':
+                self.change_password()
+            elif choice == '14':
                 break
             input("Press Enter to continue...")
 
 # Authentication and initialization
+# Demo accounts; the README's passwords are stored pre-hashed so no store ever holds them in plaintext
 INITIAL_USERS = {
-    'admin': {'role': 'admin', 'name': 'Administrator', 'password': 'admin123'},
-    'teacher1': {'role': 'teacher', 'name': 'John Smith', 'password': 'teach123', 'qualification': 'PhD'},
-    'student01': {'role': 'student', 'name': 'Student 01', 'password': 'stud001'},
-    'student02': {'role': 'student', 'name': 'Student 02', 'password': 'stud002'},
-    'student03': {'role': 'student', 'name': 'Student 03', 'password': 'stud003'},
-    'student04': {'role': 'student', 'name': 'Student 04', 'password': 'stud004'},
-    'student05': {'role': 'student', 'name': 'Student 05', 'password': 'stud005'},
-    'student06': {'role': 'student', 'name': 'Student 06', 'password': 'stud006'},
-    'student07': {'role': 'student', 'name': 'Student 07', 'password': 'stud007'},
-    'student08': {'role': 'student', 'name': 'Student 08', 'password': 'stud008'},
-    'student09': {'role': 'student', 'name': 'Student 09', 'password': 'stud009'},
-    'student10': {'role': 'student', 'name': 'Student 10', 'password': 'stud010'},
-    'student11': {'role': 'student', 'name': 'Student 11', 'password': 'stud011'},
-    'student12': {'role': 'student', 'name': 'Student 12', 'password': 'stud012'},
-    'student13': {'role': 'student', 'name': 'Student 13', 'password': 'stud013'},
-    'student14': {'role': 'student', 'name': 'Student 14', 'password': 'stud014'},
-    'student15': {'role': 'student', 'name': 'Student 15', 'password': 'stud015'},
-    'student16': {'role': 'student', 'name': 'Student 16', 'password': 'stud016'},
-    'student17': {'role': 'student', 'name': 'Student 17', 'password': 'stud017'},
-    'student18': {'role': 'student', 'name': 'Student 18', 'password': 'stud018'},
-    'student19': {'role': 'student', 'name': 'Student 19', 'password': 'stud019'},
-    'student20': {'role': 'student', 'name': 'Student 20', 'password': 'stud020'},
+    'admin': {'role': 'admin', 'name': 'Administrator',
+             'password': 'scrypt$16384$8$1$cf066de7cc3a1b65d5e649798de90d0d$fed8df7db818fb7157fac1cf18b90ccbd925ae8d755a0d9e6957e633b3ee04202124325c426554e1ba54e41a9ee5f4e58214c70c5e4f663de4b560d051a5a9c3'},
+    'teacher1': {'role': 'teacher', 'name': 'John Smith', 'qualification': 'PhD',
+                'password': 'scrypt$16384$8$1$9e542aed21a873cf4e3f44bf507b6c18$e7922892ea5f3097da68d26b86dcf6e3a3517508fcae76359c89bcbd33b51fd4eb5fb6dd9fd1324bf0663c58bb0eff8498852650cae2469acc2b60e970dc1478'},
+    'student01': {'role': 'student', 'name': 'Student 01',
+                 'password': 'scrypt$16384$8$1$b7aa5f1591bc9bebee0736cd03b36540$ebb26302541e7b5081b9ffdf6f996771f68692ddc0e24ee6fd8a53957c46c971c794f69a91810646c78a4907a5d910d24e7807acee5ae33387f53c824ba29b74'},
+    'student02': {'role': 'student', 'name': 'Student 02',
+                 'password': 'scrypt$16384$8$1$28ba8de6d95f089a3c5a8090651ce77e$6fd22ea7ee1c5b6f0177a432b3388c63a17d15133173efe541c4d573c1162dc4292cbe82cb7aa546198fec3c8c2896beb2dd81c422dfae2edbfa3bb41fe30d85'},
+    'student03': {'role': 'student', 'name': 'Student 03',
+                 'password': 'scrypt$16384$8$1$63960705709ff77199589682de209892$fcfa3abc48a73e97f123ea1300a52d36f04944cb9fce4727125a2ed15e2bd13e1cf007144dc8a1907ee38674534b8dfed12e6be4932bb329c329c45fe8afb796'},
+    'student04': {'role': 'student', 'name': 'Student 04',
+                 'password': 'scrypt$16384$8$1$911c075428f01b4a96b93dc61efe41d4$3a42cc4e1f57e42c5f74baf30defffed26328862e1ae9d3ee394d882d86ed0619df4daa08c972ca1df09a9645106115f018bfead0d795891023ba5635875e9b9'},
+    'student05': {'role': 'student', 'name': 'Student 05',
+                 'password': 'scrypt$16384$8$1$55a147f9e2375307a4995b44cc40dc55$ae917b5ba3c1b3c857e313ce3a2894186146a34f6530d37aa4d3c9133ad889cf8bdec2eba94c5a117429e01b1c9bf713b27e5c0ee5d0eec35f71d3b71f380fb2'},
+    'student06': {'role': 'student', 'name': 'Student 06',
+                 'password': 'scrypt$16384$8$1$29eba5f9a169a281ffebbeca1d0b18e8$4a4f3e7dc6c3dc5d815063e21f25f873aaad3b5c265ddfb3c8142c240a59502dc5a52609f3ea50920a32068084cb23f44a9cb636c9e307691d9b60f3f19da9c7'},
+    'student07': {'role': 'student', 'name': 'Student 07',
+                 'password': 'scrypt$16384$8$1$a9f77afdb200e47ab5e1fc5b7a750019$739348309becafdb44001ca274d613d535d1abb8dfb146ea8f28f33cc6f572f3dd01f5bd5c7d55147a3b9ce852fee175b8199f52c693a6c30313e35e873501c1'},
+    'student08': {'role': 'student', 'name': 'Student 08',
+                 'password': 'scrypt$16384$8$1$3945e3a688ca5f4616c3c86d447e1c08$ae5e9845d70b867bc465daee4e9de91f743eaca8f80b96cf4517558f2eaa9da056e3ca1e223482b7c1f17c0caa5816cf6e250653338d40e518f608a8dc1054b6'},
+    'student09': {'role': 'student', 'name': 'Student 09',
+                 'password': 'scrypt$16384$8$1$cf64ce314d6c960b0e9c96123e1cbbff$c85fb1eaeae168eb6cc4e90e1d7fbf8e8e6ac3ce8739eb56d98d611c483ad5b80d1476f3ef6ad1929e27f78f47c24f8e5570a3152bab4946d6a4683b9c486d5c'},
+    'student10': {'role': 'student', 'name': 'Student 10',
+                 'password': 'scrypt$16384$8$1$da9a748307e851fcd73b2bd1b21b3a07$35d343e16025ccac6b6c81eb15ed74d5bad9f4c2a79d7222e9d089faad5ec2ecc64c308699ef5f97d032142a9f144f6919b3fea59e6313307ffc60a0b1db04c4'},
+    'student11': {'role': 'student', 'name': 'Student 11',
+                 'password': 'scrypt$16384$8$1$8798fc5a55091ad3bf9f3c5f64934e40$f30337d454615968deed899341e1dc4a5d2a3720e17f1923c4f50bfffb901539238d09a760c7f953667d6e56f8254e056f53773104e56a5d01545bf93354812b'},
+    'student12': {'role': 'student', 'name': 'Student 12',
+                 'password': 'scrypt$16384$8$1$4d8d7df8bc2b65e775f7e30e1de1ad32$294594d550969d3be1f7a5575051ccbd9be4b330a490ab50cc68ce25332158aba606d466d59c56c88ea93554a1c3c4e2380703390c56a5710c8e5966cf03ad72'},
+    'student13': {'role': 'student', 'name': 'Student 13',
+                 'password': 'scrypt$16384$8$1$d807b9120f4e844ec8b3b61bec844058$f5db1c445bbaa2cd764be73e47d44e52ae4e8b889600e9dbfb261764933d0b82839300179d1f3444a8b07d5f6f503e9d3ea5a0ef08fec4c3058188c0878199e0'},
+    'student14': {'role': 'student', 'name': 'Student 14',
+                 'password': 'scrypt$16384$8$1$b7a4cc347ecdd53019deca54e2216a3b$4b23bbd0612a16ea20707ff3d7113e8888e3c692af959db5821b2b665c312c353f8fff12baebb0c1e788e43d2c9beac5d6d160ab341904a332665416e5529382'},
+    'student15': {'role': 'student', 'name': 'Student 15',
+                 'password': 'scrypt$16384$8$1$727e6d4ff9b572cc648857af04a9b88b$10c690e2182bf21b4119fd825711853194e1f6efaa161d358d8e58e0abbf84739f5f11a4780ec1a3c867ec84cd94d968421ec55778179f0a2e544f57adcedf07'},
+    'student16': {'role': 'student', 'name': 'Student 16',
+                 'password': 'scrypt$16384$8$1$e50570a6c896ea9f5874a52690e0d82d$10e7ebe07bf3d8b22e70ea72d5cb52457a5918bbed1b43837a9a0ff8da807f463672f2ae44ea480de1034022672917a42218d31800205ef958cc7e6ed955fb8a'},
+    'student17': {'role': 'student', 'name': 'Student 17',
+                 'password': 'scrypt$16384$8$1$8056904674d96010ef558de36a442cc6$cd7053f9999d3b38854567474d3be744429585cc72bac6438d2fb81ad60cc54bbe867f94e4117b4079538c9ce805bcf75f5654efce9f1843df88267224e4ff1f'},
+    'student18': {'role': 'student', 'name': 'Student 18',
+                 'password': 'scrypt$16384$8$1$e3612f63a0f8abe3b6a9a0d56fd2f9e6$683cea8b3cf79a928f3269cd67ad577d934268ab569f0a4c274999e0240308e37dba357f11737143b13e7d62f904b3550eb42d40b512d2e0b3e25d8711097128'},
+    'student19': {'role': 'student', 'name': 'Student 19',
+                 'password': 'scrypt$16384$8$1$aa0fd9a73697ec9299ed93f2944d3f8e$45674277fc87f531b2f16a10af1702073bdcf94c8e54704384266ab5755a57654546285182421d421ff9c49b0480931aaa419cd487b850968a3a08bd86333048'},
+    'student20': {'role': 'student', 'name': 'Student 20',
+                 'password': 'scrypt$16384$8$1$3394f38d4d0922298b680e475280189b$c4d93ae989bb4d0641bf61c8eab03f9769ff15d80882745ce7caabc12fb2ad1242b6cfd8d69ef92331b20da1fd86a183fcdf740fbf88281850694385d252a1f3'},
+}
+
+INITIAL_COURSES = {
+    'CSE101': {'name': 'Intro to AI', 'section': 'A', 'students': [], 'max_seats': 15, 'credits': 3,
+               'meetings': ['Mon 09:00-10:30', 'Wed 09:00-10:30']},
+    'MAT201': {'name': 'Discrete Math', 'section': 'B', 'students': [], 'max_seats': 15, 'credits': 3,
+               'meetings': ['Tue 11:00-12:30', 'Thu 11:00-12:30']},
+    'PHY301': {'name': 'Physics II', 'section': 'C', 'students': [], 'max_seats': 15, 'credits': 3,
+               'meetings': ['Mon 14:00-15:30', 'Fri 10:00-11:30'], 'prerequisites': ['MAT201']},
 }
 
+COURSE_CATALOG = CourseCatalog(INITIAL_COURSES, on_promote=SERVICE.record_promotion, on_change=STATS.enrollment_changed)  # Shared by every role
+STORE = MemoryStore(INITIAL_USERS)  # Replaced by the configured backend in init_users()
+
 def login():
     """Authenticate a user and return the corresponding user object."""
-    users = INITIAL_USERS  # Use embedded users
-    print(f"Available users: {list(users.keys())}")  # Debug print
     log_action('system', f"Login attempt for user")
 
     username = input("Username: ").strip()
-    if username not in users:
-        print(f"User not found. Available users: {list(users.keys())}")
+    if not SERVICE.user_exists(username):
+        print("User not found.")
         return None
 
     password = input("Password: ").strip()
-    if users[username]['password'] != password:
-        print("Incorrect password.")
+    try:
+        profile = SERVICE.authenticate(username, password, source='console')
+    except PortalError as e:
+        print(e)
         return None
-
-    role = users[username]['role']
-    name = users[username]['name']
-
-    user_classes = {'student': Student, 'teacher': Teacher, 'admin': Admin}
-    user_class = user_classes.get(role)
-    if not user_class:
-        print("Invalid role assigned to user.")
-        return None
-
-    user = user_class(username, password, name)
-    user.set_password(password)
-    log_action(username, "Logged in")
-    return user
+    return profile['token'], SESSIONS.user(profile['token'])
 
 def init_courses():
-    """Initialize courses data if not present (in-memory for now)."""
-    pass  # Courses are now defined within methods
-
-def init_salary_slips():
-    """Initialize salary slips data if not present (in-memory for now)."""
-    pass  # Salary slips are now defined within methods
+    """Initialize courses data and restore stored enrollments into the catalog."""
+    global COURSE_CATALOG
+    if Config.ENROLLMENT_SHARDS > 1 and not isinstance(COURSE_CATALOG, ShardedCatalog):
+        STATS.clear_courses()
+        COURSE_CATALOG = ShardedCatalog(shards=Config.ENROLLMENT_SHARDS, on_promote=SERVICE.record_promotion,
+                                        on_change=STATS.enrollment_changed,
+                                        threads=Config.SHARD_THREADS + min(32, (os.cpu_count() or 1) + 4))  # + default executor
+    for course_id, info in INITIAL_COURSES.items():
+        if course_id not in COURSE_CATALOG:
+            COURSE_CATALOG.add_course(course_id, info['name'], info.get('section', 'N/A'), info.get('max_seats', 0),
+                                      info.get('credits', Config.DEFAULT_CREDITS), info.get('meetings'),
+                                      info.get('prerequisites'))
+    for username, course_id in STORE.iter_enrollments():
+        if COURSE_CATALOG.restore(username, course_id) == 'invalid':
+            log_action('system', f"Stored enrollment of {username} in unknown course {course_id} not restored")
 
 def init_users():
-    """Initialize users data (already embedded)."""
-    pass  # Users are now in INITIAL_USERS
+    """Open the configured storage backend (seeded from INITIAL_USERS when empty)."""
+    global STORE
+    STORE = open_store()
+    STATS.load(STORE)
+    SESSIONS.clear()
+    DIRECTORY.reset()
 
 def main():
     """Main function to run the portal system."""
     clear_screen()
     current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S PKT')
     print(f"Welcome to the Portal System (Student / Teacher / Admin) - {current_time}")
-    init_courses()
-    init_salary_slips()
     init_users()
+    init_courses()
+
+    try:
+        session = None
+        while not session:
+            session = login()
+        token, user = session
 
-    user = None
-    while not user:
-        user = login()
+        with profile_session(user.username) as profile_path:
+            user.show_menu()
+        SERVICE.logout(user.username, token)
+        if profile_path:
+            print(f"Session profile saved to {profile_path}")
+        ACTIVITY_LOGGER.flush()
+        print("Logged out. Goodbye.")
+    finally:
+        COURSE_CATALOG.close()
+        STORE.close()
+        ACTIVITY_LOGGER.close()
+
+def serve(host=Config.SERVER_HOST, port=Config.SERVER_PORT):
+    """Run the portal as a JSON-lines server until interrupted."""
+    import asyncio
+    init_users()
+    init_courses()
+    DIRECTORY.load(STORE.iter_users())  # Built up front so the first search does not stall the event loop
+    server = PortalServer(host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        COURSE_CATALOG.close()
+        STORE.close()
+        ACTIVITY_LOGGER.close()
 
-    user.show_menu()
-    log_action(user.username, "Logged out")
-    print("Logged out. Goodbye.")
+def audit(user=None, action=None, since=None, until=None, limit=100, summary=False):
+    """Print matching activity log entries, or a summary, without starting the portal."""
+    try:
+        since, until = SERVICE._check_time(since), SERVICE._check_time(until, end=True)
+    except PortalError as e:
+        print(e)
+        return
+    if not summary:
+        for ts, username, text in AUDIT_LOG.query(user, action, since, until, limit=limit):
+            print(f"{ts} - {username}: {text}")
+        return
+    report = AUDIT_LOG.aggregate(since, until)
+    print(f"Actions: {report['total']}")
+    print(f"Failed logins: {report['failed_logins']}")
+    print("Top users: " + ", ".join(f"{u} ({n})" for u, n in report['top_users']))
+    print("Actions per hour:")
+    for hour, n in report['actions_per_hour'].items():
+        print(f"  {hour}:00  {n}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="University portal system")
+    parser.add_argument('--serve', action='store_true', help="run the JSON-lines server instead of the CLI")
+    parser.add_argument('--host', default=Config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVER_PORT)
+    parser.add_argument('--audit', action='store_true', help="query the activity log and exit")
+    parser.add_argument('--user', help="audit: only this user's entries")
+    parser.add_argument('--action', help="audit: only actions starting with this text")
+    parser.add_argument('--since', help="audit: YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument('--until', help="audit: YYYY-MM-DD [HH:MM[:SS]]")
+    parser.add_argument('--limit', type=int, default=100, help="audit: latest entries to print")
+    parser.add_argument('--summary', action='store_true', help="audit: print aggregates instead of entries")
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.host, args.port)
+    elif args.audit:
+        audit(args.user, args.action, args.since, args.until, args.limit, args.summary)
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Time GradeAnalytics.from_store end to end over a synthetic in-memory store of grade rows.
+
+Usage: python benchmarks/bench_analytics.py [grade_rows]
+
+Students take four courses each with one grade per course. from_store is timed as the
+portal calls it (columnar export from the store plus the NumPy pass); the NumPy pass
+over already-built arrays is reported separately.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # Keep the activity log out of the working tree
+from Portal_system import CourseCatalog, GradeAnalytics, MemoryStore
+
+PER_STUDENT = 4
+
+
+def build(rows, courses=500, seed=42):
+    rng = np.random.default_rng(seed)
+    students = rows // PER_STUDENT
+    course_ids = [f"C{i:04d}" for i in range(courses)]
+    catalog = CourseCatalog({c: {'name': c, 'credits': int(k)} for c, k in zip(course_ids, rng.integers(1, 5, courses))})
+    store = MemoryStore()
+    usernames = [f"student{i:07d}" for i in range(students)]
+    store.add_users((u, {'role': 'student', 'name': u, 'password': 'x'}) for u in usernames)
+    picks = rng.integers(0, courses, (students, PER_STUDENT))
+    grades = np.clip(rng.normal(72, 12, (students, PER_STUDENT)), 0, 100).tolist()
+    semesters = rng.integers(1, 9, (students, PER_STUDENT)).tolist()
+    for username, row, marks, sems in zip(usernames, picks.tolist(), grades, semesters):
+        for k, course in enumerate(dict.fromkeys(row)):
+            store.add_enrollment(username, course_ids[course], sems[k])
+            store.add_grade(username, course_ids[course], marks[k], 0.0)
+    return store, catalog
+
+
+def run(rows):
+    store, catalog = build(rows)
+
+    start = time.perf_counter()
+    analytics = GradeAnalytics.from_store(store, catalog)
+    elapsed = time.perf_counter() - start
+
+    columns = store.grade_columns()
+    user_idx = np.repeat(np.arange(len(columns[0])), columns[1])
+    course_ids = list(dict.fromkeys(columns[2]))
+    codes = {c: i for i, c in enumerate(course_ids)}
+    course_idx = np.fromiter(map(codes.__getitem__, columns[2]), np.int64, len(columns[2]))
+    credits = [catalog[c]['credits'] for c in course_ids]
+    start = time.perf_counter()
+    GradeAnalytics(columns[0], course_ids, user_idx, course_idx, columns[3], np.frombuffer(columns[5]), credits)
+    numpy_pass = time.perf_counter() - start
+
+    print(f"grade rows:        {analytics.grade_rows:,}")
+    print(f"students graded:   {len(analytics.graded_users):,}")
+    print(f"mean GPA:          {analytics.mean_gpa:.3f}")
+    print(f"from_store:        {elapsed * 1000:.0f} ms (store export + analytics)")
+    print(f"analytics pass:    {numpy_pass * 1000:.0f} ms (arrays already built)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,83 @@
+"""Time the activity-log audit index against a plain line-by-line scan.
+
+Usage: python benchmarks/bench_audit.py [lines]
+
+Writes a synthetic log (one entry every few seconds across 30 days) into a temp
+directory, then times the first index build, an incremental refresh after more
+lines arrive, a refresh after the log is rotated (the renamed file's blocks carry
+over), a one-user/one-week query across both files and a range aggregate.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import ActivityLogIndex
+
+ACTIONS = ["Logged in", "Logged out", "Viewed academic records", "Enrolled in course CSE101",
+           "Entered CGPA for course MAT201", "Failed login (incorrect password) from 10.0.0.1"]
+
+
+def write_log(path, lines, start, users=5000, seed=1):
+    rng = random.Random(seed)
+    ts = start
+    with open(path, 'a') as f:
+        for _ in range(lines):
+            ts += timedelta(seconds=rng.randint(0, 5))
+            f.write(f"{ts:%Y-%m-%d %H:%M:%S} PKT - User: user{rng.randrange(users):05d} - Action: {rng.choice(ACTIONS)}\n")
+    return ts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def full_scan(paths, user, since, until):
+    """What the grep workflow costs: read and test every line of every file."""
+    needle = f"User: {user} - "
+    lines = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            lines.extend(line for line in f if needle in line and since <= line[:19] <= until)
+    return lines
+
+
+def run(lines):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'activity_log.txt')
+    end = write_log(path, lines, datetime(2026, 1, 1))
+    since = (end - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+    until = end.strftime('%Y-%m-%d %H:%M:%S')
+
+    index = ActivityLogIndex(path)
+    _, build = timed(lambda: index.query(user='nobody'))
+    end = write_log(path, lines // 100, end, seed=2)
+    _, refresh = timed(lambda: index.query(user='nobody'))
+    os.replace(path, f"{path}.1")  # What ActivityLogger does past LOG_MAX_BYTES
+    end = write_log(path, lines // 100, end, seed=3)
+    _, rotated = timed(lambda: index.query(user='nobody'))
+    reopened = ActivityLogIndex(path)
+    _, reload = timed(lambda: reopened.query(user='nobody'))
+    hits, query = timed(lambda: reopened.query(user='user00042', since=since, until=until))
+    scanned, scan = timed(lambda: full_scan([f"{path}.1", path], 'user00042', since, until))
+    report, aggregate = timed(lambda: reopened.aggregate(since, until))
+    assert len(hits) == len(scanned), (len(hits), len(scanned))
+
+    size = os.path.getsize(path) + os.path.getsize(f"{path}.1")
+    print(f"log:                 {size / 2**20:.0f} MiB in 2 files, {lines + 2 * (lines // 100):,} lines, "
+          f"{sum(map(len, reopened.segments.values()))} index blocks")
+    print(f"first index build:   {build:8.1f} ms")
+    print(f"refresh (+1% lines): {refresh:8.1f} ms")
+    print(f"rotate, +1% lines:   {rotated:8.1f} ms")
+    print(f"reopen from sidecar: {reload:8.1f} ms")
+    print(f"user, last week:     {query:8.1f} ms  ({len(hits)} entries; full scan {scan:.1f} ms)")
+    print(f"aggregate last week: {aggregate:8.1f} ms  ({report['total']:,} actions, {report['failed_logins']:,} failed logins)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
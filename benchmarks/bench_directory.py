@@ -0,0 +1,56 @@
+"""Time UserDirectory builds, searches and updates over a large synthetic user base.
+
+Usage: python benchmarks/bench_directory.py [users]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import UserDirectory
+
+FIRST = ['Ali', 'Sara', 'John', 'Ayesha', 'Omar', 'Fatima', 'Hassan', 'Maria', 'Usman', 'Zainab', 'David', 'Hina']
+LAST = ['Khan', 'Smith', 'Ahmed', 'Malik', 'Brown', 'Hussain', 'Raza', 'Iqbal', 'Jones', 'Sheikh', 'Butt', 'Lee']
+QUALIFICATIONS = ['PhD Computer Science', 'PhD Physics', 'MPhil Mathematics', 'MS Statistics', 'MS Software Engineering']
+
+
+def users(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        role = 'teacher' if i % 50 == 0 else 'student'
+        info = {'role': role, 'name': f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}"}
+        if role == 'teacher':
+            info['qualification'] = rng.choice(QUALIFICATIONS)
+        yield f"{role[0]}{i:07d}", info
+
+
+def per_call_us(fn, calls=2000):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(count):
+    directory = UserDirectory()
+    start = time.perf_counter()
+    directory.load(users(count))
+    build = time.perf_counter() - start
+
+    prefixes = [f"s{i:04d}" for i in range(2000)]
+    print(f"users:                     {count:,} ({len(directory.index):,} search keys)")
+    print(f"build:                     {build:.2f} s")
+    print(f"username prefix, page 1:   {per_call_us(lambda i: directory.search(prefixes[i])):.1f} us")
+    print(f"name prefix + role:        {per_call_us(lambda i: directory.search('ayesha kh'[:3 + i % 3], role='student')):.1f} us")
+    print(f"'s' among teachers:        {per_call_us(lambda i: directory.search('s', role='teacher')):.1f} us")
+    print(f"'student' among admins:    {per_call_us(lambda i: directory.search('student', role='admin')):.1f} us")
+    print(f"name + qualification:      {per_call_us(lambda i: directory.search('sara', qualification='phd')):.1f} us")
+    print(f"teachers, page 500:        {per_call_us(lambda i: directory.search(role='teacher', page=500)):.1f} us")
+    print(f"qualification prefix:      {per_call_us(lambda i: directory.search(qualification='phd', page=1 + i % 50)):.1f} us")
+    print(f"create (insert keys):      {per_call_us(lambda i: directory.add_many([(f'new{i:06d}', {'role': 'student', 'name': 'New Student'})]), 500):.1f} us")
+    print(f"rename + requalify:        {per_call_us(lambda i: directory.update(f't{(i % 100) * 50:07d}', f'Renamed {i}', 'MS Data Science'), 500):.1f} us")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
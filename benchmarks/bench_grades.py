@@ -0,0 +1,64 @@
+"""Time one teacher submitting a whole section's grades against grading it one student at a time.
+
+Usage: python benchmarks/bench_grades.py [students] [memory|sqlite]
+
+Each student is enrolled in the benchmark section plus two already-graded courses,
+so the cumulative CGPA recompute has real rows to weigh.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # Keep the activity log out of the working tree
+import Portal_system as portal
+from Portal_system import CourseCatalog, MemoryStore, SQLiteStore, grade_to_cgpa
+
+SECTION = 'SEC001'
+OTHER = ['OLD101', 'OLD102']
+
+
+def setup(students, backend):
+    store = MemoryStore({}) if backend == 'memory' else SQLiteStore('bench.db')
+    usernames = [f"s{i:06d}" for i in range(students)]
+    store.add_users((u, {'role': 'student', 'name': f"Student {u}", 'password': 'x'}) for u in usernames)
+    with store.batch():
+        store.add_enrollments((u, c, k + 1) for u in usernames for k, c in enumerate(OTHER + [SECTION]))
+        for u in usernames:
+            for course_id in OTHER:
+                store.add_grade(u, course_id, 80.0, grade_to_cgpa(80.0))
+    catalog = CourseCatalog({c: {'name': c, 'max_seats': students} for c in OTHER + [SECTION]})
+    for u in usernames:
+        catalog.enroll(u, SECTION)
+    portal.STORE, portal.COURSE_CATALOG = store, catalog
+    return usernames
+
+
+def run(students, backend='memory'):
+    usernames = setup(students, backend)
+    rng = random.Random(3)
+    rows = [{'username': u, 'grade': round(rng.uniform(40, 100), 1)} for u in usernames]
+
+    start = time.perf_counter()
+    result = portal.SERVICE.submit_grades('teacher1', SECTION, rows)
+    bulk = time.perf_counter() - start
+    assert result['applied'] == students and not result['errors'], result['errors'][:5]
+
+    start = time.perf_counter()
+    for row in rows:
+        portal.SERVICE.enter_grade(row['username'], SECTION, row['grade'])
+    single = time.perf_counter() - start
+    portal.STORE.close()
+    portal.ACTIVITY_LOGGER.close()
+
+    print(f"backend:              {backend}")
+    print(f"section size:         {students:,} students")
+    print(f"bulk submission:      {bulk * 1000:.1f} ms")
+    print(f"one grade at a time:  {single * 1000:.1f} ms (service calls only, no prompts)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        sys.argv[2] if len(sys.argv) > 2 else 'memory')
@@ -0,0 +1,47 @@
+"""Compare log_action throughput: open-append-close per call vs the buffered ActivityLogger.
+
+Usage: python benchmarks/bench_logging.py [actions]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import ActivityLogger
+
+
+def legacy_log_action(path, username, action):
+    """The original log_action: format, open, append, close on every call."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S PKT')
+    with open(path, 'a') as f:
+        f.write(f"{timestamp} - User: {username} - Action: {action}\n")
+
+
+def run(actions):
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.txt')
+        start = time.perf_counter()
+        for i in range(actions):
+            legacy_log_action(legacy_path, f"student{i % 100:02d}", "Enrolled in course CSE101")
+        legacy = actions / (time.perf_counter() - start)
+
+        logger = ActivityLogger(os.path.join(tmp, 'buffered.txt'), max_bytes=0)
+        start = time.perf_counter()
+        for i in range(actions):
+            logger.log(f"student{i % 100:02d}", "Enrolled in course CSE101")
+        logger.close()  # Include the final flush in the measurement
+        buffered = actions / (time.perf_counter() - start)
+
+        with open(legacy_path) as a, open(os.path.join(tmp, 'buffered.txt')) as b:
+            assert sum(1 for _ in a) == sum(1 for _ in b) == actions
+
+    print(f"actions:            {actions}")
+    print(f"open-append-close:  {legacy:,.0f} actions/s")
+    print(f"ActivityLogger:     {buffered:,.0f} actions/s")
+    print(f"speedup:            {buffered / legacy:.1f}x")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
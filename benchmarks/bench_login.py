@@ -0,0 +1,36 @@
+"""Measure password verifications per second for different KDF costs, cold and cached.
+
+Usage: python benchmarks/bench_login.py [logins]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import CredentialManager, hash_password
+
+SETTINGS = [('scrypt', 2 ** 12), ('scrypt', 2 ** 14), ('scrypt', 2 ** 15),
+            ('pbkdf2_sha256', 100000), ('pbkdf2_sha256', 600000)]
+
+
+def rate(func, count):
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (time.perf_counter() - start)
+
+
+def run(logins):
+    print(f"{'kdf':<15}{'cost':>8}{'cold logins/s':>16}{'cached logins/s':>18}")
+    for kdf, cost in SETTINGS:
+        stored = hash_password('secret', kdf, cost)
+        cold = CredentialManager(cache_size=0)
+        cached = CredentialManager()
+        cached.verify('student01', 'secret', stored)
+        cold_rate = rate(lambda i: cold.verify(f"user{i}", 'secret', stored), logins)
+        cached_rate = rate(lambda i: cached.verify('student01', 'secret', stored), logins * 100)
+        print(f"{kdf:<15}{cost:>8}{cold_rate:>16,.1f}{cached_rate:>18,.0f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
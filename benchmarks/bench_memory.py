@@ -0,0 +1,67 @@
+"""Compare bytes per student of the old dict-based rows and MemoryStore's compact rows.
+
+Usage: python benchmarks/bench_memory.py [students] [courses_per_student] [grades_per_course]
+
+Input strings (usernames, names, password hashes) are built before tracing starts,
+so the figures are the per-row cost of the containers holding them.
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import MemoryStore, grade_to_cgpa
+
+COURSES = [f"C{i:04d}" for i in range(500)]
+
+
+def dict_layout(users, enrollments, grades):
+    """The previous MemoryStore layout: a dict per user and per academic record."""
+    user_rows = {username: dict(info) for username, info in users}
+    records = {}
+    for username, course_id, semester in enrollments:
+        records.setdefault(username, {})[course_id] = {'course_id': course_id, 'semester': semester, 'grades': [], 'cgpa': 0.0}
+    for username, course_id, grade in grades:
+        rec = records[username][course_id]
+        rec['grades'].append(grade)
+        rec['cgpa'] = grade_to_cgpa(grade)
+    return user_rows, records
+
+
+def compact_layout(users, enrollments, grades):
+    store = MemoryStore()
+    store.add_users(users)
+    store.add_enrollments(enrollments)
+    for username, course_id, grade in grades:
+        store.add_grade(username, course_id, grade, grade_to_cgpa(grade))
+    return store
+
+
+def measure(build, *inputs):
+    tracemalloc.start()
+    result = build(*inputs)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def run(students, per_student, grades_per_course):
+    users = [(f"s{i:07d}", {'role': 'student', 'name': f"Student {i}", 'password': f"scrypt$16384$8$1${i:032x}${i:064x}"})
+             for i in range(students)]
+    enrollments = [(username, COURSES[(i * 7 + k) % len(COURSES)], k + 1)
+                   for i, (username, _) in enumerate(users) for k in range(per_student)]
+    grades = [(username, course_id, float(50 + (i + g) % 50))
+              for i, (username, course_id, _) in enumerate(enrollments) for g in range(grades_per_course)]
+
+    before = measure(dict_layout, users, enrollments, grades)
+    after = measure(compact_layout, users, enrollments, grades)
+    print(f"students: {students:,}  records: {len(enrollments):,}  grades: {len(grades):,}")
+    print(f"dict rows:     {before / students:7.0f} bytes/student")
+    print(f"compact rows:  {after / students:7.0f} bytes/student  ({1 - after / before:.0%} smaller)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 2)
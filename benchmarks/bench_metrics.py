@@ -0,0 +1,45 @@
+"""Measure the per-call cost of metrics instrumentation when it is off and when it is on.
+
+Usage: python benchmarks/bench_metrics.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import Metrics
+
+
+def work(x):
+    return x + 1
+
+
+def per_call_ns(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def block_ns(metrics, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        with metrics.timer('block'):
+            work(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def run(calls):
+    off, on = Metrics(enabled=False), Metrics(enabled=True)
+    base = per_call_ns(work, calls)
+    print(f"plain call:           {base:7.0f} ns")
+    print(f"instrumented, off:    {per_call_ns(off.instrument(work), calls):7.0f} ns")
+    print(f"instrumented, on:     {per_call_ns(on.instrument(work), calls):7.0f} ns")
+    print(f"timed block, off:     {block_ns(off, calls):7.0f} ns")
+    print(f"timed block, on:      {block_ns(on, calls):7.0f} ns")
+    stats = on.snapshot()['work']
+    print(f"recorded work():      {stats['count']:,} calls, p50 {stats['p50'] * 1e9:.0f} ns, p99 {stats['p99'] * 1e9:.0f} ns")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
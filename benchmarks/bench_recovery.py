@@ -0,0 +1,94 @@
+"""Time crash recovery of the journal backend for a store of a million academic records.
+
+Usage: python benchmarks/bench_recovery.py [records]
+
+Builds the records through the WAL (students x 4 graded courses), then reopens the
+store three ways: from the snapshot alone, by replaying the whole WAL, and from a
+snapshot plus a 10% WAL tail ending in a torn frame. Every reopen must come back with
+all the users, records and grades that were written before the crash. Finally it times
+the write that crosses the snapshot threshold, which only hands the snapshot off.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # Activity log and journal files stay out of the working tree
+from Portal_system import JournaledStore
+
+COURSES = ['CSE101A', 'MAT101A', 'PHY101A', 'ENG101A']
+NEVER = 10 ** 12  # snapshot_every that keeps automatic snapshots out of the way
+
+
+def size_mb(path):
+    return os.path.getsize(path) / 2 ** 20 if os.path.exists(path) else 0.0
+
+
+def populate(store, students, start=0):
+    """Enroll and grade students in every course, one section-sized WAL record per call."""
+    usernames = [f"s{i:07d}" for i in range(start, start + students)]
+    for chunk in range(0, len(usernames), 500):
+        group = usernames[chunk:chunk + 500]
+        store.add_users((u, {'role': 'student', 'name': f"Student {u}", 'password': 'x'}) for u in group)
+        store.add_enrollments((u, c, k + 1) for u in group for k, c in enumerate(COURSES))
+        for course_id in COURSES:
+            store.add_grades(course_id, [(u, 75.0, 3.0) for u in group])
+
+
+def reopen(label, path, students):
+    start = time.perf_counter()
+    store = JournaledStore(path, snapshot_every=NEVER)
+    elapsed = time.perf_counter() - start
+    records = sum(len(recs) for recs in store.records.values())
+    grades = sum(len(rec.grades or ()) for recs in store.records.values() for rec in recs)
+    print(f"{label:<26}{elapsed:8.2f} s  ({records:,} records, {len(store.users):,} users)")
+    expected = students * len(COURSES)
+    assert len(store.users) == students, (label, len(store.users), students)
+    assert records == grades == expected, (label, records, grades, expected)
+    store.wal.close()
+    return store
+
+
+def run(records):
+    students = records // len(COURSES)
+    tail = students // 10
+
+    store = JournaledStore('wal-only', snapshot_every=NEVER)
+    start = time.perf_counter()
+    populate(store, students)
+    store.wal.sync()
+    elapsed = time.perf_counter() - start
+    print(f"records:                  {students * len(COURSES):,} ({students:,} students x {len(COURSES)} courses)")
+    print(f"build through WAL:        {elapsed:8.2f} s  (WAL {size_mb('wal-only.wal'):.1f} MB, "
+          f"{store.wal.next_lsn - 1:,} frames)")
+    store.wal.close()
+    reopen('recover from WAL only:', 'wal-only', students)
+
+    store = JournaledStore('snap', snapshot_every=NEVER)
+    populate(store, students - tail)
+    start = time.perf_counter()
+    store.snapshot()
+    elapsed = time.perf_counter() - start
+    print(f"write snapshot:           {elapsed:8.2f} s  (snapshot {size_mb('snap.snap'):.1f} MB)")
+    populate(store, tail, start=students - tail)
+    store.wal.sync()
+    store.wal.close()
+    with open('snap.wal', 'ab') as f:
+        f.write(b'\x00' * 7)  # A frame cut short by the crash
+    reopen('recover snapshot + tail:', 'snap', students)
+
+    store = JournaledStore('snap', snapshot_every=NEVER)
+    store.close()  # Folds the tail into a fresh snapshot
+    reopen('recover from snapshot:', 'snap', students)
+
+    store = JournaledStore('snap', snapshot_every=1)
+    start = time.perf_counter()
+    store.add_user('late', {'role': 'student', 'name': 'Late Student', 'password': 'x'})  # Due a snapshot
+    stall = time.perf_counter() - start
+    store.close()
+    print(f"write due a snapshot:     {stall * 1000:8.2f} ms (the snapshot is written in the background)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
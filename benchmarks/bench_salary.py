@@ -0,0 +1,51 @@
+"""Time monthly payroll runs and salary-slip page queries over a long history.
+
+Usage: python benchmarks/bench_salary.py [teachers] [months] [memory|sqlite]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import MemoryStore, SQLiteStore, month_offset, run_payroll
+
+QUALIFICATIONS = ['PhD', 'MPhil', 'MS', '']
+
+
+def run(teachers, months, backend='memory'):
+    workdir = tempfile.mkdtemp()
+    store = MemoryStore({}) if backend == 'memory' else SQLiteStore(os.path.join(workdir, 'bench.db'))
+    store.add_users((f"teacher{i:05d}", {'role': 'teacher', 'name': f"Teacher {i}", 'password': 'x',
+                                         'qualification': QUALIFICATIONS[i % len(QUALIFICATIONS)]})
+                    for i in range(teachers))
+
+    first = '2000-01'
+    start = time.perf_counter()
+    for m in range(months):
+        run_payroll(month_offset(first, m), store)
+    payroll = time.perf_counter() - start
+    latest = month_offset(first, months - 1)
+
+    queries = 1000
+    start = time.perf_counter()
+    for i in range(queries):
+        store.salary_slips(f"teacher{i % teachers:05d}", month_offset(latest, -11), latest)
+    recent = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(queries):
+        store.salary_slips(f"teacher{i % teachers:05d}", offset=months // 2, limit=12)
+    deep = time.perf_counter() - start
+    store.close()
+
+    print(f"backend:            {backend}")
+    print(f"slips issued:       {teachers * months:,} ({teachers:,} teachers x {months} months)")
+    print(f"payroll per month:  {payroll / months * 1000:.1f} ms")
+    print(f"last-12-months:     {recent / queries * 1e6:.0f} us/query")
+    print(f"mid-history page:   {deep / queries * 1e6:.0f} us/query")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 240,
+        sys.argv[3] if len(sys.argv) > 3 else 'memory')
@@ -0,0 +1,90 @@
+"""Measure enrollment throughput of the sharded catalog as shards and client processes grow.
+
+Usage: python benchmarks/bench_sharding.py [ops_per_client] [max_shards]
+
+Each run starts a ShardedCatalog with N shards and N client processes, each client
+driving a random enroll/unenroll mix through its own ShardRouter. The first line is
+the in-process CourseCatalog driven from one process, for reference. Throughput can
+only scale up to the number of free cores (printed first).
+"""
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import Config, CourseCatalog, ShardedCatalog, ShardRouter
+
+SECTIONS = 400
+SEATS = 50
+STUDENTS = 20000
+
+
+def workload(catalog, ops, seed):
+    rng = random.Random(seed)
+    course_ids = [f"SEC{i:04d}" for i in range(SECTIONS)]
+    for _ in range(ops):
+        username = f"student{rng.randrange(STUDENTS):05d}"
+        course_id = rng.choice(course_ids)
+        if rng.random() < 0.3:
+            catalog.unenroll(username, course_id)
+        else:
+            catalog.enroll(username, course_id, limit=Config.MAX_ENROLLMENT, waitlist=rng.random() < 0.2)
+
+
+def client(conns, ops, seed, ready, go):
+    router = ShardRouter(*conns)
+    ready.release()
+    go.wait()
+    workload(router, ops, seed)
+
+
+def courses():
+    return {f"SEC{i:04d}": {'name': f"Section {i}", 'max_seats': SEATS} for i in range(SECTIONS)}
+
+
+def run_sharded(shards, ops):
+    catalog = ShardedCatalog(courses(), shards=shards, extra_clients=shards)
+    ready, go = multiprocessing.Semaphore(0), multiprocessing.Event()
+    clients = [multiprocessing.Process(target=client, args=(catalog.client_connections(i), ops, i, ready, go))
+               for i in range(shards)]
+    for process in clients:
+        process.start()
+    for _ in clients:
+        ready.acquire()
+    start = time.perf_counter()
+    go.set()
+    for process in clients:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    oversold = [c for c in catalog.courses if len(catalog.roster(c)) > SEATS]
+    over_limit = [u for u in (f"student{i:05d}" for i in range(0, STUDENTS, 97))
+                  if len(catalog.courses_for(u)) > Config.MAX_ENROLLMENT]
+    catalog.close()
+    return shards * ops / elapsed, oversold or over_limit
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else max(os.cpu_count() or 1, 2)
+    print(f"cores: {os.cpu_count()}")
+
+    catalog = CourseCatalog(courses())
+    start = time.perf_counter()
+    workload(catalog, ops, 0)
+    print(f"in-process catalog:        {ops / (time.perf_counter() - start):10,.0f} ops/s")
+
+    failed = False
+    shards = 1
+    while shards <= max_shards:
+        rate, problems = run_sharded(shards, ops)
+        failed |= bool(problems)
+        print(f"{shards:2d} shards x {shards:2d} clients:    {rate:10,.0f} ops/s" + ("  INVARIANT VIOLATED" if problems else ""))
+        shards *= 2
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
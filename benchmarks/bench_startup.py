@@ -0,0 +1,72 @@
+"""Measure import time and time-to-first-prompt of the portal and check them against a budget.
+
+Exits with status 1 when a median exceeds its budget, so it can gate a CI job:
+    python benchmarks/bench_startup.py --runs 7
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = 150
+PROMPT_BUDGET_MS = 500
+
+
+def import_time_ms():
+    """Cumulative import time of Portal_system as reported by -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import Portal_system'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*Portal_system$', line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError("Portal_system not found in -X importtime output")
+
+
+def prompt_time_ms(workdir):
+    """Wall time from process spawn until the login prompt appears on stdout."""
+    env = dict(os.environ, PORTAL_STORAGE='memory', PYTHONUNBUFFERED='1')
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'Portal_system.py')], cwd=workdir, env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    seen = b''
+    try:
+        while b'Username:' not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("portal exited before showing the login prompt")
+            seen += chunk
+        return (time.perf_counter() - start) * 1000
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS, help="milliseconds")
+    parser.add_argument('--prompt-budget', type=float, default=PROMPT_BUDGET_MS, help="milliseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        imports = [import_time_ms() for _ in range(args.runs)]
+        prompts = [prompt_time_ms(workdir) for _ in range(args.runs)]
+
+    failed = False
+    for label, samples, budget in (('import', imports, args.import_budget),
+                                   ('first prompt', prompts, args.prompt_budget)):
+        median = statistics.median(samples)
+        status = 'ok' if median <= budget else 'OVER BUDGET'
+        failed |= median > budget
+        print(f"{label:>12}: median {median:7.1f} ms  min {min(samples):7.1f} ms  budget {budget:.0f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Time enrollment clash/prerequisite checks and whole-term validation with thousands of courses.
+
+Usage: python benchmarks/bench_timetable.py [courses] [students]
+
+Courses get one to three weekly meetings and up to two prerequisites drawn from
+lower-numbered courses, so chains run deep. Each student passes a random set of
+earlier courses and then attempts enrollments through the catalog; the whole term
+is then re-validated in one pass, which should find nothing the live checks let through.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # Keep the activity log out of the working tree
+from Portal_system import WEEKDAYS, CourseCatalog, MemoryStore, validate_enrollments
+
+
+def meeting(rng):
+    start = rng.randrange(8 * 60, 18 * 60, 30)
+    return f"{rng.choice(WEEKDAYS[:5])} {start // 60:02d}:{start % 60:02d}-{(start + 80) // 60:02d}:{(start + 80) % 60:02d}"
+
+
+def build(courses, rng):
+    info = {}
+    for i in range(courses):
+        prerequisites = rng.sample(range(max(i - 50, 0), i), min(i, rng.randint(0, 2)))
+        info[f"C{i:05d}"] = {'name': f"Course {i}", 'max_seats': 10 ** 6,
+                             'meetings': [meeting(rng) for _ in range(rng.randint(1, 3))],
+                             'prerequisites': [f"C{p:05d}" for p in prerequisites]}
+    return info
+
+
+def run(courses, students):
+    rng = random.Random(7)
+    start = time.perf_counter()
+    catalog = CourseCatalog(build(courses, rng))
+    print(f"catalog:              {courses:,} courses in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    graph = catalog.prerequisites
+    order = graph.order()
+    elapsed = time.perf_counter() - start
+    depth = max(len(graph.closure(c)) for c in order)
+    print(f"order + closure:      {elapsed * 1000:.0f} ms (largest closure {depth:,} courses)")
+
+    ids = list(catalog.courses)
+    store = MemoryStore()
+    passed = {}
+    for s in range(students):  # A graded history, enrolled through the catalog like init_courses() does
+        username = f"s{s:06d}"
+        passed[username] = {c for c in rng.sample(ids, 8) if catalog.enroll(username, c) == 'ok'}
+        for course_id in passed[username]:
+            store.add_enrollment(username, course_id, 1)
+            store.add_grade(username, course_id, 80.0, 3.3)
+
+    attempts = [(f"s{rng.randrange(students):06d}", rng.choice(ids)) for _ in range(students * 4)]
+    start = time.perf_counter()
+    outcome = {}
+    for username, course_id in attempts:
+        if catalog.missing_prerequisites(course_id, passed[username]):
+            status = 'prerequisite'
+        else:
+            status = catalog.enroll(username, course_id, limit=12)
+        outcome[status] = outcome.get(status, 0) + 1
+        if status == 'ok':
+            store.add_enrollment(username, course_id, 2)
+    per_check = (time.perf_counter() - start) / len(attempts) * 1e6
+    print(f"enrollment attempts:  {len(attempts):,} at {per_check:.1f} us each ({outcome})")
+
+    enrollments = sum(len(recs) for recs in store.records.values())
+    start = time.perf_counter()
+    result = validate_enrollments(store.iter_enrollment_results(), catalog)
+    elapsed = time.perf_counter() - start
+    print(f"validate term:        {enrollments:,} enrollments in {elapsed * 1000:.0f} ms "
+          f"({len(result['conflicts'])} clashes, {len(result['missing_prerequisites'])} missing prerequisites)")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
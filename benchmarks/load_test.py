@@ -0,0 +1,104 @@
+"""Drive many concurrent simulated sessions against a running portal server.
+
+Usage:
+    python Portal_system.py --serve &               # or pass --spawn to start one here
+    python benchmarks/load_test.py --sessions 5000 --concurrency 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COURSES = ['CSE101', 'MAT201', 'PHY301']
+
+
+async def call(reader, writer, latencies, op, **params):
+    start = time.perf_counter()
+    writer.write(json.dumps(dict(params, op=op)).encode() + b'\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    latencies.setdefault(op, []).append(time.perf_counter() - start)
+    return response
+
+
+async def session(i, args, latencies, errors, gate):
+    async with gate:
+        try:
+            reader, writer = await asyncio.open_connection(args.host, args.port, limit=1 << 20)
+        except OSError:
+            errors['connect'] = errors.get('connect', 0) + 1
+            return
+        try:
+            username = f"student{i % 20 + 1:02d}"
+            reply = await call(reader, writer, latencies, 'login', username=username, password=f"stud{i % 20 + 1:03d}")
+            if not reply['ok']:
+                errors['login'] = errors.get('login', 0) + 1
+                return
+            await call(reader, writer, latencies, 'records')
+            await call(reader, writer, latencies, 'teacher_profiles')
+            course_id = random.choice(COURSES)
+            if (await call(reader, writer, latencies, 'enroll', course_id=course_id))['ok']:
+                await call(reader, writer, latencies, 'enter_grade', course_id=course_id, grade=random.uniform(40, 100))
+                await call(reader, writer, latencies, 'unenroll', course_id=course_id)
+            await call(reader, writer, latencies, 'logout')
+        finally:
+            writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+
+
+async def run(args):
+    latencies, errors = {}, {}
+    gate = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i, args, latencies, errors, gate) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    total = sum(len(v) for v in latencies.values())
+    print(f"sessions: {args.sessions}  concurrency: {args.concurrency}  elapsed: {elapsed:.2f}s")
+    print(f"requests: {total}  throughput: {total / elapsed:,.0f} req/s  errors: {errors or 'none'}")
+    print(f"{'op':<18}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, values in sorted(latencies.items()):
+        print(f"{op:<18}{len(values):>8}{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}{percentile(values, 99):>10.2f}")
+
+
+def spawn_server(port):
+    """Start an in-memory portal server in a scratch directory and wait for it to accept connections."""
+    env = dict(os.environ, PORTAL_STORAGE='memory')
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'Portal_system.py'), '--serve', '--port', str(port)],
+                            cwd=tempfile.mkdtemp(), env=env, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=1000)
+    parser.add_argument('--spawn', action='store_true', help="start a throwaway in-memory server first")
+    args = parser.parse_args()
+    server = spawn_server(args.port) if args.spawn else None
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server:
+            server.send_signal(signal.SIGINT)  # Lets the server stop its catalog shard processes
+            server.wait()
@@ -0,0 +1,78 @@
+"""Race thousands of threads for 15-seat sections and check the catalog never oversells or deadlocks.
+
+Usage: python benchmarks/stress_enrollment.py [threads] [sections]
+Exits with status 1 if an invariant is violated or a thread is still blocked after the timeout.
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Portal_system import Config, CourseCatalog
+
+
+def run(threads=3000, sections=10, seats=15, timeout=60):
+    promoted = []
+    catalog = CourseCatalog({f"SEC{i:03d}": {'name': f"Section {i}", 'max_seats': seats} for i in range(sections)},
+                            on_promote=lambda username, course_id: promoted.append((username, course_id)))
+    course_ids = list(catalog.courses)
+    barrier = threading.Barrier(threads)
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(n):
+        rng = random.Random(n)
+        username = f"student{n % (threads // 2):05d}"  # Two threads per student to contend on the limit too
+        barrier.wait()
+        for _ in range(6):
+            course_id = rng.choice(course_ids)
+            if rng.random() < 0.3:
+                status = catalog.unenroll(username, course_id)
+            else:
+                status = catalog.enroll(username, course_id, limit=Config.MAX_ENROLLMENT, waitlist=rng.random() < 0.5)
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    workers = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    deadline = time.monotonic() + timeout
+    for t in workers:
+        t.join(max(deadline - time.monotonic(), 0))
+    elapsed = time.perf_counter() - start
+
+    problems = []
+    if any(t.is_alive() for t in workers):
+        problems.append("threads still blocked after timeout (possible deadlock)")
+    for course_id, course in catalog.courses.items():
+        enrolled = len(course['students'])
+        if enrolled > course['max_seats']:
+            problems.append(f"{course_id} oversold: {enrolled}/{course['max_seats']}")
+        if catalog.seats_left[course_id] != course['max_seats'] - enrolled:
+            problems.append(f"{course_id} seat counter drifted")
+        if course_id not in catalog.by_seats_left.get(catalog.seats_left[course_id], ()):
+            problems.append(f"{course_id} missing from remaining-seats index")
+        for username in course['students']:
+            if course_id not in catalog.by_student.get(username, ()):
+                problems.append(f"{username} in {course_id} roster but not in student index")
+        if catalog.waitlists[course_id] and catalog.seats_left[course_id] > 0:
+            problems.append(f"{course_id} has free seats and a non-empty waitlist")
+    for username, enrolled in catalog.by_student.items():
+        if len(enrolled) > Config.MAX_ENROLLMENT:
+            problems.append(f"{username} exceeds MAX_ENROLLMENT with {len(enrolled)} courses")
+
+    print(f"threads: {threads}  sections: {sections} x {seats} seats  elapsed: {elapsed:.2f}s")
+    print(f"outcomes: {dict(sorted(statuses.items()))}  waitlist promotions: {len(promoted)}")
+    print(f"seats filled: {sum(len(c['students']) for c in catalog.courses.values())}/{sections * seats}")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    print("OK: no oversold sections, no limit violations, no deadlock" if not problems else "FAILED")
+    return not problems
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(0 if run(*args) else 1)
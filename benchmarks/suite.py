@@ -0,0 +1,192 @@
+"""Replay seeded university workloads and report throughput, latency percentiles and peak memory as JSON.
+
+Usage:
+    python benchmarks/suite.py --output baseline.json              # record a baseline
+    python benchmarks/suite.py --compare baseline.json             # exit 1 on regressions
+
+Each scenario runs in its own process against a freshly generated university
+(see workload.py), so peak RSS and caches are per scenario. Each scenario runs
+--trials times and is reported by its median-throughput trial. A scenario regresses
+when its median throughput drops, or its median p95 latency grows, by more than
+--threshold and no current trial overlaps the baseline's trials. Scenarios whose
+median run takes under MIN_SECONDS are too noisy to compare and are only reported.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+NOISE_FLOOR_MS = 0.01  # p95 changes smaller than this are never flagged
+MIN_SECONDS = 0.5      # Median run time below which a scenario is not compared
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: round(samples[min(len(samples) - 1, int(len(samples) * p / 100))] * 1000, 4)
+    return {'p50': pick(50), 'p95': pick(95), 'p99': pick(99), 'max': round(samples[-1] * 1000, 4)}
+
+
+def run_scenario(scenario, args):
+    """Generate the university, load it and replay one scenario; runs in a child process."""
+    os.chdir(tempfile.mkdtemp())  # Activity log and database stay out of the working tree
+    import workload
+    univ = workload.University(args.seed, args.students, args.teachers, args.courses, args.sections,
+                               args.history, args.grades, args.kdf_cost)
+    workload.install(univ, args.backend)
+    loaded_rss = peak_rss_mb()
+    latencies, rejected, elapsed = workload.replay(univ, scenario, args.ops, args.seed)
+    workload.portal.STORE.close()
+    workload.portal.ACTIVITY_LOGGER.close()
+    ops = sum(len(samples) for samples in latencies.values())
+    return {'ops': ops, 'rejected': rejected, 'seconds': round(elapsed, 4), 'throughput': round(ops / elapsed, 1),
+            'latency_ms': percentiles([s for samples in latencies.values() for s in samples]),
+            'by_op': {name: dict(count=len(samples), **percentiles(samples)) for name, samples in sorted(latencies.items())},
+            'loaded_rss_mb': loaded_rss, 'peak_rss_mb': peak_rss_mb()}
+
+
+def _child(scenario, args, queue):
+    queue.put(run_scenario(scenario, args))
+
+
+def run_isolated(scenario, args):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child, args=(scenario, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run_trials(scenario, args):
+    """Run a scenario --trials times; returns its median-throughput trial plus every trial's key figures."""
+    trials = sorted((run_isolated(scenario, args) for _ in range(args.trials)), key=lambda r: r['throughput'])
+    result = dict(trials[len(trials) // 2])
+    result['trials'] = [{'seconds': r['seconds'], 'throughput': r['throughput'], 'p95_ms': r['latency_ms']['p95']}
+                        for r in trials]
+    return result
+
+
+def trial_figures(result):
+    """Return a scenario's per-trial seconds, throughputs and p95 latencies (one trial for older reports)."""
+    trials = result.get('trials') or [{'seconds': result['seconds'], 'throughput': result['throughput'],
+                                       'p95_ms': result['latency_ms']['p95']}]
+    return tuple([t[key] for t in trials] for key in ('seconds', 'throughput', 'p95_ms'))
+
+
+def compare(results, baseline, threshold):
+    """Compare trial medians; returns (regressions, too_short).
+
+    A metric regresses when its median moves past threshold and every current trial is
+    worse than every baseline trial. regressions are (scenario, metric, baseline, current,
+    change) rows of medians; too_short lists the scenarios skipped because either side's
+    median run took under MIN_SECONDS.
+    """
+    regressions, too_short = [], []
+    median = statistics.median
+    for scenario, current in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(scenario)
+        if before is None:
+            continue
+        old_seconds, old_throughput, old_p95 = trial_figures(before)
+        new_seconds, new_throughput, new_p95 = trial_figures(current)
+        if min(median(old_seconds), median(new_seconds)) < MIN_SECONDS:
+            too_short.append(scenario)
+            continue
+        old, new = median(old_throughput), median(new_throughput)
+        if new / old - 1 < -threshold and max(new_throughput) < min(old_throughput):
+            regressions.append((scenario, 'throughput', old, new, new / old - 1))
+        old, new = median(old_p95), median(new_p95)
+        if (new - old > NOISE_FLOOR_MS and old and new / old - 1 > threshold
+                and min(new_p95) > max(old_p95)):
+            regressions.append((scenario, 'p95 ms', old, new, new / old - 1))
+    return regressions, too_short
+
+
+def main():
+    import workload
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--teachers', type=int, default=100)
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--sections', type=int, default=2, help="sections per course")
+    parser.add_argument('--history', type=int, default=2, help="graded past courses per student")
+    parser.add_argument('--grades', type=int, default=1, help="grades per past course")
+    parser.add_argument('--kdf-cost', type=int, default=2 ** 10, help="scrypt N of the generated password hashes")
+    parser.add_argument('--ops', type=int, default=5000, help="operations per scenario")
+    parser.add_argument('--trials', type=int, default=3, help="runs per scenario; the median is reported (default 3)")
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--scenario', action='append', choices=sorted(workload.SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument('--output', help="write the JSON report here ('-' for stdout)")
+    parser.add_argument('--compare', metavar='BASELINE', help="flag regressions against a saved JSON report")
+    parser.add_argument('--threshold', type=float, default=0.15, help="allowed relative slowdown (default 0.15)")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(workload.SCENARIOS)
+    results = {'meta': {'seed': args.seed, 'students': args.students, 'teachers': args.teachers,
+                        'courses': args.courses, 'sections': args.sections, 'history': args.history,
+                        'grades': args.grades, 'kdf_cost': args.kdf_cost, 'ops': args.ops, 'trials': args.trials, 'backend': args.backend,
+                        'python': platform.python_version(), 'platform': platform.platform(),
+                        'cores': os.cpu_count(), 'taken_at': datetime.now().isoformat(timespec='seconds')},
+               'scenarios': {}}
+    quiet = args.output == '-'
+    if not quiet:
+        print(f"{'scenario':<19}{'ops/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rejected':>10}{'peak MB':>9}"
+              f"  trial ops/s")
+    for scenario in scenarios:
+        result = results['scenarios'][scenario] = run_trials(scenario, args)
+        if not quiet:
+            lat = result['latency_ms']
+            print(f"{scenario:<19}{result['throughput']:>10,.0f}{lat['p50']:>9.3f}{lat['p95']:>9.3f}{lat['p99']:>9.3f}"
+                  f"{result['rejected']:>10}{result['peak_rss_mb'] or 0:>9.1f}"
+                  f"  {' '.join(format(t['throughput'], ',.0f') for t in result['trials'])}")
+
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        out = sys.stderr if quiet else sys.stdout
+        ignored = ('python', 'platform', 'cores', 'taken_at')
+        mismatched = [key for key, value in results['meta'].items()
+                      if key not in ignored and baseline.get('meta', {}).get(key) != value]
+        if mismatched:
+            print(f"warning: baseline was recorded with different {', '.join(mismatched)}", file=out)
+        regressions, too_short = compare(results, baseline, args.threshold)
+        if too_short:
+            print(f"not compared (median run under {MIN_SECONDS} s, raise --ops): {', '.join(too_short)}", file=out)
+        for scenario, metric, old, new, change in regressions:
+            print(f"REGRESSION {scenario}: {metric} {old:,.3f} -> {new:,.3f} ({change:+.0%})", file=out)
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%} against {args.compare}.", file=out)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
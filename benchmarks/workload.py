@@ -0,0 +1,186 @@
+"""Seeded generator of synthetic universities and the mixed workloads replayed against them.
+
+A University holds users shaped like INITIAL_USERS, course sections shaped like
+INITIAL_COURSES, and a graded enrollment history. install() loads it into the
+portal's module-level STORE / COURSE_CATALOG / STATS, and the scenario functions
+drive the non-interactive PortalService paths, timing every call.
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Portal_system as portal
+
+FIRST = ['Ali', 'Sara', 'John', 'Ayesha', 'Omar', 'Fatima', 'Hassan', 'Maria', 'Usman', 'Zainab', 'David', 'Hina']
+LAST = ['Khan', 'Smith', 'Ahmed', 'Malik', 'Brown', 'Hussain', 'Raza', 'Iqbal', 'Jones', 'Sheikh', 'Butt', 'Lee']
+QUALIFICATIONS = ['PhD', 'PhD', 'MPhil', 'MS', '']
+DEPARTMENTS = ['CSE', 'MAT', 'PHY', 'EEE', 'BIO', 'ECO', 'ENG', 'HUM']
+TITLES = ['Foundations', 'Methods', 'Systems', 'Theory', 'Lab', 'Seminar', 'Design', 'Analysis']
+PASSWORD = 'bench-pass'
+
+
+class University:
+    """A generated university: users, course sections and a graded enrollment history."""
+    def __init__(self, seed=1, students=5000, teachers=100, courses=200, sections=2, history=2, grades=1,
+                 kdf_cost=2 ** 10):
+        self.seed = seed
+        self.kdf_cost = kdf_cost
+        self.sizes = {'students': students, 'teachers': teachers, 'courses': courses, 'sections': sections,
+                      'history': history, 'grades': grades}
+        rng = random.Random(seed)
+        stored = portal.hash_password(PASSWORD, 'scrypt', kdf_cost)  # One hash shared by every generated user
+
+        def name():
+            return f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+
+        self.users = {'admin': {'role': 'admin', 'name': 'Administrator', 'password': stored}}
+        self.teachers = [f"teacher{i:04d}" for i in range(1, teachers + 1)]
+        self.students = [f"student{i:06d}" for i in range(1, students + 1)]
+        for username in self.teachers:
+            self.users[username] = {'role': 'teacher', 'name': name(), 'password': stored,
+                                    'qualification': rng.choice(QUALIFICATIONS)}
+        for username in self.students:
+            self.users[username] = {'role': 'student', 'name': name(), 'password': stored}
+
+        self.courses = {}
+        total = courses * sections
+        base = math.ceil(students * portal.Config.MAX_ENROLLMENT / max(total, 1))
+        for i in range(courses):
+            dept = DEPARTMENTS[i % len(DEPARTMENTS)]
+            number = 101 + i // len(DEPARTMENTS)
+            for s in range(sections):
+                section = chr(ord('A') + s % 26)
+                self.courses[f"{dept}{number}{section}"] = {
+                    'name': f"{dept} {rng.choice(TITLES)} {number}", 'section': section, 'students': [],
+                    'max_seats': rng.randint(max(int(base * 0.8), 1), max(int(base * 1.2), 1)),
+                    'credits': rng.choice((1, 2, 3, 3, 3, 4))}
+        self.course_ids = list(self.courses)
+
+        # Each student's past semesters: distinct sections with seats left, each graded
+        seats = {course_id: info['max_seats'] for course_id, info in self.courses.items()}
+        self.enrollments, self.grades = [], []
+        for username in self.students:
+            taken = set()
+            for semester in range(1, history + 1):
+                for _ in range(10):
+                    course_id = rng.choice(self.course_ids)
+                    if course_id not in taken and seats[course_id] > 0:
+                        break
+                else:
+                    continue
+                taken.add(course_id)
+                seats[course_id] -= 1
+                self.enrollments.append((username, course_id, semester))
+                for _ in range(grades):
+                    self.grades.append((username, course_id, round(min(max(rng.gauss(72, 12), 0), 100), 1)))
+
+
+def install(univ, backend='memory', db_path='bench.db'):
+    """Replace the portal's store, catalog, stats and caches with a fresh copy of univ.
+
+    The configured scrypt cost is set to the generated hashes' cost, so logins verify
+    them as they are instead of rehashing every user at the production cost.
+    """
+    portal.Config.KDF, portal.Config.SCRYPT_N = 'scrypt', univ.kdf_cost
+    store = portal.MemoryStore({}) if backend == 'memory' else portal.SQLiteStore(db_path)
+    with store.batch():
+        store.add_users(univ.users.items())
+        store.add_enrollments(univ.enrollments)
+        by_course = {}
+        for username, course_id, grade in univ.grades:
+            by_course.setdefault(course_id, []).append((username, grade, portal.grade_to_cgpa(grade)))
+        for course_id, rows in by_course.items():
+            store.add_grades(course_id, rows)
+    portal.STORE = store
+    portal.STATS = portal.SystemStats()
+    portal.STATS.load(store)
+    portal.COURSE_CATALOG = portal.CourseCatalog(univ.courses, on_promote=portal.SERVICE.record_promotion,
+                                                 on_change=portal.STATS.enrollment_changed)
+    for username, course_id in store.iter_enrollments():
+        portal.COURSE_CATALOG.restore(username, course_id)
+    portal.CREDENTIALS = portal.CredentialManager()
+    portal.SESSIONS = portal.SessionManager()
+    portal.DIRECTORY.reset()
+    return store
+
+
+# Operations: each makes one service call, timed under its name without the op_ prefix
+def op_login(univ, rng):
+    username = rng.choice(univ.students) if rng.random() < 0.9 else rng.choice(univ.teachers)
+    profile = portal.SERVICE.authenticate(username, PASSWORD, source='bench')
+    portal.SERVICE.logout(username, profile['token'])
+
+
+def op_enroll(univ, rng):
+    portal.SERVICE.enroll(rng.choice(univ.students), rng.choice(univ.course_ids), waitlist=rng.random() < 0.2)
+
+
+def op_unenroll(univ, rng):
+    username = rng.choice(univ.students)
+    current = sorted(portal.COURSE_CATALOG.courses_for(username))
+    portal.SERVICE.unenroll(username, rng.choice(current) if current else rng.choice(univ.course_ids))
+
+
+def op_records(univ, rng):
+    portal.SERVICE.records(rng.choice(univ.students))
+
+
+def op_enter_grade(univ, rng):
+    username = rng.choice(univ.students)
+    current = sorted(portal.COURSE_CATALOG.courses_for(username))
+    portal.SERVICE.enter_grade(username, rng.choice(current) if current else rng.choice(univ.course_ids),
+                               round(rng.uniform(40, 100), 1))
+
+
+def op_submit_grades(univ, rng):
+    course_id = rng.choice(univ.course_ids)
+    rows = [{'username': username, 'grade': round(rng.uniform(40, 100), 1)}
+            for username in sorted(portal.COURSE_CATALOG.roster(course_id))]
+    portal.SERVICE.submit_grades(rng.choice(univ.teachers), course_id, rows)
+
+
+def op_teacher_profiles(univ, rng):
+    portal.SERVICE.teacher_profiles(rng.choice(univ.students), rng.choice(LAST)[:rng.randint(1, 4)])
+
+
+def op_system_stats(univ, rng):
+    portal.SERVICE.system_stats('admin')
+
+
+def op_stats_snapshot(univ, rng):
+    portal.SERVICE.stats_snapshot('admin')
+
+
+def op_user_search(univ, rng):
+    portal.SERVICE.all_users('admin', rng.choice(FIRST)[:rng.randint(1, 4)], rng.choice((None, 'student', 'teacher')))
+
+
+# Scenario -> weighted operations
+SCENARIOS = {
+    'login_burst': [(op_login, 1)],
+    'registration_rush': [(op_enroll, 7), (op_unenroll, 2), (op_teacher_profiles, 1)],
+    'grade_release': [(op_submit_grades, 1), (op_records, 20)],
+    'admin_stats': [(op_system_stats, 4), (op_stats_snapshot, 2), (op_user_search, 4)],
+    'mixed': [(op_login, 15), (op_records, 25), (op_enroll, 20), (op_unenroll, 8), (op_enter_grade, 10),
+              (op_teacher_profiles, 10), (op_submit_grades, 1), (op_system_stats, 5), (op_user_search, 6)],
+}
+
+
+def replay(univ, scenario, ops, seed):
+    """Run ops weighted-random operations; returns ({name: [seconds]}, rejected count, elapsed seconds)."""
+    rng = random.Random(seed)
+    funcs, weights = zip(*SCENARIOS[scenario])
+    latencies, rejected = {}, 0
+    perf_counter = time.perf_counter
+    begin = perf_counter()
+    for func in rng.choices(funcs, weights, k=ops):
+        start = perf_counter()
+        try:
+            func(univ, rng)
+        except portal.PortalError:
+            rejected += 1
+        latencies.setdefault(func.__name__[3:], []).append(perf_counter() - start)
+    return latencies, rejected, perf_counter() - begin
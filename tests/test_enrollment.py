@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+from Portal_system import CourseCatalog
+
+
+def catalog(**courses):
+    return CourseCatalog({course_id: dict(name=course_id, **info) for course_id, info in courses.items()})
+
+
+def test_concurrent_enroll_never_oversells():
+    courses = catalog(CSE101={'max_seats': 25})
+    results = []
+    start = threading.Barrier(8)
+
+    def worker(k):
+        start.wait()
+        for i in range(50):
+            results.append(courses.enroll(f"s{k}_{i}", 'CSE101'))
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count('ok') == 25
+    assert results.count('full') == 400 - 25
+    assert len(courses['CSE101']['students']) == 25
+    assert courses.seats_left['CSE101'] == 0
+
+
+def test_concurrent_enroll_respects_the_course_limit():
+    courses = catalog(**{f"C{i}": {'max_seats': 100} for i in range(6)})
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(courses.enroll('ali', c, limit=3)))
+               for c in courses.courses]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count('ok') == 3
+    assert len(courses.courses_for('ali')) == 3
+
+
+def test_waitlist_promotes_in_order():
+    promoted = []
+    courses = catalog(CSE101={'max_seats': 1})
+    courses.on_promote = lambda username, course_id: promoted.append((username, course_id))
+    assert courses.enroll('ali', 'CSE101') == 'ok'
+    assert courses.enroll('sara', 'CSE101', waitlist=True) == 'waitlisted'
+    assert courses.enroll('omar', 'CSE101', waitlist=True) == 'waitlisted'
+    assert courses.waitlist('CSE101') == ['sara', 'omar']
+
+    assert courses.unenroll('ali', 'CSE101') == 'ok'
+    assert promoted == [('sara', 'CSE101')]
+    assert courses.is_enrolled('sara', 'CSE101')
+    assert courses.waitlist('CSE101') == ['omar']
+
+    assert courses.unenroll('omar', 'CSE101') == 'unwaitlisted'
+    assert courses.unenroll('sara', 'CSE101') == 'ok'
+    assert courses.seats_left['CSE101'] == 1
+    assert promoted == [('sara', 'CSE101')]
+
+
+def test_waitlist_promotion_waits_for_a_raised_seat_count():
+    courses = catalog(CSE101={'max_seats': 1})
+    courses.enroll('ali', 'CSE101')
+    courses.enroll('sara', 'CSE101', waitlist=True)
+    courses.add_course('CSE101', 'CSE101', max_seats=2)
+    assert courses.is_enrolled('sara', 'CSE101')
+    assert courses.waitlist('CSE101') == []
+
+
+def test_timetable_clash_is_refused():
+    courses = catalog(CSE101={'max_seats': 5, 'meetings': ['Mon 09:00-10:30']},
+                      MAT101={'max_seats': 5, 'meetings': ['Mon 10:00-11:00']},
+                      PHY101={'max_seats': 5, 'meetings': ['Mon 10:30-12:00']})
+    assert courses.enroll('ali', 'CSE101') == 'ok'
+    assert courses.clash('ali', 'MAT101') == 'CSE101'
+    assert courses.enroll('ali', 'MAT101') == 'conflict'
+    assert courses.enroll('ali', 'PHY101') == 'ok'  # Back-to-back meetings do not overlap
+
+
+def test_restore_keeps_a_clashing_enrollment():
+    courses = catalog(CSE101={'max_seats': 5, 'meetings': ['Tue 09:00-10:00']},
+                      MAT101={'max_seats': 5, 'meetings': ['Tue 09:30-10:30']})
+    assert courses.enroll('ali', 'CSE101') == 'ok'
+    assert courses.restore('ali', 'MAT101') == 'ok'
+    assert courses.courses_for('ali') == {'CSE101', 'MAT101'}
+    courses.unenroll('ali', 'CSE101')
+    assert courses.clash('ali', 'CSE101') == 'MAT101'
+
+
+def test_reschedule_into_a_clash_is_refused_without_side_effects():
+    changes = []
+    courses = catalog(CSE101={'max_seats': 5, 'meetings': ['Wed 09:00-10:00']},
+                      MAT101={'max_seats': 5, 'meetings': ['Thu 09:00-10:00']})
+    courses.on_change = lambda *change: changes.append(change)
+    courses.enroll('ali', 'CSE101')
+    courses.enroll('ali', 'MAT101')
+    changes.clear()
+    with pytest.raises(ValueError):
+        courses.add_course('MAT101', 'MAT101', max_seats=9, meetings=['Wed 09:30-10:30'])
+    assert courses['MAT101']['max_seats'] == 5
+    assert courses['MAT101']['meetings'] == ['Thu 09:00-10:00']
+    assert changes == []
+    courses.add_course('MAT101', 'MAT101', max_seats=9, meetings=['Fri 09:00-10:00'])
+    assert changes == [('MAT101', 0, 4)]
@@ -0,0 +1,139 @@
+import os
+import time
+from array import array
+
+import pytest
+
+import Portal_system
+from Portal_system import JournaledStore, MemoryStore, SQLiteStore, is_password_hash, open_store, verify_password
+
+NEVER = 10 ** 12  # snapshot_every that keeps background snapshots out of the way
+
+
+def populate(store):
+    store.add_users([(f"s{i}", {'role': 'student', 'name': f"Student {i}", 'password': 'x'}) for i in range(20)])
+    store.add_user('t1', {'role': 'teacher', 'name': 'Teacher One', 'password': 'x', 'qualification': 'PhD Physics'})
+    store.add_enrollments((f"s{i}", course_id, k + 1) for i in range(20) for k, course_id in enumerate(['CSE101', 'MAT101']))
+    store.add_grades('CSE101', [(f"s{i}", 60.0 + i, 3.0) for i in range(20)])
+    store.add_grade('s1', 'MAT101', 55.0, 2.5)
+    store.add_grade('s1', 'MAT101', 65.0, 2.75)
+    store.remove_enrollment('s2', 'CSE101')
+    store.update_user('s3', name='Renamed Student', password='y')
+    store.add_salary_slips([('t1', '2026-01', 1000.0, 100.0, 900.0), ('t1', '2026-02', 1000.0, 50.0, 950.0)])
+
+
+def graded(store):
+    """Expand grade_columns into {(username, course_id, semester): grades}; the backends lay records out differently."""
+    usernames, per_user, course_ids, semesters, counts, packed = store.grade_columns()
+    grades = array('d', packed)
+    owners = [username for username, n in zip(usernames, per_user) for _ in range(n)]
+    result, pos = {}, 0
+    for username, course_id, semester, count in zip(owners, course_ids, semesters, counts):
+        result.setdefault((username, course_id, semester), []).extend(grades[pos:pos + count])
+        pos += count
+    return {key: marks for key, marks in result.items() if marks}
+
+
+def contents(store):
+    return (sorted(store.iter_users()),
+            {username: store.get_records(username) for username, _ in store.iter_users()},
+            sorted(store.iter_enrollments()),
+            store.count_by_role(),
+            store.count_grades(),
+            store.salary_slips('t1'))
+
+
+def test_journal_recovers_from_wal_after_crash():
+    store = JournaledStore('portal.journal', snapshot_every=NEVER)
+    populate(store)
+    expected = contents(store)
+    store.wal.sync()
+    store.wal.close()  # Crash: no snapshot, nothing but the WAL on disk
+
+    recovered = JournaledStore('portal.journal', snapshot_every=NEVER)
+    assert contents(recovered) == expected
+    recovered.close()
+
+
+def test_journal_recovers_snapshot_and_cuts_torn_frame():
+    store = JournaledStore('portal.journal', snapshot_every=NEVER)
+    populate(store)
+    store.snapshot()
+    store.add_grade('s4', 'MAT101', 88.0, 3.5)
+    expected = contents(store)
+    store.wal.sync()
+    store.wal.close()
+    size = os.path.getsize('portal.journal.wal')
+    with open('portal.journal.wal', 'ab') as f:
+        f.write(b'\x05\x00\x00torn')  # A frame cut short by the crash
+
+    recovered = JournaledStore('portal.journal', snapshot_every=NEVER)
+    assert contents(recovered) == expected
+    assert os.path.getsize('portal.journal.wal') == size
+    recovered.add_user('late', {'role': 'student', 'name': 'Late', 'password': 'x'})
+    expected = contents(recovered)
+    recovered.close()
+
+    reopened = JournaledStore('portal.journal', snapshot_every=NEVER)
+    assert contents(reopened) == expected
+    assert reopened.wal.since_snapshot == 0
+    reopened.close()
+
+
+def test_journal_keeps_writes_made_during_a_background_snapshot():
+    store = JournaledStore('portal.journal', snapshot_every=5)
+    populate(store)
+    deadline = time.monotonic() + 10
+    while not os.path.exists('portal.journal.snap') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert os.path.exists('portal.journal.snap')
+    for i in range(200):
+        store.add_user(f"late{i}", {'role': 'student', 'name': 'Late', 'password': 'x'})
+    store._closing = True  # Crash once the snapshot thread has stopped, leaving a WAL tail behind
+    store._snapshot_due.set()
+    store._snapshotter.join()
+    expected = contents(store)
+    store.wal.sync()
+    store.wal.close()
+
+    recovered = JournaledStore('portal.journal', snapshot_every=NEVER)
+    assert contents(recovered) == expected
+    recovered.close()
+
+
+def test_sqlite_and_memory_stores_agree():
+    memory, sqlite = MemoryStore(), SQLiteStore('portal.db')
+    for store in (memory, sqlite):
+        populate(store)
+    assert contents(sqlite) == contents(memory)
+    assert sorted(sqlite.graded_records(['s1', 's5'])) == sorted(memory.graded_records(['s1', 's5']))
+    assert graded(sqlite) == graded(memory)
+    assert sqlite.remove_enrollment('s1', 'MAT101') == memory.remove_enrollment('s1', 'MAT101') == 2
+    assert contents(sqlite) == contents(memory)
+    sqlite.close()
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'journal'])
+def test_plaintext_passwords_are_hashed_once(backend, monkeypatch):
+    monkeypatch.setattr(Portal_system.Config, 'DB_PATH', 'portal.db')
+    monkeypatch.setattr(Portal_system.Config, 'JOURNAL_PATH', 'portal.journal')
+    legacy = SQLiteStore('portal.db') if backend == 'sqlite' else JournaledStore('portal.journal')
+    legacy.add_users([('ali', {'role': 'student', 'name': 'Ali', 'password': 'secret'}),
+                      ('sara', {'role': 'teacher', 'name': 'Sara', 'password': 'hunter2', 'qualification': 'MS'})])
+    legacy.close()
+
+    store = open_store(backend)
+    for username, password in [('ali', 'secret'), ('sara', 'hunter2')]:
+        stored = store.get_user(username)['password']
+        assert is_password_hash(stored)
+        assert verify_password(password, stored)
+    assert store.get_version() == 1
+    hashed = dict(store.iter_users())
+    store.close()
+
+    migrations = []
+    monkeypatch.setattr(Portal_system, 'hash_plaintext_passwords', migrations.append)
+    store = open_store(backend)
+    assert migrations == []
+    assert dict(store.iter_users()) == hashed
+    store.close()